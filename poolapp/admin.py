@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import League, UserProfile, Profile, Week, Contestant, Pick
+from .models import League, UserProfile, Profile, Week, Contestant, Pick, IdolLedgerEntry, LeaderboardSnapshot
 
 @admin.register(League)
 class LeagueAdmin(admin.ModelAdmin):
@@ -36,4 +36,15 @@ class ContestantAdmin(admin.ModelAdmin):
 class PickAdmin(admin.ModelAdmin):
     list_display = ('user_profile', 'week', 'safe_pick', 'voted_out_pick', 'imty_challenge_winner_pick', 'used_immunity_idol')
     search_fields = ('user_profile__user__username', 'league__name')
-    list_filter = ('week__league', 'used_immunity_idol')
\ No newline at end of file
+    list_filter = ('week__league', 'used_immunity_idol')
+
+@admin.register(IdolLedgerEntry)
+class IdolLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('user_profile', 'week', 'kind', 'amount', 'created_at')
+    search_fields = ('user_profile__user__username',)
+    list_filter = ('kind', 'week__league')
+@admin.register(LeaderboardSnapshot)
+class LeaderboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('user_profile', 'week', 'rank', 'score', 'rank_change')
+    search_fields = ('user_profile__user__username',)
+    list_filter = ('week__league',)
@@ -0,0 +1,224 @@
+# poolapp/aggregates.py
+
+"""
+Incremental maintenance of the UserProfile counters derived from Picks
+(`total_score`, `correct_guesses`, `correct_imty_challenge_guesses`,
+`immunity_idols_played`, `immunity_idols`).
+
+Every Pick knows its own contribution (`Pick.counter_contribution`). When a
+pick changes, only the difference is applied to its profile:
+  - single saves/deletes (views, admin) go through the Pick signals in
+    `poolapp.signals`, one `F()` UPDATE per change;
+  - batch writers (the scoring engine) defer the signals, accumulate deltas
+    per profile in memory and flush them with one `bulk_update`.
+
+Idol changes are also appended to the IdolLedgerEntry ledger (earned/spent
+per profile and week), which answers "idols available before week N" for a
+whole league in one grouped query (`idol_balances`).
+
+`reconcile()` recomputes the counters from the picks in one grouped query and
+repairs any drift; it runs nightly via Celery beat and on demand through
+`manage.py reconcile_aggregates`.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from poolapp.leaderboard import bump_profile_league, bump_scoring_version
+from poolapp.models import IdolLedgerEntry, Pick, UserProfile
+
+COUNTER_FIELDS = [
+    'total_score', 'correct_guesses', 'correct_imty_challenge_guesses',
+    'immunity_idols_played', 'immunity_idols',
+]
+
+ZERO = dict.fromkeys(COUNTER_FIELDS, 0)
+
+_local = threading.local()
+
+
+@contextmanager
+def deferred_deltas():
+    """Suspend the per-save signal deltas; the caller applies deltas itself."""
+    previous = getattr(_local, 'deferred', False)
+    _local.deferred = True
+    try:
+        yield
+    finally:
+        _local.deferred = previous
+
+
+def deltas_deferred():
+    return getattr(_local, 'deferred', False)
+
+
+def snapshot(pick):
+    """Contribution recorded when `pick` was loaded (zero for unsaved picks)."""
+    return getattr(pick, '_counter_snapshot', None) or ZERO
+
+
+def contribution_delta(before, after):
+    return {k: after[k] - before[k] for k in COUNTER_FIELDS}
+
+
+def add_delta(acc, delta):
+    for k in COUNTER_FIELDS:
+        acc[k] = acc.get(k, 0) + delta[k]
+    return acc
+
+
+def apply_delta(profile, delta):
+    """Apply `delta` to an in-memory profile (caller saves/bulk_updates)."""
+    for k in COUNTER_FIELDS:
+        setattr(profile, k, getattr(profile, k) + delta.get(k, 0))
+    profile.immunity_idols = max(0, profile.immunity_idols)
+    return profile
+
+
+def apply_delta_to_db(profile_id, delta):
+    """One UPDATE with F() expressions; a no-op if nothing changed."""
+    if not any(delta.get(k) for k in COUNTER_FIELDS):
+        return 0
+    updates = {k: F(k) + delta[k] for k in COUNTER_FIELDS if k != 'immunity_idols' and delta[k]}
+    if delta['immunity_idols']:
+        updates['immunity_idols'] = Greatest(F('immunity_idols') + delta['immunity_idols'], 0)
+    return UserProfile.objects.filter(id=profile_id).update(**updates)
+
+
+def set_counters(profile, totals):
+    """Overwrite `profile`'s counters with the summed contributions of all its picks."""
+    profile.total_score = totals['total_score'] - profile.exile_return_cost
+    profile.correct_guesses = totals['correct_guesses']
+    profile.correct_imty_challenge_guesses = totals['correct_imty_challenge_guesses']
+    profile.immunity_idols_played = totals['immunity_idols_played']
+    profile.immunity_idols = max(0, totals['immunity_idols'])
+    return profile
+
+
+def record_pick_change(pick, deleted=False, ledger=True):
+    """
+    Apply the difference between `pick`'s loaded and current contribution to its
+    profile and append the matching idol ledger entries (unless `ledger` is False).
+    """
+    if deleted:
+        before = getattr(pick, '_counter_snapshot', None) or pick.counter_contribution()
+        after = ZERO
+    else:
+        before = snapshot(pick)
+        after = pick.counter_contribution()
+    delta = contribution_delta(before, after)
+    if apply_delta_to_db(pick.user_profile_id, delta):
+        bump_profile_league(pick.user_profile_id)
+    if ledger:
+        entries = idol_entries(pick, delta)
+        if entries:
+            IdolLedgerEntry.objects.bulk_create(entries)
+    pick._counter_snapshot = None if deleted else after
+
+
+# ---------- Idol ledger ----------
+
+def idol_entries(pick, delta):
+    """Unsaved ledger entries recording the idol part of a pick's contribution delta."""
+    spent = delta['immunity_idols_played']
+    earned = delta['immunity_idols'] + spent
+    entries = []
+    if earned:
+        entries.append(IdolLedgerEntry(
+            user_profile_id=pick.user_profile_id, week_id=pick.week_id,
+            kind=IdolLedgerEntry.EARNED, amount=earned,
+        ))
+    if spent:
+        entries.append(IdolLedgerEntry(
+            user_profile_id=pick.user_profile_id, week_id=pick.week_id,
+            kind=IdolLedgerEntry.SPENT, amount=-spent,
+        ))
+    return entries
+
+
+def idol_balances(league_ids, season, before_number):
+    """
+    Idols each profile of `league_ids` had available going into week
+    `before_number`, from one grouped query on the ledger. {profile_id: count}.
+    """
+    rows = (
+        IdolLedgerEntry.objects
+        .filter(week__league_id__in=league_ids, week__season=season, week__number__lt=before_number)
+        .values('user_profile')
+        .annotate(balance=Sum('amount'))
+    )
+    return {r['user_profile']: max(0, r['balance']) for r in rows}
+
+
+# ---------- Reconciliation ----------
+
+def season_aggregates(season, league_ids=None):
+    """
+    One grouped query over the season's picks (optionally limited to leagues).
+    Returns {profile_id: {'safe', 'voted', 'challenge', 'idols_used', 'points'}}.
+    """
+    picks = Pick.objects.filter(week__season=season)
+    if league_ids is not None:
+        picks = picks.filter(week__league_id__in=league_ids)
+    rows = (
+        picks
+        .values('user_profile')
+        .annotate(
+            safe=Count('id', filter=Q(safe_pick_correct=True)),
+            voted=Count('id', filter=Q(voted_out_pick_correct=True)),
+            challenge=Count('id', filter=Q(imty_challenge_winner_pick_correct=True)),
+            idols_used=Count('id', filter=Q(used_immunity_idol=True)),
+            points=Sum('points_week_total'),
+        )
+    )
+    return {row['user_profile']: row for row in rows}
+
+
+def expected_counters(profile, agg):
+    """Counters `profile` should hold given its grouped pick aggregate row."""
+    agg = agg or {}
+    voted = agg.get('voted', 0)
+    idols_used = agg.get('idols_used', 0)
+    return {
+        'total_score': (agg.get('points') or 0) - profile.exile_return_cost,
+        'correct_guesses': agg.get('safe', 0),
+        'correct_imty_challenge_guesses': agg.get('challenge', 0),
+        'immunity_idols_played': idols_used,
+        'immunity_idols': max(0, voted - idols_used),
+    }
+
+
+def reconcile(season, league_ids=None, repair=True):
+    """
+    Compare every profile's counters against its picks and (optionally) repair drift.
+    Returns a list of (profile, {field: (stored, expected)}) for drifted profiles.
+    Runs in three queries regardless of league size.
+    """
+    with transaction.atomic():
+        profiles = UserProfile.objects.select_related('user', 'league')
+        if league_ids is not None:
+            profiles = profiles.filter(league_id__in=league_ids)
+        if repair:
+            # Hold the rows so concurrent deltas can't land between the check and the repair
+            profiles = profiles.select_for_update(of=('self',))
+        aggregates = season_aggregates(season, league_ids)
+
+        drifted = []
+        for profile in profiles:
+            expected = expected_counters(profile, aggregates.get(profile.id))
+            diff = {
+                k: (getattr(profile, k), v) for k, v in expected.items() if getattr(profile, k) != v
+            }
+            if diff:
+                for k, (_, v) in diff.items():
+                    setattr(profile, k, v)
+                drifted.append((profile, diff))
+
+        if repair and drifted:
+            UserProfile.objects.bulk_update([p for p, _ in drifted], COUNTER_FIELDS)
+            bump_scoring_version({p.league_id for p, _ in drifted})
+    return drifted
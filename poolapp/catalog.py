@@ -0,0 +1,82 @@
+# poolapp/catalog.py
+
+"""
+Season-wide contestant data shared by every league.
+
+A season's contestants change a handful of times (boots, photo syncs,
+`init_season` upserts) but are read on nearly every page, so they are kept
+behind a per-season contestant version:
+
+- `get_catalog(season)` returns the season's ContestantCatalog, held in this
+  process and in the shared cache under the current version, and read from the
+  database only when the version moved. Its Contestant instances are shared:
+  read them, don't mutate them.
+- The contestant card grids on league pages are identical for all leagues of
+  a season, so they are rendered once into a template fragment cache keyed by
+  the same version.
+
+Any save that changes a contestant (see `Contestant.card_state`), creates or
+deletes one bumps the version through a signal; bulk `.update()` callers must
+call `bump_contestants_version` themselves.
+"""
+
+import time
+
+from django.core.cache import cache
+
+from poolapp.models import Contestant
+
+CARDS_TIMEOUT = 60 * 60 * 24 * 7  # superseded versions just age out
+CATALOG_TIMEOUT = 60 * 60 * 24 * 7
+
+_local = {}  # season -> ContestantCatalog last seen by this process
+
+
+def _version_key(season):
+    return f"contestants:version:{season}"
+
+
+def _catalog_key(season, version):
+    return f"contestants:catalog:{season}:v{version}"
+
+
+def contestants_version(season):
+    """Current contestant version of `season` (stored in the shared cache)."""
+    # A nanosecond clock seed means a lost version key can never revive old fragments
+    return cache.get_or_set(_version_key(season), time.time_ns, None)
+
+
+def bump_contestants_version(season):
+    try:
+        return cache.incr(_version_key(season))
+    except ValueError:
+        return contestants_version(season)
+
+
+class ContestantCatalog:
+    """A season's contestants (ordered by id) and the lookups built from them."""
+
+    def __init__(self, season, version, contestants):
+        self.season = season
+        self.version = version
+        self.contestants = contestants
+        self.by_id = {c.id: c for c in contestants}
+        self.by_name = {c.name: c for c in contestants}
+        self.active = [c for c in contestants if c.is_active]
+        self.voted_out = [c for c in contestants if not c.is_active]
+        self.tribe_by_id = {c.id: c.tribe for c in contestants}
+
+
+def get_catalog(season):
+    """ContestantCatalog of `season` at its current version (no query on a hit)."""
+    version = contestants_version(season)
+    catalog = _local.get(season)
+    if catalog is not None and catalog.version == version:
+        return catalog
+    key = _catalog_key(season, version)
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = ContestantCatalog(season, version, list(Contestant.objects.filter(season=season).order_by('id')))
+        cache.set(key, catalog, CATALOG_TIMEOUT)
+    _local[season] = catalog
+    return catalog
@@ -0,0 +1,75 @@
+# poolapp/etags.py
+
+"""
+ETag validators for conditional GETs of the league pages.
+
+Members reload `league_detail` and `user_profile` constantly around lock time
+and on episode night, but what those pages show only changes when:
+
+- the league is rescored or its standings move (`League.scoring_version`),
+- a week locks (picks become visible, the current week moves on),
+- a pick is saved or deleted (`Pick.updated_at` and the pick count),
+- a contestant card changes (`catalog.contestants_version`).
+
+Each validator reads those in two small indexed queries, before the view does
+any of its own work; `django.views.decorators.http.condition` then answers a
+matching `If-None-Match` with 304 and no render. The viewer and their CSRF
+secret are part of the tag (the pages are per user and carry forms), and a
+request with pending flash messages is never answered with 304.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from poolapp.catalog import contestants_version
+from poolapp.models import League, Pick
+
+
+def _league_state(league_id, season, now):
+    """(scoring_version, locked week count) of a league, or None if it doesn't exist."""
+    return (
+        League.objects.filter(id=league_id)
+        .annotate(locked=Count('weeks', filter=Q(weeks__season=season, weeks__lock_time__lte=now)))
+        .values_list('scoring_version', 'locked')
+        .first()
+    )
+
+
+def _pick_state(picks):
+    state = picks.aggregate(n=Count('id'), latest=Max('updated_at'))
+    return state['n'], state['latest'].isoformat() if state['latest'] else None
+
+
+def _tag(request, *parts):
+    if len(messages.get_messages(request)):
+        return None  # the page has to render (and consume) them
+    parts += (request.user.pk, request.META.get('CSRF_COOKIE'))
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def league_detail_etag(request, league_id=None):
+    """Standings version, lock state and the unlocked weeks' picks of the league."""
+    season = settings.CURRENT_SEASON
+    now = timezone.now()
+    state = _league_state(league_id, season, now)
+    if state is None:
+        return None
+    picks = Pick.objects.filter(week__league_id=league_id, week__season=season, week__lock_time__gt=now)
+    return _tag(request, 'league', league_id, state, _pick_state(picks), contestants_version(season))
+
+
+def user_profile_etag(request, league_id, user_id):
+    """Standings version, lock state and the profile's own picks."""
+    season = settings.CURRENT_SEASON
+    now = timezone.now()
+    state = _league_state(league_id, season, now)
+    if state is None:
+        return None
+    picks = Pick.objects.filter(
+        user_profile__league_id=league_id, user_profile__user_id=user_id, week__season=season,
+    )
+    return _tag(request, 'profile', league_id, user_id, state, _pick_state(picks), contestants_version(season))
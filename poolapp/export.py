@@ -0,0 +1,138 @@
+# poolapp/export.py
+
+"""
+Streaming pick and score history export.
+
+A league's (or a whole season's) picks, week results and profile aggregates
+are read with chunked `.iterator()` queries over flat `.values()` rows (names
+joined in SQL, no model instances) and written out one row at a time as CSV
+or NDJSON. Nothing is accumulated, so memory stays flat however large the
+league is; the same generators feed the download view (StreamingHttpResponse)
+and `manage.py export_history`.
+
+CSV holds one table per file; NDJSON can carry every table, each line tagged
+with its `table`. `locked_before` leaves out weeks that haven't locked yet, so
+member downloads never show picks the site still hides.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from poolapp.models import Pick, UserProfile, Week, WeekResult
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# table -> (model, filter path to League, filter path to season, [(column, lookup)])
+TABLES = {
+    'picks': (Pick, 'week__league_id', 'week__season', [
+        ('league', 'week__league__name'),
+        ('week', 'week__number'),
+        ('user', 'user_profile__user__username'),
+        ('safe_pick', 'safe_pick__name'),
+        ('voted_out_pick', 'voted_out_pick__name'),
+        ('imty_challenge_winner_pick', 'imty_challenge_winner_pick__name'),
+        ('wager_voted_out', 'wager_voted_out'),
+        ('wager_immunity', 'wager_immunity'),
+        ('parlay', 'parlay'),
+        ('used_immunity_idol', 'used_immunity_idol'),
+        ('auto_assigned', 'auto_assigned'),
+        ('safe_pick_correct', 'safe_pick_correct'),
+        ('voted_out_pick_correct', 'voted_out_pick_correct'),
+        ('imty_challenge_winner_pick_correct', 'imty_challenge_winner_pick_correct'),
+        ('points_safe', 'points_safe'),
+        ('points_vo', 'points_vo'),
+        ('points_immunity', 'points_immunity'),
+        ('points_wagers', 'points_wagers'),
+        ('points_parlay', 'points_parlay'),
+        ('points_week_total', 'points_week_total'),
+        ('updated_at', 'updated_at'),
+    ]),
+    'results': (WeekResult, 'week__league_id', 'week__season', [
+        ('league', 'week__league__name'),
+        ('week', 'week__number'),
+        ('lock_time', 'week__lock_time'),
+        ('voted_out', 'voted_out_contestant__name'),
+        ('imty_challenge_winner', 'imty_challenge_winner__name'),
+        ('imty_winner_tribe', 'imty_winner_tribe'),
+    ]),
+    'profiles': (UserProfile, 'league_id', None, [
+        ('league', 'league__name'),
+        ('user', 'user__username'),
+        ('total_score', 'total_score'),
+        ('correct_guesses', 'correct_guesses'),
+        ('correct_imty_challenge_guesses', 'correct_imty_challenge_guesses'),
+        ('immunity_idols', 'immunity_idols'),
+        ('immunity_idols_played', 'immunity_idols_played'),
+        ('exile_return_cost', 'exile_return_cost'),
+        ('exiled', 'exiled'),
+        ('eliminated', 'eliminated'),
+    ]),
+}
+FILTERS = {
+    'results': {'voted_out_contestant__isnull': False},  # scored weeks only
+}
+ORDERING = {
+    'picks': ('week__league_id', 'week__number', 'user_profile_id'),
+    'results': ('week__league_id', 'week__number'),
+    'profiles': ('league_id', '-total_score', 'id'),
+}
+
+
+def columns(table):
+    return [name for name, _ in TABLES[table][3]]
+
+
+def iter_rows(table, season, league_ids=None, locked_before=None):
+    """Rows of `table` as tuples in `columns(table)` order, streamed in chunks."""
+    model, league_path, season_path, fields = TABLES[table]
+    queryset = model.objects.filter(**FILTERS.get(table, {}))
+    if league_ids is not None:
+        queryset = queryset.filter(**{f'{league_path}__in': list(league_ids)})
+    if season_path:
+        queryset = queryset.filter(**{season_path: season})
+        if locked_before is not None:
+            queryset = queryset.filter(week__lock_time__lte=locked_before)
+    else:  # profiles of leagues playing the season
+        queryset = queryset.filter(league_id__in=Week.objects.filter(season=season).values('league_id'))
+    lookups = [lookup for _, lookup in fields]
+    return queryset.order_by(*ORDERING[table]).values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object whose write() returns the line (csv.writer into a generator)."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(table, season, league_ids=None, locked_before=None):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns(table))
+    for row in iter_rows(table, season, league_ids, locked_before):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(tables, season, league_ids=None, locked_before=None):
+    for table in tables:
+        names = columns(table)
+        for row in iter_rows(table, season, league_ids, locked_before):
+            record = {'table': table, **dict(zip(names, row))}
+            yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(fmt, tables, season, league_ids=None, locked_before=None):
+    """Chunks (str) of the export; CSV takes exactly one table."""
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown:
+        raise ValueError(f"Unknown table '{unknown[0]}'; expected one of: {', '.join(TABLES)}")
+    if fmt == 'csv':
+        if len(tables) != 1:
+            raise ValueError(f"CSV exports hold one table; pick one of: {', '.join(TABLES)}")
+        return stream_csv(tables[0], season, league_ids, locked_before)
+    if fmt == 'ndjson':
+        return stream_ndjson(tables, season, league_ids, locked_before)
+    raise ValueError(f"Unknown export format '{fmt}'; expected one of: {', '.join(FORMATS)}")
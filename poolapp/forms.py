@@ -30,7 +30,21 @@ class ExtendedUserCreationForm(UserCreationForm):
 class ResetPicksForm(forms.Form):
     pass
 
+class ContestantChoiceField(forms.ModelChoiceField):
+    """Resolves submitted ids from `known` ({id: Contestant}) before falling back to a query."""
+    known = {}
+
+    def to_python(self, value):
+        if value not in self.empty_values:
+            try:
+                return self.known[int(value)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_python(value)
+
 class PickForm(forms.ModelForm):
+    CONTESTANT_FIELDS = ('safe_pick', 'voted_out_pick', 'imty_challenge_winner_pick')
+
     class Meta:
         model = Pick
         fields = [
@@ -47,11 +61,17 @@ class PickForm(forms.ModelForm):
             'wager_immunity': forms.HiddenInput(),
             'parlay': forms.HiddenInput(),
         }
+        field_classes = {
+            'safe_pick': ContestantChoiceField,
+            'voted_out_pick': ContestantChoiceField,
+            'imty_challenge_winner_pick': ContestantChoiceField,
+        }
 
     def __init__(self, *args, **kwargs):
         self.has_immunity_idol = kwargs.pop('has_immunity_idol', False)
         self.available_safe = kwargs.pop('available_safe', None)
         self.available_voted = kwargs.pop('available_voted', None)
+        contestants = kwargs.pop('contestants', None)  # {id: Contestant} already loaded by the caller
         # NEW: supply current_points and weekly_cap for validation
         self.current_points = kwargs.pop('current_points', 0)
         self.weekly_cap = kwargs.pop('weekly_cap', 3)
@@ -61,6 +81,9 @@ class PickForm(forms.ModelForm):
         self.fields['safe_pick'].required = False
         self.fields['voted_out_pick'].required = False
         self.fields['imty_challenge_winner_pick'].required = False
+        if contestants:
+            for name in self.CONTESTANT_FIELDS:
+                self.fields[name].known = contestants
 
         if not self.has_immunity_idol:
             self.fields.pop('used_immunity_idol', None)
@@ -73,6 +96,15 @@ class PickForm(forms.ModelForm):
         if 'parlay' in self.fields:
             self.fields['parlay'].required = False
 
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # Contestants resolved from `known` were loaded by the caller: skip the model's existence check
+        for name in self.CONTESTANT_FIELDS:
+            value = self.cleaned_data.get(name)
+            if value is not None and self.fields[name].known.get(value.id) is value:
+                exclude.add(name)
+        return exclude
+
     def clean(self):
         cleaned = super().clean()
         used_idol = cleaned.get('used_immunity_idol')
@@ -0,0 +1,171 @@
+# poolapp/leaderboard.py
+
+"""
+Cached league leaderboards.
+
+A leaderboard only changes when a write touches the standings: scoring
+(`update_week_results`, Celery, `rebuild_season`), a return from exile, a
+counter reconciliation, an idol played or a new member. Each of those bumps
+`League.scoring_version` inside its own transaction, and the cache key carries
+the version read with the league row, so a rescore can never be answered from
+a stale entry: the new version simply misses and is rebuilt. Old versions are
+never read again and expire on their own. Rendered pick tables of locked weeks
+are cached under the same version. Signals also bump it when what the cached
+rows show changes without moving the standings: a member's username or
+avatar, or an edit to a pick of a locked week.
+
+`snapshot_ranks` records every profile's rank after a week is scored
+(LeaderboardSnapshot), so rank movement and history are indexed reads.
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, Rank
+
+from poolapp.models import LeaderboardSnapshot, League, Pick, UserProfile
+
+LEADERBOARD_TIMEOUT = 60 * 60 * 24 * 7  # old versions just age out
+
+
+def bump_scoring_version(league_ids):
+    """Invalidate the cached leaderboards of `league_ids` (call inside the writing transaction)."""
+    return League.objects.filter(id__in=list(league_ids)).update(scoring_version=F('scoring_version') + 1)
+
+
+def bump_profile_league(profile_id):
+    """Same, for the league of one UserProfile."""
+    return League.objects.filter(user_profiles__id=profile_id).update(scoring_version=F('scoring_version') + 1)
+
+
+def bump_member_leagues(user_id):
+    """Same, for every league `user_id` plays in (their name or avatar changed)."""
+    return League.objects.filter(user_profiles__user_id=user_id).update(scoring_version=F('scoring_version') + 1)
+
+
+def leaderboard_key(league, last_locked_week=None):
+    week_id = last_locked_week.id if last_locked_week else 0
+    return f"leaderboard:{league.id}:v{league.scoring_version}:w{week_id}"
+
+
+def week_picks_key(league, week):
+    """Rendered picks table of a locked week (see views.league_week_picks)."""
+    return f"week_picks:{league.id}:{week.id}:v{league.scoring_version}"
+
+
+def get_leaderboard(league, last_locked_week=None):
+    """
+    (profiles, week_delta_by_profile) for `league`: members ordered by score
+    (user and avatar loaded, `rank` shared by tied scores, `rank_change` from
+    the latest snapshot up to `last_locked_week`) and each member's points for
+    `last_locked_week`.
+    `league.scoring_version` must be fresh (read with the request).
+    """
+    key = leaderboard_key(league, last_locked_week)
+    cached = cache.get(key)
+    if cached is None:
+        cached = _build_leaderboard(league, last_locked_week)
+        cache.set(key, cached, LEADERBOARD_TIMEOUT)
+    return cached
+
+
+def _build_leaderboard(league, last_locked_week):
+    profiles = list(
+        UserProfile.objects.filter(league=league)
+        .select_related('user__profile')
+        # RANK() like the snapshots: tied scores share a rank, so the movement arrows agree
+        .annotate(rank=Window(Rank(), order_by=F('total_score').desc()))
+        .order_by('-total_score', 'exiled')
+    )
+    week_delta_by_profile = {}
+    rank_change = {}
+    if last_locked_week:
+        week_delta_by_profile = dict(
+            Pick.objects.filter(week=last_locked_week).values_list('user_profile_id', 'points_week_total')
+        )
+        # A week locks before it is scored: fall back to the latest scored week
+        latest_week = LeaderboardSnapshot.objects.filter(
+            week__league_id=league.id, week__season=last_locked_week.season,
+            week__number__lte=last_locked_week.number,
+        ).order_by('-week__number').values('week_id')[:1]
+        rank_change = dict(
+            LeaderboardSnapshot.objects.filter(week_id=Subquery(latest_week))
+            .values_list('user_profile_id', 'rank_change')
+        )
+    for profile in profiles:
+        profile.rank_change = rank_change.get(profile.id)
+    return profiles, week_delta_by_profile
+
+
+# ---------- Rank history ----------
+
+def snapshot_ranks(weeks):
+    """
+    Write the LeaderboardSnapshot rows of `weeks` (one Week per league, same
+    season and number). Score through the week, RANK() within each league and
+    the previous week's rank come from one windowed query; on PostgreSQL the
+    rows are written by the same statement (INSERT ... SELECT ... ON CONFLICT),
+    elsewhere with one upsert of the selected rows. Either way rescoring a week
+    simply replaces its snapshot.
+    Exile return costs are counted in full (they aren't dated per week).
+    """
+    weeks = list(weeks)
+    if not weeks:
+        return 0
+    number, season = weeks[0].number, weeks[0].season
+    if any(w.number != number or w.season != season for w in weeks):
+        raise ValueError("snapshot_ranks() expects weeks sharing one season and episode number.")
+    week_by_league = {w.league_id: w for w in weeks}
+
+    through_week = Q(pick__week__season=season, pick__week__number__lte=number)
+    previous_rank = LeaderboardSnapshot.objects.filter(
+        user_profile=OuterRef('pk'), week__season=season, week__number=number - 1,
+    ).values('rank')[:1]
+    rows = (
+        UserProfile.objects
+        .filter(league_id__in=week_by_league)
+        .annotate(score=Coalesce(Sum('pick__points_week_total', filter=through_week), Value(0)) - F('exile_return_cost'))
+        .annotate(
+            rank=Window(Rank(), partition_by=F('league_id'), order_by=F('score').desc()),
+            previous_rank=Subquery(previous_rank),
+            week_ref=Case(*[When(league_id=lid, then=Value(w.id)) for lid, w in week_by_league.items()]),
+        )
+    )
+    if connection.vendor == 'postgresql':
+        return _upsert_snapshots(rows)
+
+    snapshots = [
+        LeaderboardSnapshot(
+            user_profile_id=profile_id,
+            week_id=week_id,
+            rank=rank,
+            score=score,
+            rank_change=None if previous is None else previous - rank,
+        )
+        for profile_id, week_id, score, rank, previous in rows.values_list(
+            'id', 'week_ref', 'score', 'rank', 'previous_rank',
+        )
+    ]
+    LeaderboardSnapshot.objects.bulk_create(
+        snapshots, update_conflicts=True,
+        unique_fields=['user_profile', 'week'], update_fields=['rank', 'score', 'rank_change'],
+    )
+    return len(snapshots)
+
+
+def _upsert_snapshots(rows):
+    """Insert or replace the snapshots selected by `rows` (see snapshot_ranks) in one statement."""
+    qn = connection.ops.quote_name
+    select, params = rows.values('id', 'week_ref', 'score', 'rank', 'previous_rank').query.sql_with_params()
+    sql = (
+        f"INSERT INTO {qn(LeaderboardSnapshot._meta.db_table)} "
+        f"({qn('user_profile_id')}, {qn('week_id')}, {qn('rank')}, {qn('score')}, {qn('rank_change')}) "
+        f"SELECT ranked.{qn('id')}, ranked.{qn('week_ref')}, ranked.{qn('rank')}, ranked.{qn('score')}, "
+        f"ranked.{qn('previous_rank')} - ranked.{qn('rank')} FROM ({select}) ranked "
+        f"ON CONFLICT ({qn('user_profile_id')}, {qn('week_id')}) DO UPDATE SET "
+        f"{qn('rank')} = EXCLUDED.{qn('rank')}, {qn('score')} = EXCLUDED.{qn('score')}, "
+        f"{qn('rank_change')} = EXCLUDED.{qn('rank_change')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
@@ -0,0 +1,229 @@
+# poolapp/management/commands/benchmark.py
+
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from poolapp.catalog import get_catalog
+from poolapp.models import League, Pick, UserProfile, WeekResult
+from poolapp.synthetic import build_season
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark scoring and the main views on synthetic leagues at several scales. "
+        "Runs in a throwaway test database; records wall time and SQL query counts "
+        "and writes a JSON report. Use --settings=survivor_pool.settings_bench to run locally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default='1x10,5x25,20x50',
+            help="Comma-separated LEAGUESxMEMBERS scales (default: 1x10,5x25,20x50)."
+        )
+        parser.add_argument('--scored-weeks', type=int, default=8, help='Weeks already scored (default 8).')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement (default 5).')
+        parser.add_argument('--seed', type=int, default=0, help='Synthetic data seed.')
+        parser.add_argument('--output', default='bench_report.json', help='Report path (default bench_report.json).')
+        parser.add_argument('--compare', metavar='PATH', help='Print changes against a previous report.')
+
+    def handle(self, *args, **options):
+        scales = self._parse_scales(options['scales'])
+        if options['scored_weeks'] >= settings.SEASON_CONFIG[settings.CURRENT_SEASON]['EPISODES']:
+            raise CommandError("--scored-weeks must leave at least one open week.")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = []
+            for n_leagues, n_members in scales:
+                call_command('flush', interactive=False, verbosity=0)
+                results.append(self._run_scale(n_leagues, n_members, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'commit': self._git_commit(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'scored_weeks': options['scored_weeks'],
+            'repeat': options['repeat'],
+            'seed': options['seed'],
+            'scales': results,
+        }
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                self._compare(json.load(fh), report)
+
+    # ---------- Measurement ----------
+
+    def _run_scale(self, n_leagues, n_members, options):
+        label = f"{n_leagues}x{n_members}"
+        started = time.perf_counter()
+        leagues = build_season(n_leagues, n_members, scored_weeks=options['scored_weeks'], seed=options['seed'])
+        generate_s = time.perf_counter() - started
+        self.stdout.write(f"[{label}] generated {Pick.objects.count()} pick(s) in {generate_s:.1f}s")
+
+        repeat = options['repeat']
+        scored = options['scored_weeks']
+        open_week = scored + 1
+        league = leagues[0]
+        user = self._member(league)
+        client = Client()
+        client.force_login(user)
+
+        # Rescoring the latest week is idempotent, so it can be repeated
+        result = WeekResult.objects.select_related('voted_out_contestant').get(
+            week__league=league, week__season=settings.CURRENT_SEASON, week__number=scored
+        )
+        score_args = [str(scored), result.voted_out_contestant.name, result.imty_winner_tribe or '']
+        if result.imty_challenge_winner_id:
+            score_args[2] = get_catalog(settings.CURRENT_SEASON).by_id[result.imty_challenge_winner_id].name
+
+        make_picks_url = reverse('poolapp:make_picks', args=[league.id, open_week])
+        submit = self._submission(user, league)
+
+        ops = {
+            'update_week_results': lambda: call_command('update_week_results', *score_args, stdout=io.StringIO()),
+            'update_week_results --single-pass': lambda: call_command(
+                'update_week_results', *score_args, '--single-pass', stdout=io.StringIO()
+            ),
+            'league_detail': lambda: client.get(reverse('poolapp:league_detail', args=[league.id])),
+            'make_picks GET': lambda: client.get(make_picks_url),
+            'make_picks POST': lambda: client.post(make_picks_url, submit),
+            'make_picks reset': lambda: client.post(make_picks_url, {'reset_picks': 'on'}),
+            'user_profile': lambda: client.get(reverse('poolapp:user_profile', args=[league.id, user.id])),
+            'dashboard': lambda: client.get(reverse('poolapp:dashboard')),
+        }
+
+        measurements = {}
+        for name, op in ops.items():
+            if name == 'make_picks POST':
+                # Each submission is followed by a reset so every run creates the pick
+                measurements[name] = self._measure(op, repeat, after=ops['make_picks reset'])
+            elif name == 'make_picks reset':
+                measurements[name] = self._measure(op, repeat, before=ops['make_picks POST'])
+            else:
+                measurements[name] = self._measure(op, repeat)
+            m = measurements[name]
+            self.stdout.write(
+                f"[{label}] {name:<34} {m['queries']:>5} queries  median {m['median_ms']:>8.1f} ms"
+            )
+
+        return {
+            'scale': label,
+            'leagues': n_leagues,
+            'members': n_members,
+            'picks': Pick.objects.count(),
+            'generate_s': round(generate_s, 3),
+            'results': measurements,
+        }
+
+    def _measure(self, op, repeat, before=None, after=None):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            if before:
+                before()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = op()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = len(ctx)
+            if after:
+                after()
+        status = getattr(response, 'status_code', None)
+        if status is not None and status >= 400:
+            raise CommandError(f"Benchmark request failed with HTTP {status}.")
+        return {
+            'queries': queries,
+            'status': status,
+            'min_ms': round(min(timings), 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'max_ms': round(max(timings), 2),
+        }
+
+    def _member(self, league):
+        profile = (
+            UserProfile.objects.filter(league=league, eliminated=False, exiled=False)
+            .select_related('user').order_by('id').first()
+        )
+        if profile is None:
+            raise CommandError(f"No active member left in {league.name}; lower --scored-weeks.")
+        return profile.user
+
+    def _submission(self, user, league):
+        """A valid make_picks POST for `user` in the open week."""
+        active = get_catalog(settings.CURRENT_SEASON).active
+        used = set(
+            Pick.objects.filter(user_profile__user=user, user_profile__league=league)
+            .values_list('safe_pick_id', flat=True)
+        )
+        safe = next(c for c in active if c.id not in used)
+        voted_out = next(c for c in active if c != safe)
+        return {
+            'submit_picks': '1',
+            'safe_pick': safe.id,
+            'voted_out_pick': voted_out.id,
+            'imty_challenge_winner_pick': active[-1].id,
+            'wager_voted_out': 0,
+            'wager_immunity': 0,
+        }
+
+    # ---------- Reporting ----------
+
+    def _parse_scales(self, value):
+        scales = []
+        for item in value.split(','):
+            try:
+                n_leagues, n_members = (int(x) for x in item.lower().split('x'))
+            except ValueError:
+                raise CommandError(f"Bad scale '{item}': expected LEAGUESxMEMBERS, e.g. 5x25.")
+            scales.append((n_leagues, n_members))
+        return scales
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _compare(self, old, new):
+        self.stdout.write(f"Compared with {old.get('commit')} ({old.get('created')}):")
+        old_scales = {s['scale']: s for s in old.get('scales', [])}
+        for scale in new['scales']:
+            previous = old_scales.get(scale['scale'])
+            if not previous:
+                continue
+            for name, m in scale['results'].items():
+                before = previous['results'].get(name)
+                if not before:
+                    continue
+                change = (m['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0
+                line = (
+                    f"[{scale['scale']}] {name:<34} queries {before['queries']:>5} -> {m['queries']:<5} "
+                    f"median {change:+6.1f}%"
+                )
+                regressed = m['queries'] > before['queries']
+                self.stdout.write(self.style.WARNING(line) if regressed else line)
@@ -0,0 +1,40 @@
+# poolapp/management/commands/export_history.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from poolapp.export import FORMATS, TABLES, stream_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a season's pick and score history (picks, week results, profile aggregates) "
+        "as CSV or NDJSON, for every league or the given ones. Rows are written as they are "
+        "read, so memory use does not grow with the league."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, help='Season to export (default: settings.CURRENT_SEASON)')
+        parser.add_argument('--league', type=int, action='append', dest='leagues', help='League id (repeatable)')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson', help='Output format (default ndjson).')
+        parser.add_argument(
+            '--table', choices=list(TABLES), action='append', dest='tables',
+            help='Table to export (repeatable; CSV takes one, NDJSON defaults to all).'
+        )
+        parser.add_argument('--output', metavar='PATH', help='Write to PATH instead of stdout.')
+
+    def handle(self, *args, **options):
+        season = options['season'] or settings.CURRENT_SEASON
+        tables = options['tables'] or (['picks'] if options['format'] == 'csv' else list(TABLES))
+        try:
+            chunks = stream_export(options['format'], tables, season, league_ids=options['leagues'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        self.stderr.write(f"Wrote {options['output']}.")
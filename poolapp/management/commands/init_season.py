@@ -2,11 +2,11 @@ from django.core.management.base import BaseCommand, CommandError
 from django.core.files.base import ContentFile
 from django.core.files import File
 from django.conf import settings
-from django.utils import timezone
 
-from poolapp.models import Contestant, League, Week
+from poolapp.models import Contestant, League
+from poolapp.provisioning import provision_weeks, week_dates
 
-from zoneinfo import ZoneInfo
+from collections import Counter
 from io import BytesIO
 import datetime
 import json
@@ -135,34 +135,14 @@ class Command(BaseCommand):
             episodes = opts.get('episodes') or cfg.get('EPISODES') or 13
             lock_hour = opts.get('lock_hour_et') if opts.get('lock_hour_et') is not None else cfg.get('LOCK_HOUR_ET', 20)
             lock_weekday = opts.get('lock_weekday') if opts.get('lock_weekday') is not None else cfg.get('LOCK_WEEKDAY', 2)  # 2=Wed
-            eastern = ZoneInfo("America/New_York")
-
-            leagues = League.objects.all()
-            total_created = 0
+            # Every league's missing weeks (with results and reminders) in a few bulk statements
+            leagues = list(League.objects.all())
+            weeks = provision_weeks(leagues, season, week_dates(start_date, episodes, lock_hour, lock_weekday))
+            created_by_league = Counter(w.league_id for w in weeks)
+            total_created = len(weeks)
             for league in leagues:
-                created_count = 0
-                # If this league already has any Week rows for this season, we *ensure* all weeks exist (idempotent)
-                for n in range(1, episodes + 1):
-                    wk_start = start_date + datetime.timedelta(weeks=n - 1)
-                    days_to_target = (lock_weekday - wk_start.weekday()) % 7
-                    lock_date = wk_start + datetime.timedelta(days=days_to_target)
-                    naive_lock = datetime.datetime(
-                        lock_date.year, lock_date.month, lock_date.day,
-                        int(lock_hour), 0, 0, 0
-                    )
-                    lock_dt = timezone.make_aware(naive_lock, eastern)
-
-                    _, was_created = Week.objects.get_or_create(
-                        league=league,
-                        season=season,
-                        number=n,
-                        defaults={'start_date': wk_start, 'lock_time': lock_dt}
-                    )
-                    if was_created:
-                        created_count += 1
-                total_created += created_count
                 self.stdout.write(self.style.SUCCESS(
-                    f"[{league.name}] S{season}: ensured {episodes} week(s), created {created_count} new."
+                    f"[{league.name}] S{season}: ensured {episodes} week(s), created {created_by_league[league.id]} new."
                 ))
 
             self.stdout.write(self.style.SUCCESS(
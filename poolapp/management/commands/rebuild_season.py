@@ -0,0 +1,46 @@
+# poolapp/management/commands/rebuild_season.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import transaction
+from poolapp.models import League
+from poolapp.scoring import replay_league_season
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay every scored week of a season from the stored WeekResults and rebuild "
+        "picks, exile/elimination state, idols and totals (one transaction per league)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, help='Season to rebuild (default: settings.CURRENT_SEASON)')
+        parser.add_argument('--league', type=int, action='append', dest='leagues', help='League id (repeatable)')
+
+    def _notify(self, level, message):
+        if level == 'warning':
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(message)
+
+    def handle(self, *args, **options):
+        season = options['season'] or settings.CURRENT_SEASON
+        league_ids = League.objects.order_by('id').values_list('id', flat=True)
+        if options['leagues']:
+            league_ids = league_ids.filter(id__in=options['leagues'])
+
+        started = time.perf_counter()
+        for league_id in list(league_ids):
+            with transaction.atomic():
+                # Serializes with update_week_results and other rebuilds of this league
+                league = League.objects.select_for_update().get(id=league_id)
+                summary = replay_league_season(league, season, notify=self._notify)
+            self.stdout.write(
+                f"[{league.name}] replayed {summary['weeks']} week(s): "
+                f"{summary['picks']} pick(s), {summary['created']} created, {summary['profiles']} profile(s)."
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt Season {season} in {elapsed:.2f}s."))
@@ -0,0 +1,31 @@
+# poolapp/management/commands/reconcile_aggregates.py
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from poolapp.aggregates import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Check every UserProfile's maintained counters (total_score, correct guesses, idols) "
+        "against its Picks for a season and repair any drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, help='Season to reconcile (default: settings.CURRENT_SEASON)')
+        parser.add_argument('--league', type=int, action='append', dest='leagues', help='League id (repeatable)')
+        parser.add_argument('--check', action='store_true', help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        season = options['season'] or settings.CURRENT_SEASON
+        repair = not options['check']
+
+        drifted = reconcile(season, league_ids=options['leagues'], repair=repair)
+
+        for profile, diff in drifted:
+            fields = ", ".join(f"{k} {stored}->{expected}" for k, (stored, expected) in diff.items())
+            self.stdout.write(self.style.WARNING(f"[{profile.league.name}] {profile.user.username}: {fields}"))
+
+        verb = "Repaired" if repair else "Found"
+        style = self.style.SUCCESS if not drifted or repair else self.style.ERROR
+        self.stdout.write(style(f"{verb} drift on {len(drifted)} profile(s) for Season {season}."))
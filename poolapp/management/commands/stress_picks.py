@@ -0,0 +1,185 @@
+# poolapp/management/commands/stress_picks.py
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from poolapp.catalog import get_catalog
+from poolapp.models import Pick, UserProfile
+from poolapp.synthetic import build_season
+from poolapp.views import MIN_FLOOR_POINTS
+
+
+class Command(BaseCommand):
+    help = (
+        "Lock-time surge test: every member of a synthetic league submits picks for the open "
+        "week several times at once, from concurrent threads released together. Fails unless "
+        "every request is answered with 200 or 302 and each member's stored pick is one of the "
+        "submissions they sent (and, with --max-p99-ms, p99 latency stays under the bound). Runs "
+        "in a throwaway test database. On SQLite writers are serialized, so latency there says "
+        "little about PostgreSQL, where the profile row lock is what counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100, help='League members (default 100).')
+        parser.add_argument('--submissions', type=int, default=3, help='Simultaneous submissions per member (default 3).')
+        parser.add_argument('--threads', type=int, default=50, help='Concurrent client threads (default 50).')
+        parser.add_argument('--scored-weeks', type=int, default=3, help='Weeks already scored (default 3).')
+        parser.add_argument(
+            '--max-p99-ms', type=float,
+            help='Fail above this p99 latency (default: report it only; it varies a lot with the machine).'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Synthetic data seed.')
+
+    def handle(self, *args, **options):
+        if options['scored_weeks'] >= settings.SEASON_CONFIG[settings.CURRENT_SEASON]['EPISODES']:
+            raise CommandError("--scored-weeks must leave at least one open week.")
+
+        if connection.vendor == 'sqlite':
+            # Local runs: threads need a shared file database, and IMMEDIATE transactions make
+            # concurrent writers queue (up to `timeout`) instead of failing on lock upgrades
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), 'stress_test.sqlite3')
+            connection.settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=30)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = self._run(options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if report is None:
+            self.stdout.write(self.style.WARNING("Nothing to do: no member can submit picks for the open week."))
+            return
+        self.stdout.write(
+            f"{report['requests']} submissions from {report['members']} members on {report['threads']} threads "
+            f"in {report['wall_s']:.1f}s: p50 {report['p50_ms']:.0f} ms, p99 {report['p99_ms']:.0f} ms, "
+            f"max {report['max_ms']:.0f} ms; statuses {report['statuses']}"
+        )
+        problems = []
+        if report['errors']:
+            problems.append(f"{len(report['errors'])} request(s) failed, first: {report['errors'][0]}")
+        if report['missing'] or report['mismatched']:
+            problems.append(
+                f"{report['missing']} member(s) without a pick, "
+                f"{report['mismatched']} whose pick matches none of their submissions"
+            )
+        if options['max_p99_ms'] is not None and report['p99_ms'] > options['max_p99_ms']:
+            problems.append(f"p99 {report['p99_ms']:.0f} ms is over {options['max_p99_ms']:.0f} ms")
+        if problems:
+            raise CommandError("; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("Every request answered, each member's pick is one they submitted."))
+
+    def _run(self, options):
+        scored = options['scored_weeks']
+        league = build_season(1, options['members'], scored_weeks=scored, seed=options['seed'], prefix='stress')[0]
+        open_week = scored + 1
+        url = reverse('poolapp:make_picks', args=[league.id, open_week])
+
+        # Every member gets `submissions` competing POSTs, each with different picks
+        active = get_catalog(settings.CURRENT_SEASON).active
+        submitted = {}
+        jobs = []
+        # Members below the points floor are refused by design, so they sit the surge out,
+        # as do members who have used every active contestant as Safe already
+        profiles = (
+            UserProfile.objects.filter(league=league, eliminated=False, total_score__gte=MIN_FLOOR_POINTS)
+            .select_related('user').order_by('id')
+        )
+        for prof in profiles:
+            client = Client()
+            client.force_login(prof.user)
+            taken = set(Pick.objects.filter(user_profile=prof).values_list('safe_pick_id', flat=True))
+            free = [c for c in active if c.id not in taken]
+            if not free:
+                continue
+            submitted[prof.id] = set()
+            for n in range(options['submissions']):
+                safe = free[n % len(free)]
+                data = {
+                    'submit_picks': '1',
+                    'safe_pick': safe.id,
+                    'voted_out_pick': next(c for c in active if c != safe).id,
+                    'imty_challenge_winner_pick': active[-1 - n % 2].id,
+                    'wager_voted_out': 0,
+                    'wager_immunity': 0,
+                }
+                jobs.append((client, data))
+                submitted[prof.id].add(
+                    (data['safe_pick'], data['voted_out_pick'], data['imty_challenge_winner_pick'])
+                )
+        connections.close_all()  # threads open their own connections
+        if not jobs:
+            return None
+
+        timings, statuses, errors = [], Counter(), []
+        lock = threading.Lock()
+        start = threading.Barrier(min(options['threads'], len(jobs)))
+        pending = iter(jobs)
+
+        def worker():
+            start.wait()  # release every thread at once
+            try:
+                while True:
+                    with lock:
+                        job = next(pending, None)
+                    if job is None:
+                        return
+                    client, data = job
+                    started = time.perf_counter()
+                    try:
+                        status = client.post(url, data).status_code
+                    except Exception as e:  # an unhandled error in the view is what we look for
+                        status, error = 'error', repr(e)
+                    else:
+                        # Saved (302) or re-shown with a message (200); anything else is a failure
+                        error = None if status in (200, 302) else f"HTTP {status}"
+                    with lock:
+                        timings.append((time.perf_counter() - started) * 1000)
+                        statuses[status] += 1
+                        if error:
+                            errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(start.parties)]
+        wall = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall_s = time.perf_counter() - wall
+
+        # One Pick per member is the unique constraint's job; serialization must leave a
+        # whole submission, not fields mixed from competing ones
+        stored = {
+            profile_id: picks
+            for profile_id, *picks in Pick.objects.filter(week__league=league, week__number=open_week)
+            .values_list('user_profile_id', 'safe_pick_id', 'voted_out_pick_id', 'imty_challenge_winner_pick_id')
+        }
+        timings.sort()
+        return {
+            'members': len(submitted),
+            'requests': len(jobs),
+            'threads': start.parties,
+            'wall_s': wall_s,
+            'p50_ms': statistics.median(timings),
+            'p99_ms': timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+            'max_ms': timings[-1],
+            'statuses': dict(statuses),
+            'errors': errors,
+            'missing': sum(1 for pid in submitted if pid not in stored),
+            'mismatched': sum(
+                1 for pid, choices in submitted.items() if pid in stored and tuple(stored[pid]) not in choices
+            ),
+        }
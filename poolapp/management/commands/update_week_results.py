@@ -1,12 +1,15 @@
 # poolapp/management/commands/update_week_results.py
 
 from django.core.management.base import BaseCommand
-from django.db.models import Sum
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, timedelta
-from poolapp.models import Week, League, WeekResult, Pick, UserProfile, Contestant
-import random
+from poolapp import pick_buffer
+from poolapp.catalog import bump_contestants_version
+from poolapp.models import Week, League, WeekResult, Contestant
+from poolapp.scoring import plan_weeks, resolve_outcome, result_fields, score_week, score_weeks
+import json
 
 
 class Command(BaseCommand):
@@ -21,14 +24,60 @@ class Command(BaseCommand):
         parser.add_argument('week_number', type=int, help="Week number to update.")
         parser.add_argument('voted_out_contestant', type=str, help="Name of the contestant who was voted out.")
         parser.add_argument('imty_challenge_winner', type=str, help="Name of the contestant (or tribe) that won immunity.")
+        parser.add_argument(
+            '--single-pass', action='store_true',
+            help="Score every league's week in one batched pass instead of league by league."
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Compute every league's results in memory and print the diff against the DB; write nothing."
+        )
+        parser.add_argument(
+            '--export', type=str, metavar='PATH',
+            help="With --dry-run, also write the diff to PATH as JSON."
+        )
+        parser.add_argument(
+            '--celery', action='store_true',
+            help="Fan scoring out to Celery workers (one task per chunk of leagues, gathered by a chord)."
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1,
+            help="Leagues per Celery task when using --celery (default 1 = one task per league)."
+        )
+        parser.add_argument(
+            '--wait', type=int, default=0, metavar='SECONDS',
+            help="With --celery, block up to SECONDS for the chord and print the per-league summary."
+        )
+
+    def _notify(self, level, message):
+        style = {
+            'warning': self.style.WARNING,
+            'error': self.style.ERROR,
+            'success': self.style.SUCCESS,
+        }.get(level, str)
+        self.stdout.write(style(message))
+
+    def _in_window(self, week, league_name, now, window):
+        """Recency guard (±60 days) on the week's lock_time (or start_date at noon)."""
+        ref_dt = week.lock_time
+        if not ref_dt and week.start_date:
+            naive = datetime(
+                year=week.start_date.year, month=week.start_date.month, day=week.start_date.day,
+                hour=12, minute=0, second=0, microsecond=0
+            )
+            ref_dt = timezone.make_aware(naive, timezone.get_current_timezone())
 
-    # Deterministic picker so re-runs don't reshuffle
-    def _stable_choice(self, candidates, seed_tuple):
-        if not candidates:
-            return None
-        candidates = sorted(candidates, key=lambda c: (c.id, c.name))
-        rnd = random.Random(hash(seed_tuple))
-        return candidates[rnd.randrange(len(candidates))]
+        if not ref_dt:
+            self.stdout.write(self.style.NOTICE(
+                f"Skipping Week {week.number} for '{league_name}': no lock_time/start_date to validate recency."
+            ))
+            return False
+        if ref_dt < (now - window) or ref_dt > (now + window):
+            self.stdout.write(self.style.NOTICE(
+                f"Skipping Week {week.number} (ref {ref_dt:%Y-%m-%d}) for '{league_name}': outside ±60 days."
+            ))
+            return False
+        return True
 
     def handle(self, *args, **options):
         season = getattr(settings, "CURRENT_SEASON", None)
@@ -43,6 +92,45 @@ class Command(BaseCommand):
         now = timezone.now()
         window = timedelta(days=60)
 
+        # Season-level facts are the same for every league: resolve them once
+        try:
+            outcome = resolve_outcome(season, voted_out_contestant_name, imty_challenge_winner_name)
+        except Contestant.DoesNotExist:
+            self.stdout.write(self.style.ERROR(
+                f"Contestant '{voted_out_contestant_name}' not found for Season {season}."
+            ))
+            return
+        voted_out_contestant = outcome.voted_out
+
+        # Lock-time barrier: submissions still queued by make_picks (settings.PICK_BUFFER)
+        week_ids = Week.objects.filter(number=week_number, season=season).values_list('id', flat=True)
+        if options['dry_run']:
+            pending = pick_buffer.pending_count(week_ids)
+            if pending:
+                self.stdout.write(self.style.WARNING(
+                    f"{pending} buffered submission(s) not yet written are left out of the dry run."
+                ))
+            self._handle_dry_run(season, week_number, outcome, now, window, options['export'])
+            return
+
+        # Mark the booted contestant inactive (UX). The outcome's contestant is the shared
+        # catalog instance, so write the row and move the catalog to a new version instead
+        if voted_out_contestant.is_active:
+            Contestant.objects.filter(pk=voted_out_contestant.pk).update(is_active=False)
+            bump_contestants_version(season)
+            self.stdout.write(self.style.SUCCESS(f"Marked '{voted_out_contestant_name}' as voted out."))
+
+        flushed = pick_buffer.flush(week_ids)
+        if flushed:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {flushed} buffered pick(s) before scoring."))
+
+        if options['single_pass']:
+            self._handle_single_pass(season, week_number, outcome, now, window)
+            return
+        if options['celery']:
+            self._handle_celery(season, week_number, outcome, now, window, options['chunk_size'], options['wait'])
+            return
+
         leagues = League.objects.all()
 
         for league in leagues:
@@ -57,256 +145,149 @@ class Command(BaseCommand):
                 ))
                 continue
 
-            # ----- Recency guard (±60 days) -----
-            ref_dt = week.lock_time
-            if not ref_dt and week.start_date:
-                naive = datetime(
-                    year=week.start_date.year, month=week.start_date.month, day=week.start_date.day,
-                    hour=12, minute=0, second=0, microsecond=0
-                )
-                ref_dt = timezone.make_aware(naive, timezone.get_current_timezone())
-
-            if ref_dt:
-                if ref_dt < (now - window) or ref_dt > (now + window):
-                    self.stdout.write(self.style.NOTICE(
-                        f"Skipping Week {week.number} (ref {ref_dt:%Y-%m-%d}) for '{league.name}': outside ±60 days."
-                    ))
-                    continue
-            else:
-                self.stdout.write(self.style.NOTICE(
-                    f"Skipping Week {week.number} for '{league.name}': no lock_time/start_date to validate recency."
-                ))
+            if not self._in_window(week, league.name, now, window):
                 continue
-            # ------------------------------------
 
-            # Current-season contestants
-            try:
-                voted_out_contestant = Contestant.objects.get(name=voted_out_contestant_name, season=season)
-            except Contestant.DoesNotExist:
-                self.stdout.write(self.style.ERROR(
-                    f"Contestant '{voted_out_contestant_name}' not found for Season {season}."
+            with transaction.atomic():
+                # Row lock on the league: concurrent runs (CLI or Celery) serialize per league
+                League.objects.select_for_update().get(id=league.id)
+
+                # Persist result
+                week_result, created = WeekResult.objects.update_or_create(week=week, defaults=result_fields(outcome))
+                self.stdout.write(self.style.SUCCESS(
+                    f"{'Created' if created else 'Updated'} result for Week {week_number}."
                 ))
-                continue
 
-            # Immunity winner may be a contestant or (pre-merge) a tribe keyword
-            try:
-                imty_challenge_winner = Contestant.objects.get(name=imty_challenge_winner_name, season=season)
-                winner_tribe = imty_challenge_winner.tribe
-            except Contestant.DoesNotExist:
-                imty_challenge_winner = None
-                winner_tribe = imty_challenge_winner_name  # Treat arg as tribe string
-
-            # Mark the booted contestant inactive (UX)
-            if voted_out_contestant.is_active:
-                voted_out_contestant.is_active = False
-                voted_out_contestant.save()
-                self.stdout.write(self.style.SUCCESS(f"Marked '{voted_out_contestant_name}' as voted out."))
-
-            # Persist result
-            week_result, created = WeekResult.objects.get_or_create(week=week)
-            week_result.voted_out_contestant = voted_out_contestant
-            week_result.save()
+                # Score the week: one batched pass over picks, bulk writes, grouped aggregates
+                summary = score_week(week, outcome, notify=self._notify)
+            self.stdout.write(
+                f"Scored {summary['picks']} pick(s) across {summary['profiles']} profile(s)."
+            )
+
             self.stdout.write(self.style.SUCCESS(
-                f"{'Created' if created else 'Updated'} result for Week {week_number}."
+                f"Week {week_number} processed for league '{league.name}' (Season {season})."
             ))
 
-            # Tribe vs merge detection within current season
-            n_tribes = Contestant.objects.filter(season=season).values('tribe').distinct().count()
+    def _handle_single_pass(self, season, week_number, outcome, now, window):
+        """
+        Cross-league mode: fetch every league's Week with this number in one query,
+        persist all WeekResults in bulk and score every pick in one batched pass.
+        """
+        all_weeks = Week.objects.filter(number=week_number, season=season).select_related('league')
+        weeks = [w for w in all_weeks if self._in_window(w, w.league.name, now, window)]
+        if not weeks:
+            self.stdout.write(self.style.WARNING(
+                f"No league has a scoreable Week {week_number} (Season {season}). Nothing to do."
+            ))
+            return
 
-            # All profiles in this league
-            profiles = UserProfile.objects.filter(league=league).select_related('user')
+        with transaction.atomic():
+            # Lock every league being scored (same lock the per-league and Celery paths take)
+            list(League.objects.select_for_update().filter(id__in=[w.league_id for w in weeks]).order_by('id'))
 
-            # Precompute prior-week idol availability (current season)
-            prior_available = {}
-            for prof in profiles:
-                prior_picks = Pick.objects.filter(
-                    user_profile=prof,
-                    week__league=league,
-                    week__season=season,
-                    week__number__lt=week.number
-                )
-                earned_prior = prior_picks.filter(voted_out_pick_correct=True).count()   # each VO correct earns an idol
-                used_prior = prior_picks.filter(used_immunity_idol=True).count()
-                prior_available[prof.id] = max(0, earned_prior - used_prior)
-
-            # Map existing picks for this week
-            existing_picks = {p.user_profile_id: p for p in Pick.objects.filter(week=week)}
-
-            # Active contestants (current season) for auto-assign Safe
-            active_contestants = list(Contestant.objects.filter(season=season, is_active=True))
-
-            # For any profile missing a Pick, create a **non-blank** Pick:
-            # 1) If idol available -> create with used_immunity_idol=True
-            # 2) Else -> auto-assign Safe from unused active contestants
-            created_count = 0
-            for prof in profiles:
-                if prof.id in existing_picks:
-                    continue
-
-                if prior_available.get(prof.id, 0) > 0:
-                    pick = Pick.objects.create(
-                        user_profile=prof,
-                        week=week,
-                        used_immunity_idol=True,
-                        auto_assigned=True
-                    )
-                    prior_available[prof.id] -= 1
-                    existing_picks[prof.id] = pick
-                    created_count += 1
-                    self.stdout.write(self.style.WARNING(
-                        f"Auto-burned an idol for {prof.user.username} (missed week)."
-                    ))
-                else:
-                    # determine unused safe candidates
-                    prev_safe_ids = set(
-                        Pick.objects.filter(
-                            user_profile=prof,
-                            week__league=league,
-                            week__season=season,
-                            week__number__lt=week.number
-                        ).values_list('safe_pick_id', flat=True)
-                    )
-                    candidates = [c for c in active_contestants if c.id not in prev_safe_ids]
-                    chosen = self._stable_choice(candidates, (prof.id, week.id))
-                    pick = Pick.objects.create(
-                        user_profile=prof,
-                        week=week,
-                        safe_pick=chosen,  # may be None if no candidates remain
-                        auto_assigned=True
-                    )
-                    existing_picks[prof.id] = pick
-                    created_count += 1
-                    if chosen:
-                        self.stdout.write(self.style.WARNING(
-                            f"Auto-assigned Safe Pick for {prof.user.username}: {chosen.name}"
-                        ))
-                    else:
-                        self.stdout.write(self.style.WARNING(
-                            f"No available Safe candidate to auto-assign for {prof.user.username}."
-                        ))
-
-            if created_count:
-                self.stdout.write(self.style.WARNING(f"Created {created_count} pick(s) for users with no submission."))
-
-            # Iterate all picks (now includes newly created) for correctness + scoring + elimination logic
-            picks = Pick.objects.filter(week=week).select_related(
-                'user_profile', 'safe_pick', 'voted_out_pick', 'imty_challenge_winner_pick'
-            )
+            # Persist results for every league in two statements
+            results = {r.week_id: r for r in WeekResult.objects.filter(week__in=weeks)}
+            missing = [WeekResult(week=w) for w in weeks if w.id not in results]
+            WeekResult.objects.bulk_create(missing)
+            WeekResult.objects.filter(week__in=weeks).update(**result_fields(outcome))
+            self.stdout.write(self.style.SUCCESS(
+                f"Recorded Week {week_number} result for {len(weeks)} league(s) ({len(missing)} created)."
+            ))
 
-            for pick in picks:
-                profile = pick.user_profile
-
-                # Correctness flags
-                pick.safe_pick_correct = bool(pick.safe_pick and pick.safe_pick_id != voted_out_contestant.id)
-                pick.voted_out_pick_correct = bool(pick.voted_out_pick and pick.voted_out_pick_id == voted_out_contestant.id)
-
-                if pick.imty_challenge_winner_pick:
-                    if n_tribes > 1 and winner_tribe:
-                        pick.imty_challenge_winner_pick_correct = (
-                            pick.imty_challenge_winner_pick.tribe == winner_tribe
-                        )
-                    else:
-                        pick.imty_challenge_winner_pick_correct = (
-                            imty_challenge_winner is not None and
-                            pick.imty_challenge_winner_pick_id == imty_challenge_winner.id
-                        )
-                else:
-                    pick.imty_challenge_winner_pick_correct = False
-
-                # Check exile status BEFORE this week's pick (prevent double-trigger bug)
-                was_exiled_before = profile.exiled
-                was_eliminated_before = profile.eliminated
-                
-                # Safe=boot && no idol && week>1 && not permanently eliminated -> EXILE
-                if (
-                    pick.safe_pick_id == voted_out_contestant.id and
-                    not pick.used_immunity_idol and
-                    not was_exiled_before and  # Use captured state
-                    not was_eliminated_before and  # Don't exile if already permanently eliminated
-                    week.number > 1
-                ):
-                    profile.exiled = True
-                    profile.save()
-                    self.stdout.write(self.style.WARNING(
-                        f"{profile.user.username} has been exiled (Safe pick went home; no idol)."
-                    ))
-
-                # Already EXILED and Safe hits boot again (no idol) -> permanent elimination
-                elif (
-                    was_exiled_before and  # Use captured state
-                    not was_eliminated_before and  # Not already permanently eliminated
-                    (pick.safe_pick_id == voted_out_contestant.id) and
-                    (not pick.used_immunity_idol) and
-                    week.number > 1
-                ):
-                    profile.eliminated = True  # Permanent elimination
-                    profile.exiled = False  # Clear exile flag (they're now permanently out)
-                    profile.save()
-                    self.stdout.write(self.style.ERROR(
-                        f"{profile.user.username} was already exiled and missed Safe again: ELIMINATED (permanent)."
-                    ))
-
-                # --- Points (idempotent) ---
-                # Calculate base points BEFORE parlay logic (so correctness flags preserved for idol calc)
-                base_safe = 1 if pick.safe_pick_correct else 0
-                base_vo = 3 if pick.voted_out_pick_correct else 0
-                base_im = 2 if pick.imty_challenge_winner_pick_correct else 0
-
-                # ---------------------------
-                #   PARLAY: all-or-nothing
-                # ---------------------------
-                # IMPORTANT: Don't modify correctness flags! They're needed for idol inventory calculation
-                # Instead, set base points to 0 if parlay fails
-                parlay_all_or_nothing = False
-                if getattr(pick, 'parlay', False):
-                    if not (pick.voted_out_pick_correct and pick.imty_challenge_winner_pick_correct):
-                        parlay_all_or_nothing = True
-                        # Zero out VO and Immunity points but preserve correctness flags
-                        base_vo = 0
-                        base_im = 0
-
-                wv = getattr(pick, 'wager_voted_out', 0) or 0
-                wi = getattr(pick, 'wager_immunity', 0) or 0
-
-                if parlay_all_or_nothing:
-                    wager_gain_vo = -wv
-                    wager_gain_im = -wi
-                    points_wagers = wager_gain_vo + wager_gain_im
-                    parlay_bonus = 0
-                else:
-                    wager_gain_vo = (2 * wv) if pick.voted_out_pick_correct else -wv
-                    wager_gain_im = int(1.5 * wi) if pick.imty_challenge_winner_pick_correct else -wi
-                    points_wagers = wager_gain_vo + wager_gain_im
-                    parlay_bonus = 0
-                    if getattr(pick, 'parlay', False) and pick.voted_out_pick_correct and pick.imty_challenge_winner_pick_correct:
-                        parlay_bonus = 20  # Huge bonus for hitting the ~0.3% parlay!
-
-                pick.points_safe = base_safe
-                pick.points_vo = base_vo
-                pick.points_immunity = base_im
-                pick.points_wagers = points_wagers
-                pick.points_parlay = parlay_bonus
-                pick.points_week_total = base_safe + base_vo + base_im + points_wagers + parlay_bonus
-
-                pick.save()
-
-            # --- Recompute aggregates (CURRENT_SEASON only) ---
-            for prof in UserProfile.objects.filter(league=league):
-                prof_picks = Pick.objects.filter(user_profile=prof, week__league=league, week__season=season)
-
-                safe_correct = prof_picks.filter(safe_pick_correct=True).count()
-                voted_correct = prof_picks.filter(voted_out_pick_correct=True).count()
-                challenge_correct = prof_picks.filter(imty_challenge_winner_pick_correct=True).count()
-                idols_used = prof_picks.filter(used_immunity_idol=True).count()
-                picks_total = prof_picks.aggregate(s=Sum('points_week_total'))['s'] or 0
-
-                prof.correct_guesses = safe_correct
-                prof.correct_imty_challenge_guesses = challenge_correct
-                prof.immunity_idols_played = idols_used
-                prof.immunity_idols = max(0, voted_correct - idols_used)
-                prof.total_score = picks_total - prof.exile_return_cost
-                prof.save()
+            summary = score_weeks(weeks, outcome, notify=self._notify)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Week {week_number} processed in one pass: {summary['leagues']} league(s), "
+            f"{summary['picks']} pick(s), {summary['profiles']} profile(s) (Season {season})."
+        ))
+
+    def _handle_celery(self, season, week_number, outcome, now, window, chunk_size, wait):
+        """
+        Fan out one task per chunk of leagues and gather them with a chord whose
+        callback reports a per-league summary. Each task locks its League row.
+        """
+        from celery import chord
+        from poolapp.tasks import score_leagues_week, summarize_league_scoring
+
+        weeks = Week.objects.filter(number=week_number, season=season).select_related('league')
+        league_ids = [w.league_id for w in weeks if self._in_window(w, w.league.name, now, window)]
+        if not league_ids:
+            self.stdout.write(self.style.WARNING(
+                f"No league has a scoreable Week {week_number} (Season {season}). Nothing to do."
+            ))
+            return
 
-            self.stdout.write(self.style.SUCCESS(
-                f"Week {week_number} processed for league '{league.name}' (Season {season})."
-            ))
\ No newline at end of file
+        chunk_size = max(1, chunk_size)
+        chunks = [league_ids[i:i + chunk_size] for i in range(0, len(league_ids), chunk_size)]
+        imty_winner_id = outcome.imty_winner.id if outcome.imty_winner else None
+        header = [
+            score_leagues_week.s(chunk, week_number, season, outcome.voted_out.id, imty_winner_id, outcome.winner_tribe)
+            for chunk in chunks
+        ]
+        result = chord(header)(summarize_league_scoring.s(week_number))
+        self.stdout.write(self.style.SUCCESS(
+            f"Dispatched {len(chunks)} scoring task(s) for {len(league_ids)} league(s); chord id {result.id}."
+        ))
+
+        if not wait:
+            return
+        report = result.get(timeout=wait)
+        for s in report['leagues']:
+            if s['status'] == 'scored':
+                self.stdout.write(
+                    f"  {s['league']}: {s['picks']} pick(s), {s['created']} auto-assigned, {s['profiles']} profile(s)"
+                )
+            else:
+                self.stdout.write(self.style.WARNING(f"  {s['league'] or s['league_id']}: {s['status']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Week {week_number}: {report['scored']} league(s) scored, {report['skipped']} skipped, "
+            f"{report['picks']} pick(s)."
+        ))
+
+    def _handle_dry_run(self, season, week_number, outcome, now, window, export_path):
+        """
+        Preview: plan every league's week with batched reads only (no locks, no writes)
+        and print a compact diff against the current DB state.
+        """
+        weeks = Week.objects.filter(number=week_number, season=season).select_related('league', 'result')
+        weeks = [w for w in weeks if self._in_window(w, w.league.name, now, window)]
+
+        rows = []
+        if outcome.voted_out.is_active:
+            rows.append({'league': None, 'user': None, 'week': week_number, 'kind': 'contestant',
+                         'changes': {f'{outcome.voted_out.name}.is_active': [True, False]}})
+        for w in weeks:
+            current = getattr(w, 'result', None)
+            stored = {
+                'voted_out_contestant': current.voted_out_contestant_id,
+                'imty_challenge_winner': current.imty_challenge_winner_id,
+                'imty_winner_tribe': current.imty_winner_tribe,
+            } if current else {}
+            changes = {}
+            for field, value in result_fields(outcome).items():
+                value = getattr(value, 'id', value)
+                if stored.get(field) != value:
+                    changes[field] = [stored.get(field), value]
+            if changes:
+                rows.append({'league': w.league.name, 'user': None, 'week': w.number, 'kind': 'result',
+                             'changes': changes})
+
+        plan = plan_weeks(weeks, outcome, notify=self._notify, lock=False)
+        rows.extend(plan.diff())
+
+        for row in rows:
+            changes = ", ".join(f"{f} {old}->{new}" for f, (old, new) in row['changes'].items())
+            who = f" {row['user']}" if row['user'] is not None else ""
+            where = f"[{row['league']}] " if row['league'] else ""
+            self.stdout.write(f"{where}W{row['week']}{who} {row['kind']}: {changes}")
+
+        summary = plan.summary()
+        self.stdout.write(self.style.SUCCESS(
+            f"DRY RUN Week {week_number}: {len(rows)} change(s) across {summary['leagues']} league(s), "
+            f"{summary['picks']} pick(s) ({summary['created']} new), {summary['profiles']} profile(s). Nothing written."
+        ))
+
+        if export_path:
+            with open(export_path, 'w') as f:
+                json.dump({'season': season, 'week': week_number, 'summary': summary, 'changes': rows}, f, indent=1)
+            self.stdout.write(f"Diff written to {export_path}")
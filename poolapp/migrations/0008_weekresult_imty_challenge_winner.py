@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poolapp', '0007_pick_auto_assigned'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weekresult',
+            name='imty_challenge_winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='immunity_results', to='poolapp.contestant'),
+        ),
+        migrations.AddField(
+            model_name='weekresult',
+            name='imty_winner_tribe',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_ledger(apps, schema_editor):
+    """One earned entry per correct Voted Out pick, one spent entry per idol played."""
+    Pick = apps.get_model('poolapp', 'Pick')
+    IdolLedgerEntry = apps.get_model('poolapp', 'IdolLedgerEntry')
+    entries = []
+    picks = (
+        Pick.objects.filter(models.Q(voted_out_pick_correct=True) | models.Q(used_immunity_idol=True))
+        .values_list('user_profile_id', 'week_id', 'voted_out_pick_correct', 'used_immunity_idol')
+    )
+    for profile_id, week_id, earned, spent in picks.iterator():
+        if earned:
+            entries.append(IdolLedgerEntry(user_profile_id=profile_id, week_id=week_id, kind='earned', amount=1))
+        if spent:
+            entries.append(IdolLedgerEntry(user_profile_id=profile_id, week_id=week_id, kind='spent', amount=-1))
+    IdolLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poolapp', '0008_weekresult_imty_challenge_winner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdolLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('earned', 'Earned'), ('spent', 'Spent')], max_length=6)),
+                ('amount', models.SmallIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idol_entries', to='poolapp.userprofile')),
+                ('week', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idol_entries', to='poolapp.week')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_profile', 'week'], name='poolapp_ido_user_pr_5ff9af_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
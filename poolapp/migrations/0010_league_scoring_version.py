@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poolapp', '0009_idolledgerentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='league',
+            name='scoring_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
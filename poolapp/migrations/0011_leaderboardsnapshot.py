@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poolapp', '0010_league_scoring_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.IntegerField()),
+                ('rank_change', models.IntegerField(blank=True, null=True)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rank_snapshots', to='poolapp.userprofile')),
+                ('week', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rank_snapshots', to='poolapp.week')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week', 'rank'], name='poolapp_lea_week_id_b07f26_idx')],
+                'unique_together': {('user_profile', 'week')},
+            },
+        ),
+    ]
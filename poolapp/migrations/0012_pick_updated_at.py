@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poolapp', '0011_leaderboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pick',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:19
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_ordinals(apps, schema_editor):
+    """Number each season's contestants 0, 1, ... in creation order."""
+    Contestant = apps.get_model('poolapp', 'Contestant')
+    next_ordinal = defaultdict(int)
+    contestants = list(Contestant.objects.order_by('season', 'id'))
+    for contestant in contestants:
+        contestant.ordinal = next_ordinal[contestant.season]
+        next_ordinal[contestant.season] += 1
+    Contestant.objects.bulk_update(contestants, ['ordinal'], batch_size=1000)
+
+
+def backfill_masks(apps, schema_editor):
+    """Each profile's used-Safe masks for the latest season it has picks in."""
+    Pick = apps.get_model('poolapp', 'Pick')
+    UserProfile = apps.get_model('poolapp', 'UserProfile')
+    masks = {}  # profile_id -> [season, used, other]
+    picks = (
+        Pick.objects.filter(safe_pick__isnull=False)
+        .order_by('user_profile_id', 'week__season')
+        .values_list(
+            'user_profile_id', 'week__season', 'safe_pick__ordinal',
+            'voted_out_pick_id', 'imty_challenge_winner_pick_id',
+        )
+    )
+    for profile_id, season, ordinal, voted_out_id, imty_id in picks.iterator():
+        entry = masks.get(profile_id)
+        if entry is None or entry[0] != season:
+            entry = masks[profile_id] = [season, 0, 0]
+        entry[1 if voted_out_id and imty_id else 2] |= 1 << ordinal
+    profiles = list(UserProfile.objects.filter(id__in=masks))
+    for profile in profiles:
+        profile.safe_mask_season, profile.used_safe_mask, profile.other_safe_mask = masks[profile.id]
+    UserProfile.objects.bulk_update(
+        profiles, ['safe_mask_season', 'used_safe_mask', 'other_safe_mask'], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poolapp', '0012_pick_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contestant',
+            name='ordinal',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='other_safe_mask',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='safe_mask_season',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='used_safe_mask',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ordinals, migrations.RunPython.noop),
+        migrations.RunPython(backfill_masks, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='contestant',
+            unique_together={('season', 'name'), ('season', 'ordinal')},
+        ),
+    ]
@@ -12,6 +12,8 @@ class League(models.Model):
     name = models.CharField(max_length=100, unique=True)
     members = models.ManyToManyField(User, related_name='leagues', blank=True)
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_leagues')
+    # Bumped in the same transaction as any write to the standings (see poolapp.leaderboard)
+    scoring_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.name
@@ -24,9 +26,33 @@ class Contestant(models.Model):
     photo = models.ImageField(upload_to='contestants/photos/',default="default_images/Unknown1.jpeg")
     tribe = models.CharField(max_length=50, blank=True, null=True)
     bio_link = models.URLField(max_length=255, blank=True, null=True)
+    # Stable position within the season (assigned on create): bit `ordinal` in the Safe pick masks
+    ordinal = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+
+    MAX_PER_SEASON = 63  # the masks are signed 64-bit integers
 
     class Meta:
-        unique_together = ('season', 'name')
+        unique_together = [('season', 'name'), ('season', 'ordinal')]
+
+    def save(self, *args, **kwargs):
+        if self.ordinal is None:
+            taken = Contestant.objects.filter(season=self.season).aggregate(m=models.Max('ordinal'))['m']
+            self.ordinal = 0 if taken is None else taken + 1
+        if self.ordinal >= self.MAX_PER_SEASON:
+            raise ValidationError(f"Season {self.season} already has {self.MAX_PER_SEASON} contestants.")
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the contestant card showed when loaded (see poolapp.catalog)
+        if not instance.get_deferred_fields():
+            instance._card_snapshot = instance.card_state()
+        return instance
+
+    def card_state(self):
+        """Everything the season's contestant cards render for this contestant."""
+        return (self.name, self.is_active, self.tribe, self.photo.name, self.bio, self.bio_link)
 
     def __str__(self):
         return self.name
@@ -86,7 +112,11 @@ class Week(models.Model):
 class WeekResult(models.Model):
     week = models.OneToOneField(Week, on_delete=models.CASCADE, related_name='result')
     voted_out_contestant = models.ForeignKey(Contestant, on_delete=models.SET_NULL, null=True)
-    #imty_challenge_winner = models.ForeignKey(Contestant, on_delete=models.SET_NULL, null=True)
+    # Immunity winner: a contestant post-merge, or just the winning tribe name pre-merge
+    imty_challenge_winner = models.ForeignKey(
+        Contestant, on_delete=models.SET_NULL, null=True, blank=True, related_name='immunity_results'
+    )
+    imty_winner_tribe = models.CharField(max_length=50, blank=True, null=True)
 
     def __str__(self):
         return f"Result for {self.week}: {self.voted_out_contestant}"
@@ -102,6 +132,11 @@ class UserProfile(models.Model):
     total_score = models.IntegerField(default=0)
     eliminated = models.BooleanField(default=False)  # Permanent elimination (cannot return)
     exile_return_cost = models.IntegerField(default=0)  # Cumulative points spent returning from exile
+    # Contestants used as Safe in `safe_mask_season`, one bit per Contestant.ordinal (see poolapp.safe_masks):
+    # chosen by the member (Voted Out and Immunity picked too), and every other Safe pick (auto-assigned etc.)
+    safe_mask_season = models.PositiveIntegerField(null=True, blank=True)
+    used_safe_mask = models.BigIntegerField(default=0)
+    other_safe_mask = models.BigIntegerField(default=0)
 
     class Meta:
         unique_together = ('user', 'league')  # Ensures one profile per user per league
@@ -109,12 +144,66 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.league.name}"
     
+class IdolLedgerEntry(models.Model):
+    """
+    Append-only record of immunity idols earned (correct Voted Out pick) and
+    spent (idol played), keyed by profile and week. A rescored or edited pick
+    appends a correcting entry instead of rewriting history; the sum of
+    `amount` is the profile's idol balance (maintained in UserProfile.immunity_idols).
+    """
+    EARNED = 'earned'
+    SPENT = 'spent'
+    KIND_CHOICES = [(EARNED, 'Earned'), (SPENT, 'Spent')]
+
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='idol_entries')
+    week = models.ForeignKey(Week, on_delete=models.CASCADE, related_name='idol_entries')
+    kind = models.CharField(max_length=6, choices=KIND_CHOICES)
+    amount = models.SmallIntegerField()  # +1 earned, -1 spent; corrections carry the opposite sign
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_profile', 'week']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_profile} {self.kind} {self.amount:+d} (Week {self.week_id})"
+
+class LeaderboardSnapshot(models.Model):
+    """
+    A profile's standing after a week was scored: rank within the league
+    (ties share a rank), score through that week, and places gained since the
+    previous week (None for the first snapshot). Written by the scoring run.
+    """
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='rank_snapshots')
+    week = models.ForeignKey(Week, on_delete=models.CASCADE, related_name='rank_snapshots')
+    rank = models.PositiveIntegerField()
+    score = models.IntegerField()
+    rank_change = models.IntegerField(null=True, blank=True)  # positive = moved up
+
+    class Meta:
+        unique_together = ('user_profile', 'week')
+        indexes = [
+            models.Index(fields=['week', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_profile} #{self.rank} (Week {self.week_id})"
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     # Add any general user fields here, e.g., bio, avatar, etc.
     bio = models.TextField(blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the avatar the cached leaderboards show (see poolapp.leaderboard)
+        if not instance.get_deferred_fields():
+            instance._avatar_snapshot = instance.avatar.name
+        return instance
+
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
@@ -161,6 +250,7 @@ class Pick(models.Model):
     points_parlay = models.IntegerField(default=0)
     points_week_total = models.IntegerField(default=0)
     auto_assigned = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)  # conditional GETs (poolapp.etags)
 
     def clean(self):
         # Only enforce pick presence and not-equal rule if idol not used
@@ -197,5 +287,25 @@ class Pick(models.Model):
         self.clean()
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this row contributed to the profile counters when loaded,
+        # so saves can apply a delta instead of recounting (see poolapp.aggregates)
+        if not instance.get_deferred_fields():
+            instance._counter_snapshot = instance.counter_contribution()
+        return instance
+
+    def counter_contribution(self):
+        """This pick's share of its UserProfile's maintained counters."""
+        return {
+            'total_score': self.points_week_total or 0,
+            'correct_guesses': int(bool(self.safe_pick_correct)),
+            'correct_imty_challenge_guesses': int(bool(self.imty_challenge_winner_pick_correct)),
+            'immunity_idols_played': int(bool(self.used_immunity_idol)),
+            # each VO correct earns an idol, each idol used spends one
+            'immunity_idols': int(bool(self.voted_out_pick_correct)) - int(bool(self.used_immunity_idol)),
+        }
+
     def __str__(self):
         return f"{self.user_profile.user.username} picks for Week {self.week.number}"
\ No newline at end of file
@@ -0,0 +1,226 @@
+# poolapp/pick_buffer.py
+
+"""
+Optional write-behind buffer for pick submissions (settings.PICK_BUFFER).
+
+Most of a week's submissions arrive in the hour before lock. With the buffer
+on, make_picks validates a submission against the cached PickContext as usual
+and, instead of writing the Pick in its own transaction, stores it in Redis:
+one hash per week, one field per profile, so a member's latest submission
+replaces their earlier ones. The member is told the picks were received.
+
+`flush()` (the `flush_pick_buffer` Celery beat task, every few seconds) writes
+each week's pending submissions with one upsert, applies the counter deltas
+and idol ledger entries a normal save would, and only then removes them from
+Redis (compare-and-delete, so a newer submission that arrived meanwhile stays
+queued). Submissions received after the week locked are dropped.
+
+Scoring is the hard barrier: update_week_results and the Celery scoring task
+flush first, and `score_weeks` refuses to run while any of its weeks still
+has pending submissions (`ensure_flushed`).
+
+Redis persistence (AOF) decides how durable a queued submission is; the
+buffer is meant for a Redis configured with `appendonly yes`.
+"""
+
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from poolapp import aggregates, safe_masks
+from poolapp.leaderboard import bump_scoring_version
+from poolapp.models import IdolLedgerEntry, Pick, UserProfile, Week
+from poolapp.pick_context import PickContext, bump_pick_context
+
+WEEKS_KEY = 'pickbuf:weeks'  # week ids with pending submissions
+SUBMITTED_FIELDS = [
+    'safe_pick_id', 'voted_out_pick_id', 'imty_challenge_winner_pick_id', 'used_immunity_idol',
+    'wager_voted_out', 'wager_immunity', 'parlay',
+]
+UPSERT_FIELDS = [f.removesuffix('_id') for f in SUBMITTED_FIELDS] + ['updated_at']
+
+# Delete hash fields still holding the flushed value; forget the week once its hash is empty
+_ACK = """
+local n = 0
+for i = 2, #ARGV, 2 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+        n = n + 1
+    end
+end
+if redis.call('HLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return n
+"""
+
+_client = None
+_ack = None
+
+
+class PickBufferNotFlushed(RuntimeError):
+    pass
+
+
+def enabled():
+    return getattr(settings, 'PICK_BUFFER', False)
+
+
+def _redis():
+    global _client, _ack
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(settings.PICK_BUFFER_URL, decode_responses=True)
+        _ack = _client.register_script(_ACK)
+    return _client
+
+
+def _week_key(week_id):
+    return f"pickbuf:week:{week_id}"
+
+
+# ---------- Submission side (make_picks) ----------
+
+def enqueue(pick, submitted_at=None):
+    """
+    Queue a validated, unsaved `pick` (profile and week set) in place of saving it.
+    `submitted_at` (default: now) is compared with the week's lock_time on flush;
+    make_picks passes the database time it checked the lock against.
+    """
+    pick.clean()
+    entry = {f: getattr(pick, f) for f in SUBMITTED_FIELDS}
+    entry['submitted_at'] = (submitted_at or timezone.now()).isoformat()
+    pipe = _redis().pipeline(transaction=True)
+    pipe.hset(_week_key(pick.week_id), str(pick.user_profile_id), json.dumps(entry))
+    pipe.sadd(WEEKS_KEY, str(pick.week_id))
+    pipe.execute()
+
+
+def pending_pick(profile, week):
+    """The member's queued submission for `week` as an unsaved Pick, or None."""
+    if not enabled():
+        return None
+    raw = _redis().hget(_week_key(week.id), str(profile.id))
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    return Pick(user_profile=profile, week=week, **{f: entry[f] for f in SUBMITTED_FIELDS})
+
+
+def with_pending(ctx, profile, week):
+    """`ctx` with the member's queued submission, if any, standing in for the stored pick."""
+    pending = pending_pick(profile, week)
+    if pending is None:
+        return ctx
+    for field in ('safe_pick', 'voted_out_pick', 'imty_challenge_winner_pick'):
+        contestant = ctx.contestants.get(getattr(pending, f'{field}_id'))
+        if contestant is not None:
+            setattr(pending, field, contestant)
+    return PickContext(ctx.active, pending, ctx.used_safe_mask)
+
+
+def discard(profile, week):
+    """Drop the member's queued submission for `week`; True if there was one."""
+    if not enabled():
+        return False
+    return bool(_redis().hdel(_week_key(week.id), str(profile.id)))
+
+
+# ---------- Flush side (Celery beat, scoring barrier) ----------
+
+def pending_count(week_ids=None):
+    if not enabled():
+        return 0
+    client = _redis()
+    ids = client.smembers(WEEKS_KEY)
+    if week_ids is not None:
+        ids &= {str(w) for w in week_ids}
+    return sum(client.hlen(_week_key(w)) for w in ids)
+
+
+def flush(week_ids=None):
+    """
+    Write every pending submission (of `week_ids`, default all weeks) to Pick rows.
+    Runs one transaction per week; call it outside any transaction so a week's
+    submissions leave Redis only once they are committed. Returns picks written.
+    """
+    if not enabled():
+        return 0
+    client = _redis()
+    ids = client.smembers(WEEKS_KEY)
+    if week_ids is not None:
+        ids &= {str(w) for w in week_ids}
+    written = 0
+    for week_id in sorted(ids, key=int):
+        key = _week_key(week_id)
+        entries = client.hgetall(key)
+        if entries:
+            with transaction.atomic():
+                written += _write_week(int(week_id), entries)
+        args = [week_id]
+        for profile_id, raw in entries.items():
+            args += [profile_id, raw]
+        _ack(keys=[key, WEEKS_KEY], args=args)
+    return written
+
+
+def ensure_flushed(weeks):
+    """Scoring barrier: raise if any of `weeks` still has queued submissions."""
+    pending = pending_count([w.id for w in weeks])
+    if pending:
+        raise PickBufferNotFlushed(
+            f"{pending} buffered pick submission(s) not yet written; run flush_pick_buffer before scoring."
+        )
+
+
+def _write_week(week_id, entries):
+    week = Week.objects.filter(id=week_id).first()
+    if week is None:
+        return 0
+    # Same row locks as make_picks: a member's direct submission or reset waits for the batch
+    profiles = set(
+        UserProfile.objects.select_for_update()
+        .filter(id__in=[int(p) for p in entries], eliminated=False).values_list('id', flat=True)
+    )
+    # Re-read under the locks: a reset that ran first has already discarded its entry
+    current = dict(zip(entries, _redis().hmget(_week_key(week_id), list(entries))))
+
+    rows = {}
+    for profile_id, raw in entries.items():
+        if current[profile_id] != raw or int(profile_id) not in profiles:
+            continue
+        entry = json.loads(raw)
+        if week.lock_time and parse_datetime(entry['submitted_at']) >= week.lock_time:
+            continue  # arrived after lock
+        rows[int(profile_id)] = entry
+    if not rows:
+        return 0
+
+    existing = {p.user_profile_id: p for p in Pick.objects.filter(week=week, user_profile_id__in=rows)}
+    picks = []
+    deltas = defaultdict(dict)
+    ledger = []
+    for profile_id, entry in rows.items():
+        pick = existing.get(profile_id) or Pick(user_profile_id=profile_id, week=week)
+        before = aggregates.snapshot(pick)
+        for f in SUBMITTED_FIELDS:
+            setattr(pick, f, entry[f])
+        delta = aggregates.contribution_delta(before, pick.counter_contribution())
+        aggregates.add_delta(deltas[profile_id], delta)
+        ledger += aggregates.idol_entries(pick, delta)
+        picks.append(pick)
+
+    Pick.objects.bulk_create(
+        picks, update_conflicts=True, unique_fields=['user_profile', 'week'], update_fields=UPSERT_FIELDS,
+    )
+    safe_masks.refresh(rows, week.season)
+    changed = [pid for pid, delta in deltas.items() if aggregates.apply_delta_to_db(pid, delta)]
+    IdolLedgerEntry.objects.bulk_create(ledger)
+    if changed:
+        bump_scoring_version([week.league_id])
+    transaction.on_commit(lambda: [bump_pick_context(pid) for pid in rows])
+    return len(picks)
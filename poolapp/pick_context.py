@@ -0,0 +1,132 @@
+# poolapp/pick_context.py
+
+"""
+Everything make_picks needs to show or validate one member's picks for a week.
+
+Showing the form, accepting a submission and re-showing a rejected one all
+need the same data: the season's active contestants, the Safe picks the member
+already used (the profile's used-Safe mask, see poolapp.safe_masks), their
+pick for this week and the contestants still open to them as Safe (the active
+contestants outside the mask). `get_pick_context` builds it with one query
+(the contestants come from the season's catalog, poolapp.catalog) and caches
+it per profile and week. The cache key carries the profile's pick
+version (bumped by a signal whenever one of the member's picks is saved or
+deleted), the league's scoring version (auto-assigned picks are written by
+scoring) and the contestant version, so a stale context is never served.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db.models import F
+
+from poolapp import safe_masks
+from poolapp.catalog import contestants_version, get_catalog
+from poolapp.models import Pick
+
+PICK_CONTEXT_TIMEOUT = 60 * 60 * 24  # superseded versions just age out
+
+
+def _version_key(profile_id):
+    return f"pick_context:version:{profile_id}"
+
+
+def pick_context_version(profile_id):
+    # Seeded from the clock like the contestant version: a lost key can't revive old contexts
+    return cache.get_or_set(_version_key(profile_id), time.time_ns, None)
+
+
+def bump_pick_context(profile_id):
+    """Invalidate every cached pick context of a profile (any of its picks changed)."""
+    try:
+        return cache.incr(_version_key(profile_id))
+    except ValueError:
+        return pick_context_version(profile_id)
+
+
+def pick_context_key(profile, week):
+    version = pick_context_version(profile.id)
+    return (
+        f"pick_context:{profile.id}:{week.id}:p{version}"
+        f":v{week.league.scoring_version}:c{contestants_version(week.season)}"
+    )
+
+
+class PickContext:
+    """
+    `active`: the season's active contestants, by id. `existing_pick`: the
+    member's stored pick for the week (None if not made). `used_safe_mask`:
+    contestants the member chose as Safe in earlier weeks, one bit per
+    Contestant.ordinal (see poolapp.safe_masks; auto-assigned picks don't count).
+    `available_safe`: active contestants not used as Safe yet, plus this week's
+    own Safe pick.
+    """
+
+    def __init__(self, active, existing_pick, used_safe_mask):
+        self.active = active
+        self.existing_pick = existing_pick
+        self.used_safe_mask = used_safe_mask
+        self.existing_safe_id = existing_pick.safe_pick_id if existing_pick else None
+        self.active_mask = safe_masks.mask_of(active)
+
+        available = [c for c in active if not used_safe_mask & safe_masks.bit(c)]
+        if self.existing_safe_id and all(c.id != self.existing_safe_id for c in available):
+            available = sorted(available + [existing_pick.safe_pick], key=lambda c: c.id)
+        self.available_safe = available
+
+        # Submitted ids resolve against these without a query (see PickForm)
+        self.contestants = {c.id: c for c in active + available}
+
+    @property
+    def has_unused_safe_left(self):
+        """An active contestant the member never used as Safe, other than this week's own pick."""
+        own = safe_masks.bit(self.existing_pick.safe_pick) if self.existing_safe_id else 0
+        return bool(self.active_mask & ~self.used_safe_mask & ~own)
+
+    def is_used_safe(self, contestant):
+        """Safe in an earlier week, and not simply this week's stored pick being kept."""
+        return bool(self.used_safe_mask & safe_masks.bit(contestant)) and contestant.id != self.existing_safe_id
+
+
+def build_pick_context(profile, week):
+    active = get_catalog(week.season).active
+    masks = safe_masks.masks_for(profile, week.season)
+    if masks is not None:
+        # Maintained masks: only this week's pick and any later ones are read
+        picks = list(
+            Pick.objects.filter(user_profile=profile, week__season=week.season, week__number__gte=week.number)
+            .select_related('safe_pick')
+        )
+        # The masks cover the whole season: a later week's Safe pick isn't "used" yet here,
+        # so profiles with picks in later weeks have their earlier picks read instead
+        if all(pick.week_id == week.id for pick in picks):
+            existing_pick = picks[0] if picks else None
+            used_safe_mask = masks[0]
+            if existing_pick and existing_pick.safe_pick_id and safe_masks.is_chosen(existing_pick):
+                used_safe_mask &= ~safe_masks.bit(existing_pick.safe_pick)  # the week's own pick is not "used"
+            return PickContext(active, existing_pick, used_safe_mask)
+
+    # Profile without masks for this season yet (or with later picks): read its earlier picks
+    existing_pick = None
+    used_safe_mask = 0
+    picks = (
+        Pick.objects.filter(user_profile=profile, week__season=week.season, week__number__lte=week.number)
+        .select_related('safe_pick')
+        .annotate(week_number=F('week__number'))
+    )
+    for pick in picks:
+        if pick.week_id == week.id:
+            existing_pick = pick
+        elif pick.week_number < week.number and pick.safe_pick_id and safe_masks.is_chosen(pick):
+            used_safe_mask |= safe_masks.bit(pick.safe_pick)
+    return PickContext(active, existing_pick, used_safe_mask)
+
+
+def get_pick_context(profile, week):
+    """Cached PickContext of `profile` for `week` (`week.league` loaded with the request)."""
+    key = pick_context_key(profile, week)
+    context = cache.get(key)
+    if context is None:
+        context = build_pick_context(profile, week)
+        cache.set(key, context, PICK_CONTEXT_TIMEOUT)
+    return context
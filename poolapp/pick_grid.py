@@ -0,0 +1,71 @@
+# poolapp/pick_grid.py
+
+"""
+Season pick grid for a league page.
+
+All of a league's picks for the season are read in one `.values()` query with
+only the columns the page shows (contestant names come from the caller's
+contestant list, not joins) and laid out as a flat row-major matrix:
+members x weeks, so looking up any cell, row or week column is O(1) per cell.
+"""
+
+from poolapp.models import Pick
+
+# Columns read per pick; contestant ids are resolved to names in memory
+GRID_FIELDS = (
+    'user_profile_id', 'week_id',
+    'safe_pick_id', 'voted_out_pick_id', 'imty_challenge_winner_pick_id',
+    'safe_pick_correct', 'voted_out_pick_correct', 'imty_challenge_winner_pick_correct',
+    'wager_voted_out', 'wager_immunity', 'parlay', 'used_immunity_idol', 'points_week_total',
+)
+
+
+class PickGrid:
+    """
+    `cells[row * n_weeks + col]` is the pick of `profiles[row]` for `weeks[col]`
+    (a dict of GRID_FIELDS plus contestant names and `visible`) or None.
+    """
+
+    def __init__(self, profiles, weeks, cells):
+        self.profiles = profiles
+        self.weeks = weeks
+        self.cells = cells
+        self.n_weeks = len(weeks)
+
+    def cell(self, row, col):
+        return self.cells[row * self.n_weeks + col]
+
+    def row(self, row):
+        return self.cells[row * self.n_weeks:(row + 1) * self.n_weeks]
+
+    def column(self, col):
+        """[(profile, cell), ...] for one week, in `profiles` order."""
+        return list(zip(self.profiles, self.cells[col::self.n_weeks]))
+
+
+def build_pick_grid(profiles, weeks, contestants, viewer=None, now=None):
+    """
+    Grid of `profiles` (rows, in the given order) x `weeks` (columns). A cell is
+    `visible` once its week has locked, or always for the `viewer`'s own picks.
+    """
+    profiles = list(profiles)
+    weeks = list(weeks)
+    names = {c.id: c.name for c in contestants}
+    row_of = {p.id: i for i, p in enumerate(profiles)}
+    col_of = {w.id: j for j, w in enumerate(weeks)}
+    locked = [bool(now and w.lock_time and w.lock_time <= now) for w in weeks]
+    viewer_id = getattr(viewer, 'id', None)
+    n_weeks = len(weeks)
+
+    cells = [None] * (len(profiles) * n_weeks)
+    for pick in Pick.objects.filter(week_id__in=list(col_of)).values(*GRID_FIELDS):
+        row = row_of.get(pick['user_profile_id'])
+        if row is None:
+            continue
+        col = col_of[pick['week_id']]
+        pick['safe_pick_name'] = names.get(pick['safe_pick_id'])
+        pick['voted_out_pick_name'] = names.get(pick['voted_out_pick_id'])
+        pick['imty_challenge_winner_pick_name'] = names.get(pick['imty_challenge_winner_pick_id'])
+        pick['visible'] = locked[col] or profiles[row].user_id == viewer_id
+        cells[row * n_weeks + col] = pick
+    return PickGrid(profiles, weeks, cells)
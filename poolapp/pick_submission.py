@@ -0,0 +1,193 @@
+# poolapp/pick_submission.py
+
+"""
+Submitting and resetting one member's picks for a week.
+
+The make_picks page and the JSON pick API (`pick_api`) apply the same rules:
+the PickForm checks, "Safe Pick required unless none remain", no Safe pick
+reused from an earlier week, and the idol toggle. Both call `submit_picks` /
+`reset_picks`, which do the work and return an Outcome; the page turns it into
+flash messages and a redirect or re-render, the API into a small JSON body.
+The caller has already checked membership, elimination and the week's lock
+(and taken the profile row lock, unless the submission is buffered).
+"""
+
+import logging
+from collections import namedtuple
+
+from django.contrib import messages
+from django.db.models import Exists
+from django.db.models.functions import Now
+
+from poolapp import pick_buffer
+from poolapp.forms import PickForm
+from poolapp.models import Pick, UserProfile, Week
+
+logger = logging.getLogger('poolapp')
+
+WEEKLY_CAP = 3  # most points a member may wager in one week
+MIN_FLOOR = -3  # wagers may not risk the balance below this
+
+# status: 'saved' / 'updated' / 'queued' / 'valid' (validate only) when accepted;
+# 'invalid' (form errors), 'refused' (Safe rule) or 'duplicate_safe' when not.
+# messages: [(level, text)] in the order the page flashes them.
+Outcome = namedtuple('Outcome', 'status form pick messages')
+ACCEPTED = ('saved', 'updated', 'queued', 'valid')
+
+
+def _at_database_time(week):
+    # `week_open` and `db_now` come from the database clock, never the web node's
+    return UserProfile.objects.annotate(
+        week_open=Exists(Week.objects.filter(id=week.id, lock_time__gt=Now())),
+        db_now=Now(),
+    )
+
+
+def lock_profile(profile, week):
+    """
+    Re-read `profile` under a row lock, with `week_open` checked against database
+    time in the same query: a member's submissions (double clicks, retries at lock
+    time) run one at a time, so the stored pick and the counters can't change under
+    the request.
+    """
+    return _at_database_time(week).select_for_update().get(id=profile.id)
+
+
+def read_profile(profile, week):
+    """
+    Re-read `profile` with `week_open` checked against database time, without the
+    row lock: for validation and buffered submissions, which write no rows.
+    """
+    return _at_database_time(week).get(id=profile.id)
+
+
+def pick_form(profile, ctx, data=None):
+    return PickForm(
+        data,
+        instance=ctx.existing_pick,
+        has_immunity_idol=profile.immunity_idols > 0,
+        available_safe=ctx.available_safe,
+        available_voted=ctx.active,
+        contestants=ctx.contestants,
+        current_points=profile.total_score,
+        weekly_cap=WEEKLY_CAP,
+        min_floor=MIN_FLOOR,
+    )
+
+
+def submit_picks(user, profile, week, ctx, data, buffered=False, commit=True):
+    """
+    Validate `data` against the member's PickContext and save (or, `buffered`,
+    queue) the pick. With `commit=False` only validate.
+    """
+    league_id = week.league_id
+    has_immunity_idol = profile.immunity_idols > 0
+    existing_pick = ctx.existing_pick
+    notes = []
+    form = pick_form(profile, ctx, data)
+
+    if not form.is_valid():
+        logger.error(f"User {user.username} submitted invalid picks for Week {week.number} in League {league_id}.")
+        return Outcome('invalid', form, None, [(messages.ERROR, "Please correct the errors below.")])
+
+    safe_pick = form.cleaned_data.get('safe_pick')
+    imty_challenge_winner_pick = form.cleaned_data.get('imty_challenge_winner_pick')
+    use_idol = form.cleaned_data.get('used_immunity_idol')
+
+    # --- Enforce "Safe Pick required unless none remain" ---
+    # ctx.existing_safe_id is the Safe pick stored for this week (editing case), read
+    # before the form wrote the submission into the instance. Keeping it satisfies the
+    # rule; only error if they submit with no safe pick while an unused active
+    # contestant is still left.
+    if not safe_pick:
+        if ctx.existing_safe_id:
+            # They tried to clear safe pick while at least one safe option remains (including the previously set one).
+            # Rule: must have a safe pick unless none remain.
+            return Outcome('refused', form, None, [
+                (messages.ERROR, "You must keep or choose a Safe Pick unless none are available."),
+            ])
+        elif ctx.has_unused_safe_left:
+            # They have never set a safe pick for this week AND there are still unused active contestants.
+            return Outcome('refused', form, None, [
+                (messages.ERROR, "You must select a Safe Pick (you still have unused active contestants)."),
+            ])
+        else:
+            # No unused active contestants remain and no existing safe pick — allow submission
+            # but warn the user they may be exiled (idol can still save them; Option 2 applies).
+            notes.append((
+                messages.WARNING,
+                "No unused active contestants remain for a Safe Pick this week. "
+                "You may be exiled if your non-safe situation results in elimination, "
+                "unless an idol protects you or you return later."
+            ))
+
+    # --- Prevent duplicate safe pick across weeks (unless it's the same record being edited) ---
+    if safe_pick and ctx.is_used_safe(safe_pick):
+        logger.error(f"User {user.username} attempted to choose a duplicate safe pick (Contestant ID {safe_pick.id}) for Week {week.number} in League {league_id}.")
+        return Outcome('duplicate_safe', form, None, notes + [
+            (messages.ERROR, "You have already chosen this contestant as safe in a previous week."),
+        ])
+
+    # --- Build the pick ---
+    pick = form.save(commit=False)
+    pick.user_profile = profile
+    pick.week = week
+
+    # If editing and they provided a new immunity winner pick, persist it explicitly (keeps your prior pattern)
+    if existing_pick:
+        pick.imty_challenge_winner_pick = imty_challenge_winner_pick
+
+    # Idol checkbox: just record intent here; inventory is handled in the results command idempotently
+    if use_idol and has_immunity_idol:
+        if not existing_pick or not existing_pick.used_immunity_idol:
+            pick.used_immunity_idol = True
+            if commit:
+                logger.info(f"User {user.username} used an immunity idol for Week {week.number} in League {league_id}.")
+    else:
+        if existing_pick and existing_pick.used_immunity_idol:
+            pick.used_immunity_idol = False
+            if commit:
+                logger.info(f"User {user.username} did not use immunity idol for Week {week.number} in League {league_id}.")
+
+    if not commit:
+        return Outcome('valid', form, pick, notes)
+
+    if buffered:
+        pick_buffer.enqueue(pick, submitted_at=getattr(profile, 'db_now', None))
+        logger.info(f"User {user.username} queued picks for Week {week.number} in League {league_id}.")
+        return Outcome('queued', form, pick, notes + [
+            (messages.SUCCESS, f"Your picks for Week {week.number} have been received."),
+        ])
+
+    pick.save()
+
+    if existing_pick:
+        logger.info(f"User {user.username} updated picks for Week {week.number} in League {league_id}.")
+        return Outcome('updated', form, pick, notes + [
+            (messages.SUCCESS, f"Your picks for Week {week.number} have been updated."),
+        ])
+    logger.info(f"User {user.username} created picks for Week {week.number} in League {league_id}.")
+    return Outcome('saved', form, pick, notes + [
+        (messages.SUCCESS, f"Your picks for Week {week.number} have been saved."),
+    ])
+
+
+def pick_state(pick):
+    """The submitted fields of `pick` as plain JSON values (None when there is no pick)."""
+    if pick is None:
+        return None
+    return {name: pick.serializable_value(name) for name in PickForm.Meta.fields}  # contestant ids
+
+
+def reset_picks(user, profile, week):
+    """Delete the member's pick for `week` (and any queued submission); 'reset' or 'empty'."""
+    league_id = week.league_id
+    queued = pick_buffer.discard(profile, week)
+    deleted, _ = Pick.objects.filter(user_profile=profile, week=week).delete()
+    if deleted or queued:
+        logger.info(f"User {user.username} reset picks for Week {week.number} in League {league_id}.")
+        return Outcome('reset', None, None, [
+            (messages.SUCCESS, f"Your picks for Week {week.number} have been reset."),
+        ])
+    logger.info(f"User {user.username} attempted to reset picks for Week {week.number} in League {league_id} but had no picks.")
+    return Outcome('empty', None, None, [(messages.INFO, "You have no picks to reset for this week.")])
@@ -0,0 +1,105 @@
+# poolapp/provisioning.py
+
+"""
+Creating a season's Week rows for new and existing leagues.
+
+A season has one Week per episode in every league, each with an empty
+WeekResult and a one-off Celery-Beat reminder two hours before its lock
+time. Saving the Weeks one by one costs a `get_or_create`, a result lookup and
+insert, and a ClockedSchedule / PeriodicTask round trip per week, so
+`provision_weeks` writes the missing rows for any number of leagues with a
+handful of bulk statements instead. League creation (signals) and
+`init_season --create-weeks` both go through it; weeks saved individually
+(admin edits) keep the per-week `schedule_week_reminder` signal.
+"""
+
+import datetime
+import json
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.utils import timezone
+from django_celery_beat.models import ClockedSchedule, PeriodicTask, PeriodicTasks
+
+from poolapp.models import Week, WeekResult
+
+REMINDER_LEAD = datetime.timedelta(hours=2)
+REMINDER_TASK = 'poolapp.tasks.send_reminder_emails_for_week'
+
+
+def week_dates(start_date, episodes, lock_hour=20, lock_weekday=2):
+    """[(number, start_date, lock_time)] of a season: weeks from `start_date`, locking on `lock_weekday` at `lock_hour` ET."""
+    eastern = ZoneInfo("America/New_York")
+    dates = []
+    for number in range(1, episodes + 1):
+        wk_start = start_date + datetime.timedelta(weeks=number - 1)
+        days_to_target = (lock_weekday - wk_start.weekday()) % 7
+        lock_date = wk_start + datetime.timedelta(days=days_to_target)
+        naive_lock = datetime.datetime(lock_date.year, lock_date.month, lock_date.day, int(lock_hour), 0, 0, 0)
+        dates.append((number, wk_start, timezone.make_aware(naive_lock, eastern)))
+    return dates
+
+
+def reminder_task_name(week, league):
+    return f"Send reminder for Week {week.number} in {league.name}"
+
+
+@transaction.atomic
+def provision_weeks(leagues, season, dates):
+    """
+    Create the Weeks of `dates` (see `week_dates`) missing from `leagues` for
+    `season`, with their WeekResults and reminders. Existing weeks are left as
+    they are. Returns the created Weeks.
+    """
+    leagues = list(leagues)
+    existing = set(
+        Week.objects.filter(league__in=leagues, season=season).values_list('league_id', 'number')
+    )
+    weeks = Week.objects.bulk_create([
+        Week(league=league, season=season, number=number, start_date=start, lock_time=lock_time)
+        for league in leagues
+        for number, start, lock_time in dates
+        if (league.id, number) not in existing
+    ])
+    # Week.save would add each result; bulk_create skips it
+    WeekResult.objects.bulk_create([WeekResult(week=week) for week in weeks])
+    _schedule_reminders(weeks)
+    return weeks
+
+
+def _schedule_reminders(weeks):
+    """The `schedule_week_reminder` task for every week whose reminder is still ahead."""
+    now = timezone.now()
+    due = [w for w in weeks if w.lock_time - REMINDER_LEAD > now]
+    if not due:
+        return
+
+    # One ClockedSchedule per reminder time, shared with any already stored
+    times = {w.lock_time - REMINDER_LEAD for w in due}
+    clocked = {}
+    for schedule in ClockedSchedule.objects.filter(clocked_time__in=times).order_by('id'):
+        clocked.setdefault(schedule.clocked_time, schedule)
+    clocked.update(
+        (schedule.clocked_time, schedule) for schedule in ClockedSchedule.objects.bulk_create([
+            ClockedSchedule(clocked_time=t) for t in times if t not in clocked
+        ])
+    )
+
+    # Create or update the tasks by name, as update_or_create would
+    fields = {
+        reminder_task_name(w, w.league): {
+            'task': REMINDER_TASK,
+            'clocked': clocked[w.lock_time - REMINDER_LEAD],
+            'args': json.dumps([w.id]),
+            'one_off': True,
+        }
+        for w in due
+    }
+    stored = list(PeriodicTask.objects.filter(name__in=fields))
+    for task in stored:
+        for name, value in fields.pop(task.name).items():
+            setattr(task, name, value)
+    PeriodicTask.objects.bulk_update(stored, ['task', 'clocked', 'args', 'one_off'])
+    PeriodicTask.objects.bulk_create([PeriodicTask(name=name, **values) for name, values in fields.items()])
+    # Bulk writes skip PeriodicTask.save: tell the beat scheduler the schedule changed
+    PeriodicTasks.update_changed()
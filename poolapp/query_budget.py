@@ -0,0 +1,76 @@
+# poolapp/query_budget.py
+
+"""
+Per-view SQL query budgets.
+
+A view declares the most queries one request may run with `@query_budget(n)`,
+counted over the whole request (session and auth lookups included). Budgets
+do not depend on league size, so any per-member or per-week query shows up as
+an overrun. The test suite runs every budgeted view against small and large
+synthetic leagues and fails on overruns (poolapp/tests.py); with
+settings.QUERY_BUDGET_LOG on, `QueryBudgetMiddleware` logs overruns at runtime.
+"""
+
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('poolapp')
+
+
+def query_budget(max_queries):
+    """Declare the query budget of a view (put it above the other decorators)."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def budget_for(view):
+    return getattr(view, 'query_budget', None)
+
+
+class QueryCounter:
+    """`connection.execute_wrapper` that counts statements (works with DEBUG off)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries(conn=connection):
+    counter = QueryCounter()
+    with conn.execute_wrapper(counter):
+        yield counter
+
+
+class QueryBudgetMiddleware:
+    """Log requests whose view ran more queries than its declared budget."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_LOG', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and counter.count > budget:
+            logger.warning(
+                f"Query budget exceeded: {request._query_budget_view} ran {counter.count} queries "
+                f"(budget {budget}) for {request.method} {request.path}"
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = budget_for(view_func)
+        request._query_budget_view = getattr(view_func, '__name__', repr(view_func))
+        return None
@@ -0,0 +1,80 @@
+# poolapp/safe_masks.py
+
+"""
+Contestants a member has already used as Safe, kept as bitmasks on UserProfile.
+
+Every contestant has a stable per-season `Contestant.ordinal`; bit `ordinal`
+of a mask stands for that contestant. `used_safe_mask` holds the Safe picks
+the member chose themselves (with a Voted Out and an Immunity pick, the picks
+make_picks counts), `other_safe_mask` every other Safe pick (auto-assigned
+picks, idol weeks). With the masks, Safe eligibility is a bitwise AND against
+the season's active contestants instead of a query over earlier picks:
+make_picks offers the active contestants outside `used_safe_mask`, and
+scoring auto-assigns from those outside both masks.
+
+The masks cover every week of `safe_mask_season` and are recomputed from the
+picks by `refresh()`, one UPDATE for any number of profiles: on every pick
+save and delete (signals) and after the bulk writers (scoring, rebuilds,
+the pick buffer, synthetic data). A profile whose masks describe another
+season has none for this one (`masks_for` returns None).
+"""
+
+from django.db.models import BigIntegerField, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Power
+
+from poolapp.models import Pick, UserProfile
+
+# Picks make_picks counts as the member's own Safe choice
+CHOSEN = Q(voted_out_pick__isnull=False, imty_challenge_winner_pick__isnull=False)
+
+
+def is_chosen(pick):
+    return bool(pick.voted_out_pick_id and pick.imty_challenge_winner_pick_id)
+
+
+def bit(contestant):
+    return 1 << contestant.ordinal
+
+
+def mask_of(contestants):
+    mask = 0
+    for contestant in contestants:
+        mask |= bit(contestant)
+    return mask
+
+
+def ids_in(mask, contestants):
+    """Ids of the `contestants` whose bit is set in `mask`."""
+    return {c.id for c in contestants if mask & bit(c)}
+
+
+def _mask(season, chosen):
+    picks = Pick.objects.filter(user_profile=OuterRef('pk'), week__season=season, safe_pick__isnull=False)
+    picks = picks.filter(CHOSEN) if chosen else picks.exclude(CHOSEN)
+    # Summing distinct powers of two is a bitwise OR (a contestant counts once)
+    bits = Cast(Power(2, 'safe_pick__ordinal'), BigIntegerField())
+    mask = picks.order_by().values('user_profile').annotate(mask=Sum(bits, distinct=True)).values('mask')
+    return Coalesce(Subquery(mask, output_field=BigIntegerField()), 0)
+
+
+def refresh(profile_ids, season=None):
+    """
+    Recompute the masks of `profile_ids` for `season` (default: the season each
+    profile's masks already describe) from their picks, in one UPDATE.
+    """
+    profile_ids = list(profile_ids)
+    if not profile_ids:
+        return 0
+    season_ref = OuterRef('safe_mask_season') if season is None else season
+    return UserProfile.objects.filter(id__in=profile_ids).update(
+        safe_mask_season=F('safe_mask_season') if season is None else season,
+        used_safe_mask=_mask(season_ref, chosen=True),
+        other_safe_mask=_mask(season_ref, chosen=False),
+    )
+
+
+def masks_for(profile, season):
+    """(used_safe_mask, other_safe_mask) of `profile` for `season`, or None if not maintained for it."""
+    if profile.safe_mask_season != season:
+        return None
+    return profile.used_safe_mask, profile.other_safe_mask
@@ -0,0 +1,607 @@
+# poolapp/scoring.py
+
+"""
+Set-based scoring engine used by `update_week_results`.
+
+A week is scored by loading its profiles and picks once, computing correctness
+flags, points and exile/elimination transitions in memory (a `ScoringPlan`),
+and writing the results back with `bulk_update`. Profile counters are moved by the difference
+between each pick's old and new contribution (see `poolapp.aggregates`), so
+the number of queries per league is constant regardless of how many members
+it has and nothing is recounted from the season's picks.
+"""
+
+import logging
+import random
+from collections import defaultdict, namedtuple
+
+import numpy as np
+from django.db.models import Sum
+
+from poolapp import aggregates, pick_buffer, safe_masks
+from poolapp.catalog import get_catalog
+from poolapp.leaderboard import bump_scoring_version, snapshot_ranks
+from poolapp import scoring_kernel as kernel
+from poolapp.models import Activity, Contestant, IdolLedgerEntry, Pick, UserProfile, Week
+
+logger = logging.getLogger('poolapp')
+
+# Pick columns written by a scoring pass
+SCORED_PICK_FIELDS = [
+    'safe_pick_correct', 'voted_out_pick_correct', 'imty_challenge_winner_pick_correct',
+    'points_safe', 'points_vo', 'points_immunity', 'points_wagers', 'points_parlay',
+    'points_week_total',
+]
+
+# UserProfile columns written by a scoring pass
+SCORED_PROFILE_FIELDS = [
+    'exiled', 'eliminated', 'correct_guesses', 'correct_imty_challenge_guesses',
+    'immunity_idols_played', 'immunity_idols', 'total_score',
+]
+
+# Activity description written by return_from_exile (used to replay returns)
+RETURN_ACTIVITY_PREFIX = "returned from exile"
+
+# Season-level facts of one episode, resolved once and shared by every league
+EpisodeOutcome = namedtuple(
+    'EpisodeOutcome',
+    ['season', 'voted_out', 'imty_winner', 'winner_tribe', 'tribe_by_id', 'n_tribes'],
+)
+
+
+def _log(notify, level, message):
+    if notify:
+        notify(level, message)
+    else:
+        getattr(logger, 'error' if level == 'error' else 'info')(message)
+
+
+def stable_choice(candidates, seed_tuple):
+    """Deterministic picker so re-runs don't reshuffle."""
+    if not candidates:
+        return None
+    candidates = sorted(candidates, key=lambda c: (c.id, c.name))
+    rnd = random.Random(hash(seed_tuple))
+    return candidates[rnd.randrange(len(candidates))]
+
+
+def _imty_judged_by_tribe(winner_tribe, n_tribes):
+    # Pre-merge (several tribes) an immunity pick is right if it's on the winning tribe
+    return bool(n_tribes > 1 and winner_tribe)
+
+
+def score_pick(pick, voted_out_id, imty_winner_id, winner_tribe, n_tribes, tribe_by_id):
+    """
+    Set correctness flags and points on one `pick` in memory (no DB access),
+    using the scalar reference kernel. `tribe_by_id` maps contestant id -> tribe.
+    """
+    pick.safe_pick_correct = bool(pick.safe_pick_id and pick.safe_pick_id != voted_out_id)
+    pick.voted_out_pick_correct = bool(pick.voted_out_pick_id and pick.voted_out_pick_id == voted_out_id)
+
+    if pick.imty_challenge_winner_pick_id:
+        if _imty_judged_by_tribe(winner_tribe, n_tribes):
+            pick.imty_challenge_winner_pick_correct = (
+                tribe_by_id.get(pick.imty_challenge_winner_pick_id) == winner_tribe
+            )
+        else:
+            pick.imty_challenge_winner_pick_correct = (
+                imty_winner_id is not None and
+                pick.imty_challenge_winner_pick_id == imty_winner_id
+            )
+    else:
+        pick.imty_challenge_winner_pick_correct = False
+
+    # Correctness flags are preserved even when a busted parlay zeroes the points (idol calc)
+    points = kernel.score_scalar(
+        pick.safe_pick_correct, pick.voted_out_pick_correct, pick.imty_challenge_winner_pick_correct,
+        pick.parlay, pick.wager_voted_out, pick.wager_immunity,
+    )
+    for col, value in points.items():
+        setattr(pick, col, value)
+    return pick
+
+
+def score_picks(picks, voted_out_id, imty_winner_id, winner_tribe, n_tribes, tribe_by_id, keep_imty_flags=False):
+    """
+    Vectorized `score_pick` for a list of picks: columns are extracted once,
+    scored by the NumPy kernel and written back onto the instances.
+    With `keep_imty_flags` the stored immunity correctness is reused (weeks
+    whose immunity result was never recorded).
+    """
+    if not picks:
+        return picks
+    safe_ids = np.fromiter((p.safe_pick_id or 0 for p in picks), dtype=np.int64, count=len(picks))
+    vo_ids = np.fromiter((p.voted_out_pick_id or 0 for p in picks), dtype=np.int64, count=len(picks))
+    imty_ids = np.fromiter((p.imty_challenge_winner_pick_id or 0 for p in picks), dtype=np.int64, count=len(picks))
+    by_tribe = _imty_judged_by_tribe(winner_tribe, n_tribes)
+    tribe_match = None
+    if by_tribe:
+        tribe_match = [tribe_by_id.get(p.imty_challenge_winner_pick_id) == winner_tribe for p in picks]
+
+    safe_ok, vo_ok, imty_ok = kernel.correctness_columns(
+        safe_ids, vo_ids, imty_ids, voted_out_id, imty_winner_id,
+        imty_tribe_match=tribe_match, by_tribe=by_tribe,
+    )
+    if keep_imty_flags:
+        imty_ok = np.array([bool(p.imty_challenge_winner_pick_correct) for p in picks], dtype=bool)
+    points = kernel.score_columns(
+        safe_ok, vo_ok, imty_ok,
+        [p.parlay for p in picks],
+        [p.wager_voted_out or 0 for p in picks],
+        [p.wager_immunity or 0 for p in picks],
+    )
+
+    columns = {col: values.tolist() for col, values in points.items()}
+    safe_ok, vo_ok, imty_ok = safe_ok.tolist(), vo_ok.tolist(), imty_ok.tolist()
+    for i, pick in enumerate(picks):
+        pick.safe_pick_correct = safe_ok[i]
+        pick.voted_out_pick_correct = vo_ok[i]
+        pick.imty_challenge_winner_pick_correct = imty_ok[i]
+        for col, values in columns.items():
+            setattr(pick, col, values[i])
+    return picks
+
+
+def apply_exile_transition(profile, pick, voted_out_id, week_number):
+    """
+    Safe pick went home with no idol (after week 1):
+      - not exiled -> EXILE
+      - already exiled -> permanent ELIMINATION
+    Returns 'exiled', 'eliminated' or None. Mutates `profile` in memory only.
+    """
+    if profile.eliminated or week_number <= 1:
+        return None
+    if pick.safe_pick_id != voted_out_id or pick.used_immunity_idol:
+        return None
+    if profile.exiled:
+        profile.eliminated = True
+        profile.exiled = False
+        return 'eliminated'
+    profile.exiled = True
+    return 'exiled'
+
+
+def resolve_outcome(season, voted_out_name, imty_winner_name):
+    """
+    Resolve the season-level facts of an episode once. The contestants are the
+    season catalog's shared instances (poolapp.catalog): read-only.
+    Raises Contestant.DoesNotExist if the voted-out contestant is unknown.
+    """
+    by_name = get_catalog(season).by_name
+    voted_out = by_name.get(voted_out_name)
+    if voted_out is None:
+        raise Contestant.DoesNotExist(f"Contestant '{voted_out_name}' not found for Season {season}.")
+
+    # Immunity winner may be a contestant or (pre-merge) a tribe keyword
+    imty_winner = by_name.get(imty_winner_name)
+    if imty_winner is not None:
+        winner_tribe = imty_winner.tribe
+    else:
+        winner_tribe = imty_winner_name  # Treat arg as tribe string
+
+    return _build_outcome(season, voted_out, imty_winner, winner_tribe)
+
+
+def outcome_from_result(result, tribe_by_id):
+    """
+    EpisodeOutcome for a stored WeekResult (no queries if `voted_out_contestant`
+    and `imty_challenge_winner` are select_related). Returns None if the week
+    has no recorded boot. `winner_tribe` is None when the immunity result was
+    never recorded.
+    """
+    if result is None or result.voted_out_contestant is None:
+        return None
+    imty_winner = result.imty_challenge_winner
+    winner_tribe = imty_winner.tribe if imty_winner else result.imty_winner_tribe
+    return EpisodeOutcome(
+        season=result.week.season,
+        voted_out=result.voted_out_contestant,
+        imty_winner=imty_winner,
+        winner_tribe=winner_tribe,
+        tribe_by_id=tribe_by_id,
+        n_tribes=len(set(tribe_by_id.values())),
+    )
+
+
+def result_fields(outcome):
+    """WeekResult column values recording `outcome`."""
+    return {
+        'voted_out_contestant': outcome.voted_out,
+        'imty_challenge_winner': outcome.imty_winner,
+        'imty_winner_tribe': outcome.winner_tribe,
+    }
+
+
+def outcome_from_ids(season, voted_out_id, imty_winner_id, winner_tribe):
+    """Rebuild an EpisodeOutcome from primitives (e.g. Celery task arguments)."""
+    contestants = get_catalog(season).by_id
+    return _build_outcome(season, contestants[voted_out_id], contestants.get(imty_winner_id), winner_tribe)
+
+
+def _build_outcome(season, voted_out, imty_winner, winner_tribe):
+    # Tribe lookup for immunity scoring + tribe vs merge detection
+    tribe_by_id = get_catalog(season).tribe_by_id
+    return EpisodeOutcome(
+        season=season,
+        voted_out=voted_out,
+        imty_winner=imty_winner,
+        winner_tribe=winner_tribe,
+        tribe_by_id=tribe_by_id,
+        n_tribes=len(set(tribe_by_id.values())),
+    )
+
+
+class ScoringPlan:
+    """
+    The complete result of scoring a batch of weeks, computed in memory.
+    Nothing is written until `apply()`; `diff()` compares it with the DB state
+    it was computed from (used by `update_week_results --dry-run`).
+    """
+
+    def __init__(self, weeks, profiles, picks, created):
+        self.weeks = weeks
+        self.profiles = profiles            # {profile_id: UserProfile (mutated)}
+        self.picks = picks                  # existing picks (mutated)
+        self.created = created              # new auto-assigned picks (unsaved)
+        self.ledger = []                    # idol ledger entries to append (unsaved)
+        self.week_by_league = {w.league_id: w for w in weeks}
+        self._original_picks = {id(p): _field_values(p, SCORED_PICK_FIELDS) for p in picks}
+        self._original_profiles = {pid: _field_values(p, SCORED_PROFILE_FIELDS) for pid, p in profiles.items()}
+
+    def summary(self):
+        return {
+            'picks': len(self.picks) + len(self.created),
+            'created': len(self.created),
+            'profiles': len(self.profiles),
+            'leagues': len(self.weeks),
+        }
+
+    def apply(self):
+        """Flush the plan: bulk-create auto-assigned picks, then bulk-update picks and profiles."""
+        with aggregates.deferred_deltas():
+            Pick.objects.bulk_create(self.created)
+        Pick.objects.bulk_update(self.picks, SCORED_PICK_FIELDS)
+        UserProfile.objects.bulk_update(list(self.profiles.values()), SCORED_PROFILE_FIELDS)
+        if self.created:
+            safe_masks.refresh(
+                {p.user_profile_id for p in self.created if p.safe_pick_id}, self.weeks[0].season,
+            )
+        IdolLedgerEntry.objects.bulk_create(self.ledger)
+        snapshot_ranks(self.weeks)
+        bump_scoring_version(self.week_by_league)
+        return self.summary()
+
+    def diff(self):
+        """
+        Compact list of changes vs. the loaded state, one dict per changed row:
+        {'league', 'user', 'week', 'kind': 'pick'|'new pick'|'profile', 'changes': {field: [old, new]}}.
+        """
+        rows = []
+        for pick in self.picks:
+            before = self._original_picks[id(pick)]
+            changes = {
+                f: [before[f], getattr(pick, f)] for f in SCORED_PICK_FIELDS if before[f] != getattr(pick, f)
+            }
+            if changes:
+                rows.append(self._row(pick.user_profile_id, 'pick', changes))
+        for pick in self.created:
+            changes = {
+                'safe_pick_id': [None, pick.safe_pick_id],
+                'used_immunity_idol': [None, pick.used_immunity_idol],
+                'points_week_total': [None, pick.points_week_total],
+            }
+            rows.append(self._row(pick.user_profile_id, 'new pick', changes))
+        for profile_id, profile in self.profiles.items():
+            before = self._original_profiles[profile_id]
+            changes = {
+                f: [before[f], getattr(profile, f)] for f in SCORED_PROFILE_FIELDS if before[f] != getattr(profile, f)
+            }
+            if changes:
+                rows.append(self._row(profile_id, 'profile', changes))
+        return rows
+
+    def _row(self, profile_id, kind, changes):
+        profile = self.profiles.get(profile_id)
+        week = self.week_by_league.get(profile.league_id) if profile else None
+        return {
+            'league': week.league.name if week else None,
+            'user': profile.user.username if profile else profile_id,
+            'week': week.number if week else None,
+            'kind': kind,
+            'changes': changes,
+        }
+
+
+def _field_values(obj, fields):
+    return {f: getattr(obj, f) for f in fields}
+
+
+def plan_weeks(weeks, outcome, notify=None, lock=True):
+    """
+    Score every pick of `weeks` (same episode number, one Week per league)
+    against `outcome` in memory and return a ScoringPlan. Reads only: missing
+    picks are built unsaved and profile counters are moved in memory by each
+    pick's change in contribution. With `lock`, profile rows are locked
+    (caller must be inside a transaction).
+    """
+    weeks = list(weeks)
+    if not weeks:
+        return ScoringPlan([], {}, [], [])
+    number = weeks[0].number
+    season = outcome.season
+    if any(w.number != number or w.season != season for w in weeks):
+        raise ValueError("plan_weeks() expects weeks sharing one season and episode number.")
+
+    week_by_league = {w.league_id: w for w in weeks}
+    league_ids = list(week_by_league)
+    # Prefix messages with the league name when scoring several leagues at once
+    prefix = (lambda w: f"[{w.league.name}] ") if len(weeks) > 1 else (lambda w: "")
+
+    # Profiles are row-locked: counters are updated from in-memory deltas below
+    profiles_qs = UserProfile.objects.filter(league_id__in=league_ids).select_related('user')
+    if lock:
+        profiles_qs = profiles_qs.select_for_update(of=('self',))
+    profiles = {p.id: p for p in profiles_qs}
+
+    # Prior-week idol availability for every league, one grouped read of the idol ledger
+    prior_available = aggregates.idol_balances(league_ids, season, number)
+
+    # Map existing picks for these weeks
+    existing_picks = {p.user_profile_id: p for p in Pick.objects.filter(week__in=weeks)}
+
+    plan = ScoringPlan(weeks, profiles, list(existing_picks.values()), [])
+    if len(existing_picks) < len(profiles):
+        # The boot is excluded even before it's marked inactive (dry runs)
+        active_contestants = [c for c in get_catalog(season).active if c.id != outcome.voted_out.id]
+
+        # Safe picks already used by every missing profile: its masks (poolapp.safe_masks).
+        # They cover the whole season, so profiles with picks in later weeks, like those
+        # without masks for this season, have their earlier picks read instead.
+        missing = [pid for pid in profiles if pid not in existing_picks]
+        masked = {pid for pid in missing if safe_masks.masks_for(profiles[pid], season) is not None}
+        if masked:
+            masked -= set(
+                Pick.objects.filter(user_profile_id__in=masked, week__season=season, week__number__gt=number)
+                .values_list('user_profile_id', flat=True)
+            )
+        used_safe = defaultdict(set)
+        for pid in masked:
+            used_safe[pid] = safe_masks.ids_in(
+                profiles[pid].used_safe_mask | profiles[pid].other_safe_mask, active_contestants,
+            )
+        unmasked = [pid for pid in missing if pid not in masked]
+        if unmasked:
+            for profile_id, safe_pick_id in (
+                Pick.objects
+                .filter(user_profile_id__in=unmasked, week__season=season, week__number__lt=number)
+                .values_list('user_profile_id', 'safe_pick_id')
+            ):
+                used_safe[profile_id].add(safe_pick_id)
+
+        plan.created = build_missing_picks(
+            profiles, existing_picks, week_by_league, prior_available, lambda prof: used_safe[prof.id],
+            active_contestants, notify, prefix,
+        )
+
+    # Correctness + points + exile/elimination, all in memory
+    picks = plan.picks + plan.created
+    voted_out_id = outcome.voted_out.id
+    imty_winner_id = outcome.imty_winner.id if outcome.imty_winner else None
+    before = {id(pick): aggregates.snapshot(pick) for pick in picks}
+    score_picks(picks, voted_out_id, imty_winner_id, outcome.winner_tribe, outcome.n_tribes, outcome.tribe_by_id)
+    deltas = {}
+    for pick in picks:
+        after = pick.counter_contribution()
+        delta = aggregates.contribution_delta(before[id(pick)], after)
+        aggregates.add_delta(deltas.setdefault(pick.user_profile_id, {}), delta)
+        plan.ledger += aggregates.idol_entries(pick, delta)
+        pick._counter_snapshot = after
+
+        profile = profiles.get(pick.user_profile_id)
+        if profile is None:
+            continue
+        week = week_by_league[profile.league_id]
+        transition = apply_exile_transition(profile, pick, voted_out_id, number)
+        if transition == 'exiled':
+            _log(notify, 'warning',
+                 f"{prefix(week)}{profile.user.username} has been exiled (Safe pick went home; no idol).")
+        elif transition == 'eliminated':
+            _log(notify, 'error',
+                 f"{prefix(week)}{profile.user.username} was already exiled and missed Safe again: "
+                 f"ELIMINATED (permanent).")
+
+    # --- Move counters by the deltas (no recount of the season's picks) ---
+    for profile_id, delta in deltas.items():
+        if profile_id in profiles:
+            aggregates.apply_delta(profiles[profile_id], delta)
+
+    return plan
+
+
+def build_missing_picks(profiles, existing_picks, week_by_league, prior_available, prev_safe_ids,
+                        active_contestants, notify=None, prefix=lambda w: ""):
+    """
+    For any profile missing a Pick, build a **non-blank** unsaved Pick:
+      1) If idol available (`prior_available[profile_id]`) -> used_immunity_idol=True
+      2) Else -> auto-assign Safe from `active_contestants` not in `prev_safe_ids(profile)`
+    New picks are added to `existing_picks`; returns the list of new picks.
+    """
+    created = []
+    for prof in profiles.values():
+        if prof.id in existing_picks:
+            continue
+        week = week_by_league[prof.league_id]
+
+        if prior_available.get(prof.id, 0) > 0:
+            pick = Pick(
+                user_profile=prof,
+                week=week,
+                used_immunity_idol=True,
+                auto_assigned=True
+            )
+            prior_available[prof.id] -= 1
+            _log(notify, 'warning', f"{prefix(week)}Auto-burned an idol for {prof.user.username} (missed week).")
+        else:
+            used = prev_safe_ids(prof)
+            candidates = [c for c in active_contestants if c.id not in used]
+            chosen = stable_choice(candidates, (prof.id, week.id))
+            pick = Pick(
+                user_profile=prof,
+                week=week,
+                safe_pick=chosen,  # may be None if no candidates remain
+                auto_assigned=True
+            )
+            if chosen:
+                _log(notify, 'warning', f"{prefix(week)}Auto-assigned Safe Pick for {prof.user.username}: {chosen.name}")
+            else:
+                _log(notify, 'warning', f"{prefix(week)}No available Safe candidate to auto-assign for {prof.user.username}.")
+        existing_picks[prof.id] = pick
+        created.append(pick)
+
+    if created:
+        _log(notify, 'warning', f"Created {len(created)} pick(s) for users with no submission.")
+    return created
+
+
+def score_weeks(weeks, outcome, notify=None):
+    """Plan and apply scoring for a batch of weeks; returns a summary dict."""
+    # Hard barrier: every buffered submission for these weeks must be a Pick row first
+    pick_buffer.ensure_flushed(weeks)
+    return plan_weeks(weeks, outcome, notify=notify).apply()
+
+
+def score_week(week, outcome, notify=None):
+    """Score a single league's week; see `plan_weeks`."""
+    return score_weeks([week], outcome, notify=notify)
+
+
+def replay_league_season(league, season, notify=None):
+    """
+    Rebuild one league's season from its stored WeekResults: every scored week
+    is replayed in order with exile, elimination, idol and used-Safe state
+    carried forward in memory, then everything is flushed with bulk writes.
+    Caller holds a transaction (profile rows are locked).
+
+    Returns from exile are replayed from the league's Activity log: a return
+    bought before a week's lock_time clears the exile before that week.
+    Weeks with no recorded immunity result keep their stored immunity flags.
+    """
+    catalog = get_catalog(season)
+    contestants, tribe_by_id = catalog.contestants, catalog.tribe_by_id
+    weeks = list(
+        Week.objects.filter(league=league, season=season)
+        .select_related('result__voted_out_contestant', 'result__imty_challenge_winner')
+        .order_by('number')
+    )
+    profiles = {
+        p.id: p for p in (
+            UserProfile.objects.filter(league=league)
+            .select_related('user').select_for_update(of=('self',))
+        )
+    }
+    picks_by_week = defaultdict(dict)
+    for pick in Pick.objects.filter(week__league=league, week__season=season):
+        picks_by_week[pick.week_id][pick.user_profile_id] = pick
+    returns = defaultdict(list)
+    for user_id, ts in (
+        Activity.objects.filter(league=league, description__startswith=RETURN_ACTIVITY_PREFIX)
+        .order_by('timestamp').values_list('user_id', 'timestamp')
+    ):
+        returns[user_id].append(ts)
+
+    def replay_returns(before=None):
+        for prof in profiles.values():
+            pending = returns.get(prof.user_id)
+            while pending and (before is None or pending[0] < before):
+                pending.pop(0)
+                if prof.exiled and not prof.eliminated:
+                    prof.exiled = False
+
+    # Replay from a clean slate
+    for prof in profiles.values():
+        prof.exiled = False
+        prof.eliminated = False
+    idol_balance = defaultdict(int)
+    used_safe = defaultdict(set)
+    booted = set()
+    created = []
+    replayed = []
+
+    for week in weeks:
+        outcome = outcome_from_result(getattr(week, 'result', None), tribe_by_id)
+        if outcome is None:
+            continue
+        replay_returns(before=week.lock_time)
+        voted_out_id = outcome.voted_out.id
+        booted.add(voted_out_id)
+
+        week_picks = picks_by_week[week.id]
+        if len(week_picks) < len(profiles):
+            created += build_missing_picks(
+                profiles, week_picks, {league.id: week},
+                {pid: max(0, n) for pid, n in idol_balance.items()},
+                lambda prof: used_safe[prof.id],
+                [c for c in contestants if c.id not in booted],
+                notify,
+            )
+
+        picks = list(week_picks.values())
+        imty_winner_id = outcome.imty_winner.id if outcome.imty_winner else None
+        score_picks(
+            picks, voted_out_id, imty_winner_id, outcome.winner_tribe, outcome.n_tribes,
+            tribe_by_id, keep_imty_flags=outcome.imty_winner is None and outcome.winner_tribe is None,
+        )
+        for pick in picks:
+            prof = profiles.get(pick.user_profile_id)
+            if prof is not None:
+                apply_exile_transition(prof, pick, voted_out_id, week.number)
+            idol_balance[pick.user_profile_id] += int(pick.voted_out_pick_correct) - int(pick.used_immunity_idol)
+            used_safe[pick.user_profile_id].add(pick.safe_pick_id)
+        replayed.append(week)
+    replay_returns()
+
+    # --- Flush: new picks, scored picks, rebuilt profile counters ---
+    all_picks = [p for week_picks in picks_by_week.values() for p in week_picks.values()]
+    stored = [p for p in all_picks if p.pk is not None]
+    with aggregates.deferred_deltas():
+        Pick.objects.bulk_create(created)
+    Pick.objects.bulk_update(stored, SCORED_PICK_FIELDS, batch_size=1000)
+    safe_masks.refresh(profiles, season)
+
+    totals = defaultdict(lambda: dict(aggregates.ZERO))
+    for pick in all_picks:
+        pick._counter_snapshot = pick.counter_contribution()
+        aggregates.add_delta(totals[pick.user_profile_id], pick._counter_snapshot)
+    for prof in profiles.values():
+        aggregates.set_counters(prof, totals[prof.id])
+    UserProfile.objects.bulk_update(list(profiles.values()), SCORED_PROFILE_FIELDS)
+    IdolLedgerEntry.objects.bulk_create(_ledger_corrections(league, season, all_picks))
+    for week in replayed:  # in order: each snapshot reads the previous week's rank
+        snapshot_ranks([week])
+    bump_scoring_version([league.id])
+
+    return {'weeks': len(replayed), 'picks': len(all_picks), 'created': len(created), 'profiles': len(profiles)}
+
+
+def _ledger_corrections(league, season, picks):
+    """
+    Entries bringing the league's idol ledger in line with `picks` (one grouped
+    read): the ledger is append-only, so drift is corrected, never rewritten.
+    """
+    expected = defaultdict(int)
+    for pick in picks:
+        expected[(pick.user_profile_id, pick.week_id, IdolLedgerEntry.EARNED)] += int(bool(pick.voted_out_pick_correct))
+        expected[(pick.user_profile_id, pick.week_id, IdolLedgerEntry.SPENT)] -= int(bool(pick.used_immunity_idol))
+    recorded = {
+        (r['user_profile'], r['week'], r['kind']): r['amount'] for r in (
+            IdolLedgerEntry.objects.filter(week__league=league, week__season=season)
+            .values('user_profile', 'week', 'kind').annotate(amount=Sum('amount'))
+        )
+    }
+    corrections = []
+    for key in set(expected) | set(recorded):
+        missing = expected.get(key, 0) - recorded.get(key, 0)
+        if missing:
+            profile_id, week_id, kind = key
+            corrections.append(IdolLedgerEntry(user_profile_id=profile_id, week_id=week_id, kind=kind, amount=missing))
+    return corrections
@@ -0,0 +1,158 @@
+# poolapp/scoring_kernel.py
+
+"""
+Pure, side-effect-free scoring rules.
+
+Everything here works on plain values or columnar NumPy arrays: no ORM, no
+settings, no I/O. `score_columns` is the vectorized implementation used by the
+scoring engine and by what-if simulations; `score_scalar` is the one-pick
+reference implementation the vectorized kernel is checked against
+(`parity_mismatches`).
+
+Rules:
+  - Safe +1, Voted Out +3, Immunity +2 when correct.
+  - Wagers: a correct VO pays 2 x wager, a correct Immunity pays floor(1.5 x wager);
+    a wrong pick loses its wager.
+  - Parlay (VO + Immunity) is all-or-nothing: if either is wrong, both base
+    points are zeroed and both wagers are lost; if both are right, +20 bonus.
+"""
+
+import numpy as np
+
+SAFE_POINTS = 1
+VO_POINTS = 3
+IMMUNITY_POINTS = 2
+PARLAY_BONUS = 20
+
+POINT_COLUMNS = ('points_safe', 'points_vo', 'points_immunity', 'points_wagers', 'points_parlay', 'points_week_total')
+
+
+# ---------- Correctness ----------
+
+def correctness_columns(safe_ids, vo_ids, imty_ids, voted_out_id, imty_winner_id=None,
+                        imty_tribe_match=None, by_tribe=False):
+    """
+    Correctness flags for columns of contestant ids (0 = no pick).
+    Pre-merge (`by_tribe`), Immunity is judged on `imty_tribe_match`, a boolean
+    column telling whether the picked contestant belongs to the winning tribe.
+    Returns (safe_correct, vo_correct, imty_correct) boolean arrays.
+    """
+    safe_ids = np.asarray(safe_ids)
+    vo_ids = np.asarray(vo_ids)
+    imty_ids = np.asarray(imty_ids)
+
+    safe_correct = (safe_ids != 0) & (safe_ids != voted_out_id)
+    vo_correct = (vo_ids != 0) & (vo_ids == voted_out_id)
+    if by_tribe:
+        imty_correct = (imty_ids != 0) & np.asarray(imty_tribe_match, dtype=bool)
+    elif imty_winner_id is None:
+        imty_correct = np.zeros(imty_ids.shape, dtype=bool)
+    else:
+        imty_correct = (imty_ids != 0) & (imty_ids == imty_winner_id)
+    return safe_correct, vo_correct, imty_correct
+
+
+# ---------- Points ----------
+
+def score_scalar(safe_correct, vo_correct, imty_correct, parlay, wager_vo, wager_imty):
+    """Reference implementation for one pick. Returns a dict keyed by POINT_COLUMNS."""
+    base_safe = SAFE_POINTS if safe_correct else 0
+    base_vo = VO_POINTS if vo_correct else 0
+    base_im = IMMUNITY_POINTS if imty_correct else 0
+
+    wv = wager_vo or 0
+    wi = wager_imty or 0
+    both_correct = bool(vo_correct and imty_correct)
+
+    if parlay and not both_correct:
+        base_vo = 0
+        base_im = 0
+        points_wagers = -wv - wi
+        parlay_bonus = 0
+    else:
+        wager_gain_vo = (2 * wv) if vo_correct else -wv
+        wager_gain_im = int(1.5 * wi) if imty_correct else -wi
+        points_wagers = wager_gain_vo + wager_gain_im
+        parlay_bonus = PARLAY_BONUS if (parlay and both_correct) else 0
+
+    return {
+        'points_safe': base_safe,
+        'points_vo': base_vo,
+        'points_immunity': base_im,
+        'points_wagers': points_wagers,
+        'points_parlay': parlay_bonus,
+        'points_week_total': base_safe + base_vo + base_im + points_wagers + parlay_bonus,
+    }
+
+
+def score_columns(safe_correct, vo_correct, imty_correct, parlay, wager_vo, wager_imty):
+    """
+    Vectorized scoring over equal-length columns (booleans and non-negative int wagers).
+    Returns a dict of int64 arrays keyed by POINT_COLUMNS.
+    """
+    safe_correct = np.asarray(safe_correct, dtype=bool)
+    vo_correct = np.asarray(vo_correct, dtype=bool)
+    imty_correct = np.asarray(imty_correct, dtype=bool)
+    parlay = np.asarray(parlay, dtype=bool)
+    wv = np.asarray(wager_vo, dtype=np.int64)
+    wi = np.asarray(wager_imty, dtype=np.int64)
+
+    both_correct = vo_correct & imty_correct
+    busted = parlay & ~both_correct          # parlay lost: all-or-nothing
+    paid = ~busted
+
+    points_safe = np.where(safe_correct, SAFE_POINTS, 0)
+    points_vo = np.where(vo_correct & paid, VO_POINTS, 0)
+    points_immunity = np.where(imty_correct & paid, IMMUNITY_POINTS, 0)
+
+    # floor(1.5 * w) == (3 * w) // 2 for non-negative integer wagers
+    gain_vo = np.where(vo_correct & paid, 2 * wv, -wv)
+    gain_im = np.where(imty_correct & paid, (3 * wi) // 2, -wi)
+    points_wagers = gain_vo + gain_im
+    points_parlay = np.where(parlay & both_correct, PARLAY_BONUS, 0)
+
+    return {
+        'points_safe': points_safe.astype(np.int64),
+        'points_vo': points_vo.astype(np.int64),
+        'points_immunity': points_immunity.astype(np.int64),
+        'points_wagers': points_wagers.astype(np.int64),
+        'points_parlay': points_parlay.astype(np.int64),
+        'points_week_total': (points_safe + points_vo + points_immunity + points_wagers + points_parlay).astype(np.int64),
+    }
+
+
+def score_columns_reference(safe_correct, vo_correct, imty_correct, parlay, wager_vo, wager_imty):
+    """`score_columns` computed pick by pick with `score_scalar` (slow; for parity checks)."""
+    rows = [
+        score_scalar(*args)
+        for args in zip(safe_correct, vo_correct, imty_correct, parlay, wager_vo, wager_imty)
+    ]
+    return {col: np.array([r[col] for r in rows], dtype=np.int64) for col in POINT_COLUMNS}
+
+
+def parity_mismatches(safe_correct, vo_correct, imty_correct, parlay, wager_vo, wager_imty):
+    """Row indices where the vectorized kernel disagrees with the scalar reference."""
+    args = (safe_correct, vo_correct, imty_correct, parlay, wager_vo, wager_imty)
+    fast = score_columns(*args)
+    slow = score_columns_reference(*args)
+    bad = np.zeros(len(fast['points_week_total']), dtype=bool)
+    for col in POINT_COLUMNS:
+        bad |= fast[col] != slow[col]
+    return np.flatnonzero(bad)
+
+
+def random_columns(n, rng=None, max_wager=3):
+    """Synthetic pick columns for what-if analyses and parity checks."""
+    rng = rng if rng is not None else np.random.default_rng()
+    wager_vo = rng.integers(0, max_wager + 1, n)
+    wager_imty = rng.integers(0, max_wager + 1, n)
+    over = wager_vo + wager_imty > max_wager     # weekly cap applies to the sum
+    wager_imty = np.where(over, max_wager - wager_vo, wager_imty)
+    return (
+        rng.random(n) < 0.9,    # safe_correct
+        rng.random(n) < 0.15,   # vo_correct
+        rng.random(n) < 0.3,    # imty_correct
+        rng.random(n) < 0.1,    # parlay
+        wager_vo,
+        wager_imty,
+    )
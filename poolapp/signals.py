@@ -1,14 +1,17 @@
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_save, pre_save, post_delete, m2m_changed
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile, League, Week, Profile
+from .models import UserProfile, League, Week, Profile, Pick, Contestant
+from . import aggregates, safe_masks
+from .leaderboard import bump_member_leagues, bump_profile_league, bump_scoring_version
+from .catalog import bump_contestants_version
+from .pick_context import bump_pick_context
+from .provisioning import REMINDER_LEAD, REMINDER_TASK, provision_weeks, reminder_task_name, week_dates
 from django.conf import settings
-import datetime
-from zoneinfo import ZoneInfo
 from django.utils import timezone
 import logging
 from django_celery_beat.models import PeriodicTask, ClockedSchedule
-from datetime import timedelta
 import json
 
 logger = logging.getLogger(__name__)
@@ -23,6 +26,19 @@ def create_user_profile(sender, instance, created, **kwargs):
 def save_user_profile(sender, instance, **kwargs):
     instance.profile.save()
 
+@receiver(post_save, sender=User)
+def invalidate_leaderboards_on_rename(sender, instance, created, update_fields=None, **kwargs):
+    """Cached leaderboards and picks tables show the username (logins only touch last_login)."""
+    if not created and (update_fields is None or 'username' in update_fields):
+        bump_member_leagues(instance.id)
+
+@receiver(post_save, sender=Profile)
+def invalidate_leaderboards_on_avatar(sender, instance, created, raw, **kwargs):
+    avatar = instance.avatar.name
+    if not created and not raw and getattr(instance, '_avatar_snapshot', None) != avatar:
+        bump_member_leagues(instance.user_id)
+    instance._avatar_snapshot = avatar
+
 @receiver(post_save, sender=League)
 def add_creator_to_league(sender, instance, created, **kwargs):
     if created:
@@ -42,6 +58,7 @@ def create_user_league_profile(sender, instance, action, reverse, pk_set, **kwar
                 user = User.objects.get(pk=user_id)
                 profile, created = UserProfile.objects.get_or_create(user=user, league=instance)
                 if created:
+                    bump_scoring_version([instance.id])
                     logger.info(f"UserProfile created for '{user.username}' in League '{instance.name}'.")
                 else:
                     logger.debug(f"UserProfile already exists for '{user.username}' in League '{instance.name}'.")
@@ -61,38 +78,14 @@ def create_weeks_for_league(sender, instance, created, **kwargs):
         logger.error(f"No SEASON_CONFIG for season {season}. Skipping week creation.")
         return
 
-    start_date = cfg["START_DATE"]
-    episodes = cfg["EPISODES"]
-    lock_hour = cfg.get("LOCK_HOUR_ET", 20)
-    lock_weekday = cfg.get("LOCK_WEEKDAY", 2)  # default Wednesday
-    eastern = ZoneInfo("America/New_York")
-
-    # If weeks for this league+season already exist, do nothing (idempotent)
-    if Week.objects.filter(league=instance, season=season).exists():
-        logger.info(f"Weeks already present for league '{instance.name}' season {season}; skipping.")
-        return
-
-    created_count = 0
-    for week_number in range(1, episodes + 1):
-        # derive start_date for each week
-        wk_start = start_date + datetime.timedelta(weeks=week_number - 1)
-
-        # compute lock_time on configured weekday @ lock_hour ET
-        days_to_target = (lock_weekday - wk_start.weekday()) % 7
-        lock_date = wk_start + datetime.timedelta(days=days_to_target)
-        naive_lock = datetime.datetime(
-            lock_date.year, lock_date.month, lock_date.day,
-            lock_hour, 0, 0, 0
-        )
-        lock_dt = timezone.make_aware(naive_lock, eastern)
-
-        _, created_row = Week.objects.get_or_create(
-            league=instance, season=season, number=week_number,
-            defaults={'start_date': wk_start, 'lock_time': lock_dt}
-        )
-        created_count += int(created_row)
-
-    logger.info(f"Created {created_count} week(s) for league '{instance.name}' season {season}.")
+    # Weeks, results and reminders in a few bulk statements; existing weeks are kept (idempotent)
+    dates = week_dates(
+        cfg["START_DATE"], cfg["EPISODES"],
+        lock_hour=cfg.get("LOCK_HOUR_ET", 20),
+        lock_weekday=cfg.get("LOCK_WEEKDAY", 2),  # default Wednesday
+    )
+    weeks = provision_weeks([instance], season, dates)
+    logger.info(f"Created {len(weeks)} week(s) for league '{instance.name}' season {season}.")
 
 @receiver(post_save, sender=Week)
 def schedule_week_reminder(sender, instance, created, **kwargs):
@@ -101,7 +94,7 @@ def schedule_week_reminder(sender, instance, created, **kwargs):
     to send reminders 2 hours before the week's lock_time.
     """
     # Calculate the reminder time (2 hours before lock_time)
-    reminder_time = instance.lock_time - timedelta(hours=2)
+    reminder_time = instance.lock_time - REMINDER_LEAD
 
     # Ensure the time is valid
     if reminder_time <= timezone.now():
@@ -113,13 +106,104 @@ def schedule_week_reminder(sender, instance, created, **kwargs):
     )
 
     # Create or update the PeriodicTask
-    task_name = f"Send reminder for Week {instance.number} in {instance.league.name}"
+    task_name = reminder_task_name(instance, instance.league)
     PeriodicTask.objects.update_or_create(
         name=task_name,
         defaults={
-            'task': 'poolapp.tasks.send_reminder_emails_for_week',  # Adjust based on your task path
+            'task': REMINDER_TASK,
             'clocked': clocked_schedule,
             'args': json.dumps([instance.id]),  # Pass the week ID as an argument
             'one_off': True,  # Ensure the task runs only once
         }
-    )
\ No newline at end of file
+    )
+
+
+@receiver(pre_save, sender=Pick)
+def snapshot_pick_counters(sender, instance, raw, **kwargs):
+    """
+    Picks loaded normally already carry their counter snapshot (Pick.from_db).
+    For instances built by hand or loaded with deferred fields, read the stored row once.
+    """
+    if raw or aggregates.deltas_deferred() or instance._state.adding:
+        return
+    if getattr(instance, '_counter_snapshot', None) is None:
+        stored = Pick.objects.filter(pk=instance.pk).first()
+        instance._counter_snapshot = stored.counter_contribution() if stored else None
+
+
+@receiver(post_save, sender=Pick)
+def apply_pick_counter_delta(sender, instance, raw, **kwargs):
+    """Move the profile's maintained counters by this pick's change in contribution."""
+    if raw or aggregates.deltas_deferred():
+        return
+    aggregates.record_pick_change(instance)
+
+
+@receiver(post_delete, sender=Pick)
+def remove_pick_counter_contribution(sender, instance, origin=None, **kwargs):
+    if aggregates.deltas_deferred():
+        return
+    # When the pick goes with its week/profile/league, its ledger entries are cascaded too
+    direct = isinstance(origin, Pick) or getattr(origin, 'model', None) is Pick
+    aggregates.record_pick_change(instance, deleted=True, ledger=direct)
+
+
+@receiver(post_save, sender=Pick)
+@receiver(post_delete, sender=Pick)
+def invalidate_pick_context(sender, instance, raw=False, **kwargs):
+    """The member's cached make_picks context is rebuilt after any change to their picks."""
+    if not raw:
+        profile_id = instance.user_profile_id
+        bump_pick_context(profile_id)
+        # Again once committed: a context cached from the old rows in between is dropped too
+        transaction.on_commit(lambda: bump_pick_context(profile_id))
+
+
+@receiver(post_save, sender=Pick)
+@receiver(post_delete, sender=Pick)
+def invalidate_locked_week_picks(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    Picks of locked weeks are cached in rendered tables: an edit re-renders them
+    even when it moves no counter. Open weeks' picks are never cached there.
+    """
+    if raw or aggregates.deltas_deferred():
+        return  # bulk writers bump the version themselves
+    if origin is not None and not (isinstance(origin, Pick) or getattr(origin, 'model', None) is Pick):
+        return  # deleted along with its week, profile or league
+    lock_time = instance.week.lock_time
+    if lock_time and lock_time <= timezone.now():
+        bump_profile_league(instance.user_profile_id)
+
+
+def _bump_contestants(season):
+    bump_contestants_version(season)
+    # Again once committed: a catalog cached from the old rows in between is dropped too
+    transaction.on_commit(lambda: bump_contestants_version(season))
+
+
+@receiver(post_save, sender=Contestant)
+def invalidate_contestant_cards(sender, instance, created, raw, **kwargs):
+    """Rebuild the season's contestant catalog and cards when anything they show changes."""
+    state = instance.card_state()
+    if created or raw or getattr(instance, '_card_snapshot', None) != state:
+        _bump_contestants(instance.season)
+    instance._card_snapshot = state
+
+
+@receiver(post_delete, sender=Contestant)
+def invalidate_contestant_cards_on_delete(sender, instance, **kwargs):
+    _bump_contestants(instance.season)
+
+
+@receiver(post_save, sender=Pick)
+@receiver(post_delete, sender=Pick)
+def refresh_safe_masks(sender, instance, raw=False, origin=None, **kwargs):
+    """Recompute the member's used-Safe masks (poolapp.safe_masks) after any change to their picks."""
+    if raw:
+        return
+    profile_id = instance.user_profile_id
+    if origin is None or isinstance(origin, Pick) or getattr(origin, 'model', None) is Pick:
+        safe_masks.refresh([profile_id], instance.week.season)
+    else:
+        # Deleted along with its week, profile or a contestant: recount once those rows are gone
+        transaction.on_commit(lambda: safe_masks.refresh([profile_id]))
@@ -0,0 +1,154 @@
+# poolapp/synthetic.py
+
+"""
+Synthetic season data for benchmarks and load tests (`manage.py benchmark`).
+
+`build_season` creates N leagues x M members with the season's weeks and
+realistic picks: most members submit every week, Safe picks never repeat,
+wagers, parlays and idols are used now and then, and every week up to
+`scored_weeks` is scored by the real engine, so exile, elimination, idols and
+totals look like production. Output is deterministic for a given seed.
+
+Booted contestants are flipped inactive: only run this against a throwaway
+database.
+"""
+
+import datetime
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from poolapp import aggregates, safe_masks
+from poolapp.catalog import bump_contestants_version, get_catalog
+from poolapp.models import Contestant, IdolLedgerEntry, League, Pick, Profile, UserProfile, Week, WeekResult
+from poolapp.scoring import outcome_from_ids, result_fields, score_weeks
+
+TRIBES = ['kele', 'hina', 'uli']
+CONTESTANTS = 18
+MERGE_WEEK = 7          # immunity is won by a tribe before this week, by a contestant after
+
+
+def ensure_contestants(season):
+    """The season's contestants, creating a synthetic cast if there is none."""
+    contestants = list(Contestant.objects.filter(season=season).order_by('id'))
+    if not contestants:
+        contestants = Contestant.objects.bulk_create([
+            Contestant(season=season, name=f"Castaway {i + 1}", tribe=TRIBES[i % len(TRIBES)], ordinal=i)
+            for i in range(CONTESTANTS)
+        ])
+        bump_contestants_version(season)
+    return contestants
+
+
+def build_season(n_leagues, n_members, scored_weeks=8, seed=0, prefix='bench'):
+    """
+    Build `n_leagues` leagues of `n_members` members for settings.CURRENT_SEASON.
+    Weeks 1..scored_weeks get picks and are scored; week scored_weeks + 1 is
+    the open week (locks in a few days). Returns the leagues.
+    """
+    season = settings.CURRENT_SEASON
+    rng = random.Random(seed)
+    ensure_contestants(season)
+
+    with transaction.atomic():
+        leagues = [_build_league(f"{prefix}-{i}", n_members) for i in range(n_leagues)]
+        _set_lock_times(leagues, season, scored_weeks)
+
+    for number in range(1, scored_weeks + 1):
+        weeks = list(
+            Week.objects.filter(league__in=leagues, season=season, number=number).select_related('league')
+        )
+        with transaction.atomic():
+            _submit_picks(weeks, season, rng)
+            _score(weeks, season, number, rng)
+    return leagues
+
+
+def _build_league(name, n_members):
+    # The creator goes through the normal signals (membership, profile, weeks)
+    creator = User.objects.create(username=f"{name}-m0")
+    league = League.objects.create(name=name, creator=creator)
+
+    users = User.objects.bulk_create([User(username=f"{name}-m{j}") for j in range(1, n_members)])
+    Profile.objects.bulk_create([Profile(user=u) for u in users])
+    League.members.through.objects.bulk_create([League.members.through(league=league, user=u) for u in users])
+    UserProfile.objects.bulk_create([UserProfile(user=u, league=league) for u in users])
+    return league
+
+
+def _set_lock_times(leagues, season, scored_weeks):
+    """Scored weeks locked in the past, one week apart; the next week still open."""
+    now = timezone.now()
+    for number in Week.objects.filter(league__in=leagues, season=season).values_list('number', flat=True).distinct():
+        lock_time = now + datetime.timedelta(days=7 * (number - scored_weeks) - 3)
+        Week.objects.filter(league__in=leagues, season=season, number=number).update(
+            lock_time=lock_time, start_date=(lock_time - datetime.timedelta(days=2)).date(),
+        )
+
+
+def _submit_picks(weeks, season, rng):
+    week_by_league = {w.league_id: w for w in weeks}
+    active = get_catalog(season).active
+    used_safe = defaultdict(set)
+    for profile_id, safe_pick_id in Pick.objects.filter(
+        week__league_id__in=week_by_league, week__season=season
+    ).values_list('user_profile_id', 'safe_pick_id'):
+        used_safe[profile_id].add(safe_pick_id)
+
+    picks = []
+    profiles = UserProfile.objects.filter(league_id__in=week_by_league, eliminated=False).order_by('id')
+    for prof in profiles:
+        if rng.random() < 0.1:
+            continue  # missed week: the engine burns an idol or auto-assigns a Safe pick
+        if prof.immunity_idols and rng.random() < 0.3:
+            picks.append(Pick(user_profile=prof, week=week_by_league[prof.league_id], used_immunity_idol=True))
+            continue
+        candidates = [c for c in active if c.id not in used_safe[prof.id]]
+        safe = rng.choice(candidates) if candidates else None
+        voted_out = rng.choice([c for c in active if c != safe])
+        wager_vo = rng.choice([0, 0, 0, 1, 2, 3])
+        picks.append(Pick(
+            user_profile=prof,
+            week=week_by_league[prof.league_id],
+            safe_pick=safe,
+            voted_out_pick=voted_out,
+            imty_challenge_winner_pick=rng.choice(active),
+            wager_voted_out=wager_vo,
+            wager_immunity=rng.randint(0, 3 - wager_vo),
+            parlay=rng.random() < 0.1,
+        ))
+
+    # Idols played count against the profile as soon as the pick exists
+    ledger = []
+    with aggregates.deferred_deltas():
+        Pick.objects.bulk_create(picks, batch_size=1000)
+    deltas = defaultdict(dict)
+    for pick in picks:
+        delta = aggregates.contribution_delta(aggregates.ZERO, pick.counter_contribution())
+        aggregates.add_delta(deltas[pick.user_profile_id], delta)
+        ledger += aggregates.idol_entries(pick, delta)
+    for profile_id, delta in deltas.items():
+        aggregates.apply_delta_to_db(profile_id, delta)
+    IdolLedgerEntry.objects.bulk_create(ledger, batch_size=1000)
+    safe_masks.refresh(deltas, season)
+
+
+def _score(weeks, season, number, rng):
+    active = get_catalog(season).active
+    voted_out = rng.choice(active)
+    if number < MERGE_WEEK:
+        imty_winner = None
+        winner_tribe = rng.choice(sorted({c.tribe for c in active if c.tribe != voted_out.tribe} or set(TRIBES)))
+    else:
+        imty_winner = rng.choice([c for c in active if c != voted_out])
+        winner_tribe = imty_winner.tribe
+
+    outcome = outcome_from_ids(season, voted_out.id, imty_winner.id if imty_winner else None, winner_tribe)
+    WeekResult.objects.filter(week__in=weeks).update(**result_fields(outcome))  # rows exist since Week.save
+    score_weeks(weeks, outcome)
+    Contestant.objects.filter(id=voted_out.id).update(is_active=False)
+    bump_contestants_version(season)
@@ -54,4 +54,81 @@ def send_reminder_emails_for_week(week_id, debug=False):
         else:
             return f"No reminders sent; current time is not within the reminder window for Week {week.number}."
     except Week.DoesNotExist:
-        return f"Week with ID {week_id} does not exist."
\ No newline at end of file
+        return f"Week with ID {week_id} does not exist."
+
+@shared_task
+def score_leagues_week(league_ids, week_number, season, voted_out_id, imty_winner_id, winner_tribe):
+    """
+    Score one chunk of leagues for an episode. Each league is scored in its own
+    transaction while holding a row lock on the League, so two concurrent runs
+    serialize per league instead of clobbering each other.
+    Returns a list of per-league summaries for the chord callback.
+    """
+    from django.db import transaction
+    from poolapp.models import League, WeekResult
+    from poolapp import pick_buffer
+    from poolapp.scoring import outcome_from_ids, result_fields, score_week
+
+    # Buffered submissions become Picks before any league of the chunk is scored
+    pick_buffer.flush(
+        Week.objects.filter(league_id__in=league_ids, season=season, number=week_number).values_list('id', flat=True)
+    )
+    outcome = outcome_from_ids(season, voted_out_id, imty_winner_id, winner_tribe)
+    summaries = []
+    for league_id in league_ids:
+        with transaction.atomic():
+            league = League.objects.select_for_update().filter(id=league_id).first()
+            if league is None:
+                summaries.append({'league_id': league_id, 'league': None, 'status': 'missing'})
+                continue
+            week = Week.objects.filter(league=league, season=season, number=week_number).first()
+            if week is None:
+                summaries.append({'league_id': league_id, 'league': league.name, 'status': 'no week'})
+                continue
+
+            WeekResult.objects.update_or_create(week=week, defaults=result_fields(outcome))
+            summary = score_week(week, outcome)
+        summaries.append({'league_id': league_id, 'league': league.name, 'status': 'scored', **summary})
+    return summaries
+
+
+@shared_task
+def summarize_league_scoring(chunk_results, week_number):
+    """Chord callback: flatten the per-chunk summaries into one per-league report."""
+    import logging
+    logger = logging.getLogger('poolapp')
+
+    leagues = [s for chunk in chunk_results for s in chunk]
+    scored = [s for s in leagues if s['status'] == 'scored']
+    for s in leagues:
+        logger.info(f"Week {week_number} scoring [{s['league']}]: {s}")
+    return {
+        'week': week_number,
+        'leagues': leagues,
+        'scored': len(scored),
+        'skipped': len(leagues) - len(scored),
+        'picks': sum(s['picks'] for s in scored),
+    }
+
+
+@shared_task
+def flush_pick_buffer():
+    """Write queued pick submissions to Pick rows (settings.PICK_BUFFER; see poolapp.pick_buffer)."""
+    from poolapp import pick_buffer
+
+    written = pick_buffer.flush()
+    return f"Flushed {written} buffered pick(s)."
+
+
+@shared_task
+def reconcile_profile_aggregates(season=None):
+    """Periodic safety net for the incrementally maintained UserProfile counters."""
+    import logging
+    from poolapp.aggregates import reconcile
+    logger = logging.getLogger('poolapp')
+
+    season = season or settings.CURRENT_SEASON
+    drifted = reconcile(season)
+    for profile, diff in drifted:
+        logger.warning(f"Repaired counter drift for profile {profile.id} ({profile.user.username}): {diff}")
+    return f"Reconciled Season {season}: repaired {len(drifted)} profile(s)."
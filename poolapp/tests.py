@@ -1,3 +1,780 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from poolapp import aggregates, pick_buffer, safe_masks, scoring
+from poolapp import scoring_kernel as kernel
+from poolapp.catalog import get_catalog
+from poolapp.models import Contestant, IdolLedgerEntry, League, Pick, Profile, UserProfile, Week, WeekResult
+from poolapp.pick_context import build_pick_context
+from poolapp.query_budget import budget_for, count_queries
+from poolapp.synthetic import build_season, ensure_contestants
+
+# python manage.py test poolapp --settings=survivor_pool.settings_bench
+
+
+COUNTER_FIELDS = [
+    'total_score', 'correct_guesses', 'correct_imty_challenge_guesses', 'immunity_idols_played', 'immunity_idols',
+]
+PICK_RESULT_FIELDS = [
+    'safe_pick_id', 'used_immunity_idol', 'auto_assigned', 'safe_pick_correct', 'voted_out_pick_correct',
+    'imty_challenge_winner_pick_correct', 'points_safe', 'points_vo', 'points_immunity', 'points_wagers',
+    'points_parlay', 'points_week_total',
+]
+PROFILE_STATE_FIELDS = COUNTER_FIELDS + ['exiled', 'eliminated', 'used_safe_mask', 'other_safe_mask']
+TRIBES = ['kele', 'hina', 'uli']
+
+
+def make_cast(season, size=6):
+    """`size` contestants for `season`, their tribes taking turns."""
+    return [
+        Contestant.objects.create(season=season, name=f"Castaway {i + 1}", tribe=TRIBES[i % len(TRIBES)])
+        for i in range(size)
+    ]
+
+
+def week_of(profile, number):
+    return Week.objects.get(league_id=profile.league_id, number=number)
+
+
+def open_week_submission(profile):
+    """A valid make_picks POST for `profile` in the open week (a Safe pick it hasn't used)."""
+    active = get_catalog(settings.CURRENT_SEASON).active
+    used = set(Pick.objects.filter(user_profile=profile).values_list('safe_pick_id', flat=True))
+    safe = next(c for c in active if c.id not in used)
+    return {
+        'submit_picks': '1',
+        'safe_pick': safe.id,
+        'voted_out_pick': next(c for c in active if c != safe).id,
+        'imty_challenge_winner_pick': active[-1].id,
+        'wager_voted_out': 0,
+        'wager_immunity': 0,
+    }
+
+
+class TwoLeagueMixin:
+    """
+    Two hand-built leagues of three members: week 1 picked by everyone and scored
+    by update_week_results, week 2 (locked, unscored) picked by two members.
+    Scoring week 2 with `week2_boot` exiles both of them; the others burn an idol
+    or get a Safe pick assigned.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = settings.CURRENT_SEASON
+        c = cls.cast = make_cast(cls.season)
+        cls.leagues = []
+        for i in range(2):
+            creator = User.objects.create(username=f"league{i}-m0")
+            league = League.objects.create(name=f"League {i}", creator=creator)
+            league.members.add(*[User.objects.create(username=f"league{i}-m{j}") for j in (1, 2)])
+            cls.leagues.append(league)
+        # Recent enough for update_week_results
+        now = timezone.now()
+        Week.objects.filter(season=cls.season, number=1).update(lock_time=now - timedelta(days=10))
+        Week.objects.filter(season=cls.season, number=2).update(lock_time=now - timedelta(days=3))
+
+        profiles = list(UserProfile.objects.filter(league__in=cls.leagues).order_by('id'))
+        for j, profile in enumerate(profiles):
+            Pick.objects.create(
+                user_profile=profile, week=week_of(profile, 1), safe_pick=c[2 + j % 4],
+                voted_out_pick=c[1] if j % 2 == 0 else c[0], imty_challenge_winner_pick=c[j % 3],
+                wager_voted_out=j % 3,
+            )
+        call_command('update_week_results', 1, c[1].name, c[0].tribe, stdout=io.StringIO())
+        for profile in profiles[::3]:
+            Pick.objects.create(
+                user_profile=profile, week=week_of(profile, 2), safe_pick=c[3], voted_out_pick=c[4],
+                imty_challenge_winner_pick=c[0],
+            )
+        cls.week2_boot = c[3]
+
+    def season_rows(self):
+        return (
+            list(
+                Pick.objects.order_by('user_profile_id', 'week__number')
+                .values_list('user_profile_id', 'week__number', *PICK_RESULT_FIELDS)
+            ),
+            list(UserProfile.objects.order_by('id').values_list('id', *PROFILE_STATE_FIELDS)),
+        )
+
+
+class SeasonMixin:
+    """A synthetic season (`n_leagues` x `n_members`, `scored_weeks` scored) and its first member logged in."""
+    n_leagues = 1
+    n_members = 3
+    scored_weeks = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.league = build_season(cls.n_leagues, cls.n_members, scored_weeks=cls.scored_weeks)[0]
+        cls.profile = (
+            UserProfile.objects.filter(league=cls.league, eliminated=False)
+            .select_related('user').order_by('id').first()
+        )
+        cls.user = cls.profile.user
+        cls.open_week = cls.scored_weeks + 1
+
+    def setUp(self):
+        cache.clear()  # cold caches: what is measured or checked is the miss
+        self.client.force_login(self.user)
+
+
+class QueryBudgetMixin(SeasonMixin):
+    """
+    Runs every budgeted view against a synthetic season of `n_leagues` x
+    `n_members` and fails if a request runs more queries than the view's
+    `@query_budget`. Subclasses only change the scale, so a per-member or
+    per-week query fails the large case.
+    """
+    n_leagues = 1
+    n_members = 5
+    scored_weeks = 5
+
+    def assertWithinBudget(self, method, url, data=None, expected_status=(200, 302), **extra):
+        view = resolve(url).func
+        budget = budget_for(view)
+        self.assertIsNotNone(budget, f"{url} has no @query_budget")
+        with count_queries() as counter:
+            response = getattr(self.client, method)(url, data or {}, **extra)
+            if response.streaming:  # the rows are read while streaming
+                response.content_bytes = b''.join(response.streaming_content)
+        self.assertIn(response.status_code, expected_status)
+        self.assertLessEqual(
+            counter.count, budget,
+            f"{method.upper()} {url} ran {counter.count} queries (budget {budget}) "
+            f"with {self.n_leagues}x{self.n_members} members"
+        )
+        return response
+
+    def test_dashboard(self):
+        self.assertWithinBudget('get', reverse('poolapp:dashboard'))
+
+    def test_league_detail(self):
+        self.assertWithinBudget('get', reverse('poolapp:league_detail', args=[self.league.id]))
+
+    def test_league_week_picks(self):
+        for number in (1, self.scored_weeks, self.open_week):
+            self.assertWithinBudget('get', reverse('poolapp:league_week_picks', args=[self.league.id, number]))
+
+    def test_user_profile(self):
+        self.assertWithinBudget('get', reverse('poolapp:user_profile', args=[self.league.id, self.user.id]))
+
+    def test_export_league(self):
+        url = reverse('poolapp:export_league', args=[self.league.id])
+        self.assertWithinBudget('get', url, {'format': 'ndjson'}, expected_status=(200,))
+        self.assertWithinBudget('get', url, {'format': 'csv', 'table': 'profiles'}, expected_status=(200,))
+
+    def test_make_picks(self):
+        url = reverse('poolapp:make_picks', args=[self.league.id, self.open_week])
+        self.assertWithinBudget('get', url)
+        self.assertWithinBudget('post', url, open_week_submission(self.profile))
+        self.assertTrue(Pick.objects.filter(user_profile=self.profile, week__number=self.open_week).exists())
+        self.assertWithinBudget('post', url, {'reset_picks': 'on'})
+        self.assertWithinBudget('post', url, {'submit_picks': '1', 'safe_pick': 0})  # invalid form
+
+    def test_pick_api(self):
+        url = reverse('poolapp:pick_api', args=[self.league.id, self.open_week])
+        picks = {k: v for k, v in open_week_submission(self.profile).items() if k != 'submit_picks'}
+        for action in ('validate', 'submit', 'reset'):
+            body = json.dumps({'action': action, 'picks': picks})
+            self.assertWithinBudget('post', url, body, content_type='application/json', expected_status=(200,))
+
+
+class SmallLeagueQueryBudgetTests(QueryBudgetMixin, TestCase):
+    n_leagues = 1
+    n_members = 5
+
+
+class LargeLeagueQueryBudgetTests(QueryBudgetMixin, TestCase):
+    n_leagues = 3
+    n_members = 80
+
+
+class ConditionalGetTests(SeasonMixin, TestCase):
+    def test_unchanged_page_is_304(self):
+        for url in (
+            reverse('poolapp:league_detail', args=[self.league.id]),
+            reverse('poolapp:user_profile', args=[self.league.id, self.user.id]),
+        ):
+            self.client.get(url)  # sets the CSRF cookie the tag depends on
+            etag = self.client.get(url)['ETag']
+            with count_queries() as counter:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertLessEqual(counter.count, 4, f"{url} revalidation ran {counter.count} queries")
+
+    def test_new_score_changes_etag(self):
+        url = reverse('poolapp:league_detail', args=[self.league.id])
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        League.objects.filter(id=self.league.id).update(scoring_version=F('scoring_version') + 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ExportTests(SeasonMixin, TestCase):
+    def export(self, **params):
+        response = self.client.get(reverse('poolapp:export_league', args=[self.league.id]), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_ndjson_has_locked_weeks_only(self):
+        rows = [json.loads(line) for line in self.export(format='ndjson')]
+        picks = Pick.objects.filter(week__league=self.league, week__number__lte=self.scored_weeks).count()
+        self.assertEqual(sum(row['table'] == 'picks' for row in rows), picks)
+        self.assertTrue(all(row['week'] <= self.scored_weeks for row in rows if row['table'] == 'picks'))
+
+    def test_csv_profiles(self):
+        lines = self.export(format='csv', table='profiles')
+        self.assertEqual(len(lines), self.n_members + 1)  # header + one row per member
+
+
+class PickApiTests(SeasonMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('poolapp:pick_api', args=[self.league.id, self.open_week])
+        self.picks = {k: v for k, v in open_week_submission(self.profile).items() if k != 'submit_picks'}
+
+    def call(self, action, **picks):
+        body = json.dumps({'action': action, 'picks': picks})
+        return self.client.post(self.url, body, content_type='application/json')
+
+    def stored(self):
+        return Pick.objects.filter(user_profile=self.profile, week__number=self.open_week).first()
+
+    def test_validate_writes_nothing(self):
+        self.assertEqual(self.call('validate', **self.picks).json()['status'], 'valid')
+        self.assertIsNone(self.stored())
+
+    def test_submit_and_reset(self):
+        response = self.call('submit', **self.picks)
+        self.assertEqual((response.status_code, response.json()['status']), (200, 'saved'))
+        self.assertEqual(response.json()['pick']['safe_pick'], self.picks['safe_pick'])
+        self.assertEqual(self.stored().safe_pick_id, self.picks['safe_pick'])
+        self.assertEqual(self.call('reset').json()['status'], 'reset')
+        self.assertIsNone(self.stored())
+
+    def test_rejected_submission_keeps_stored_pick(self):
+        self.call('submit', **self.picks)
+        response = self.call('submit', **{**self.picks, 'voted_out_pick': self.picks['safe_pick']})
+        self.assertEqual(response.status_code, 422)
+        self.assertTrue(response.json()['errors'])
+        self.assertEqual(response.json()['pick']['voted_out_pick'], self.picks['voted_out_pick'])
+
+    def test_bad_request_and_locked_week(self):
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        Week.objects.filter(league=self.league, number=self.open_week).update(lock_time=timezone.now())
+        self.assertEqual(self.call('submit', **self.picks).status_code, 409)
+
+
+class ContestantCatalogTests(TestCase):
+    season = settings.CURRENT_SEASON
+
+    @classmethod
+    def setUpTestData(cls):
+        ensure_contestants(cls.season)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_hit_runs_no_query(self):
+        get_catalog(self.season)
+        with count_queries() as counter:
+            catalog = get_catalog(self.season)
+        self.assertEqual(counter.count, 0)
+        self.assertEqual([c.id for c in catalog.contestants], sorted(catalog.by_id))
+
+    def test_save_and_delete_drop_cached_catalog(self):
+        catalog = get_catalog(self.season)
+        booted = Contestant.objects.get(id=catalog.active[0].id)
+        booted.is_active = False
+        booted.save()  # the version bump drops the cached catalog
+        self.assertIn(booted.id, {c.id for c in get_catalog(self.season).voted_out})
+        booted.delete()
+        self.assertNotIn(booted.id, get_catalog(self.season).by_id)
+
+    def test_boot_flip_leaves_shared_instance_alone(self):
+        build_season(1, 2, scored_weeks=1)
+        active = get_catalog(self.season).active
+        cached = active[0]
+        call_command('update_week_results', 2, cached.name, active[1].tribe, stdout=io.StringIO())
+        self.assertTrue(cached.is_active)
+        self.assertNotIn(cached.id, {c.id for c in get_catalog(self.season).active})
+
+
+class ScoringKernelTests(SimpleTestCase):
+    def test_vectorized_matches_scalar(self):
+        rng = np.random.default_rng(0)
+        self.assertEqual(list(kernel.parity_mismatches(*kernel.random_columns(5000, rng))), [])
+
+    def test_edge_cases_match_scalar(self):
+        # safe, vo, imty correct, parlay, wager vo, wager imty
+        cases = [
+            (True, True, True, True, 1, 2),     # parlay won
+            (True, True, False, True, 2, 1),    # parlay lost on immunity
+            (True, False, True, True, 3, 0),    # parlay lost on voted out
+            (False, True, False, False, 3, 0),  # wager on the boot, Safe went home
+            (True, False, False, False, 0, 3),  # lost wager
+            (False, False, False, False, 0, 0),
+        ]
+        self.assertEqual(list(kernel.parity_mismatches(*zip(*cases))), [])
+
+    def test_parlay_is_all_or_nothing(self):
+        won = kernel.score_scalar(True, True, True, True, 1, 2)
+        self.assertEqual(
+            (won['points_vo'], won['points_immunity'], won['points_wagers'], won['points_parlay']),
+            (kernel.VO_POINTS, kernel.IMMUNITY_POINTS, 2 * 1 + 3, kernel.PARLAY_BONUS),
+        )
+        lost = kernel.score_scalar(True, True, False, True, 2, 1)
+        self.assertEqual(
+            (lost['points_vo'], lost['points_immunity'], lost['points_wagers'], lost['points_parlay']),
+            (0, 0, -3, 0),
+        )
+        self.assertEqual(lost['points_week_total'], kernel.SAFE_POINTS - 3)
+
+    def test_wager_on_booted_contestant(self):
+        safe_ok, vo_ok, imty_ok = kernel.correctness_columns([5], [5], [0], voted_out_id=5)
+        self.assertEqual((bool(safe_ok[0]), bool(vo_ok[0]), bool(imty_ok[0])), (False, True, False))
+        points = kernel.score_columns(safe_ok, vo_ok, imty_ok, [False], [3], [0])
+        self.assertEqual((points['points_safe'][0], points['points_wagers'][0]), (0, 6))
+        self.assertEqual(points['points_week_total'][0], kernel.VO_POINTS + 6)
+
+    def test_idol_grant_and_burn(self):
+        granted = Pick(voted_out_pick_correct=True)
+        burned = Pick(used_immunity_idol=True, auto_assigned=True)
+        for pick, earned, spent in ((granted, 1, 0), (burned, 0, 1)):
+            delta = aggregates.contribution_delta(aggregates.ZERO, pick.counter_contribution())
+            self.assertEqual(delta['immunity_idols'], earned - spent)
+            entries = {e.kind: e.amount for e in aggregates.idol_entries(pick, delta)}
+            self.assertEqual(entries.get(IdolLedgerEntry.EARNED, 0), earned)
+            self.assertEqual(entries.get(IdolLedgerEntry.SPENT, 0), -spent)
+
+
+class ScoringEngineTests(TestCase):
+    """The engine on a hand-built two-member league, checked against points worked out by hand."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = settings.CURRENT_SEASON
+        cls.cast = make_cast(cls.season)
+        alice = User.objects.create(username='alice')
+        cls.league = League.objects.create(name='Engine League', creator=alice)
+        cls.league.members.add(User.objects.create(username='bob'))
+        cls.alice = UserProfile.objects.get(league=cls.league, user=alice)
+        cls.bob = UserProfile.objects.get(league=cls.league, user__username='bob')
+        cls.week1, cls.week2 = Week.objects.filter(league=cls.league, number__in=[1, 2]).order_by('number')
+
+    def score(self, week, voted_out, imty_winner_tribe):
+        outcome = scoring.resolve_outcome(self.season, voted_out.name, imty_winner_tribe)
+        return scoring.score_week(week, outcome)
+
+    def counters(self, profile):
+        profile.refresh_from_db()
+        return {field: getattr(profile, field) for field in COUNTER_FIELDS}
+
+    def pick(self, profile, week):
+        return Pick.objects.get(user_profile=profile, week=week)
+
+    def submit_week1(self):
+        c = self.cast
+        Pick.objects.create(
+            user_profile=self.alice, week=self.week1, safe_pick=c[0], voted_out_pick=c[1],
+            imty_challenge_winner_pick=c[2], wager_voted_out=2,
+        )
+        Pick.objects.create(
+            user_profile=self.bob, week=self.week1, safe_pick=c[1], voted_out_pick=c[3],
+            imty_challenge_winner_pick=c[4],
+        )
+
+    def test_score_then_rescore(self):
+        c = self.cast
+        self.submit_week1()
+        self.score(self.week1, voted_out=c[1], imty_winner_tribe=c[2].tribe)
+        # Alice: Safe 1 + VO 3 + wager 2x2 + tribal immunity 2; Bob's Safe went home (no exile in week 1)
+        self.assertEqual(self.pick(self.alice, self.week1).points_week_total, 10)
+        self.assertEqual(self.counters(self.alice), {
+            'total_score': 10, 'correct_guesses': 1, 'correct_imty_challenge_guesses': 1,
+            'immunity_idols_played': 0, 'immunity_idols': 1,
+        })
+        self.assertEqual(self.counters(self.bob), dict.fromkeys(COUNTER_FIELDS, 0))
+
+        # The boot was entered wrong: rescoring moves every counter by the difference
+        self.score(self.week1, voted_out=c[3], imty_winner_tribe=c[2].tribe)
+        alice_pick = self.pick(self.alice, self.week1)
+        self.assertEqual(
+            (alice_pick.points_vo, alice_pick.points_wagers, alice_pick.points_week_total), (0, -2, 1),
+        )
+        self.assertEqual(self.counters(self.alice), {
+            'total_score': 1, 'correct_guesses': 1, 'correct_imty_challenge_guesses': 1,
+            'immunity_idols_played': 0, 'immunity_idols': 0,
+        })
+        self.assertEqual(self.counters(self.bob), {
+            'total_score': 4, 'correct_guesses': 1, 'correct_imty_challenge_guesses': 0,
+            'immunity_idols_played': 0, 'immunity_idols': 1,
+        })
+
+    def test_missed_week_burns_idol_else_assigns_safe(self):
+        c = self.cast
+        self.submit_week1()
+        self.score(self.week1, voted_out=c[3], imty_winner_tribe=c[2].tribe)  # Bob earns an idol
+
+        boot = c[5]
+        boot.is_active = False
+        boot.save()  # as update_week_results does
+        summary = self.score(self.week2, voted_out=boot, imty_winner_tribe=c[0].tribe)
+        self.assertEqual(summary['created'], 2)
+        bob_pick = self.pick(self.bob, self.week2)
+        self.assertTrue(bob_pick.auto_assigned and bob_pick.used_immunity_idol)
+        self.assertIsNone(bob_pick.safe_pick_id)
+        bob = self.counters(self.bob)
+        self.assertEqual((bob['immunity_idols'], bob['immunity_idols_played']), (0, 1))
+        alice_pick = self.pick(self.alice, self.week2)
+        self.assertTrue(alice_pick.auto_assigned)
+        self.assertFalse(alice_pick.used_immunity_idol)
+        # A Safe pick Alice hasn't used, never the boot
+        self.assertNotIn(alice_pick.safe_pick_id, {c[0].id, boot.id})
+        self.assertEqual(alice_pick.points_week_total, 1)
+
+
+class ScoringPathParityTests(TwoLeagueMixin, TestCase):
+    """`update_week_results --single-pass` and the league-by-league path write the same rows."""
+
+    def run_command(self, **options):
+        """Rows after scoring week 2, rolled back afterwards."""
+        with transaction.atomic():
+            call_command(
+                'update_week_results', 2, self.week2_boot.name, self.cast[1].tribe,
+                stdout=io.StringIO(), **options,
+            )
+            rows = self.season_rows()
+            transaction.set_rollback(True)
+        return rows
+
+    def test_single_pass_matches_per_league(self):
+        per_league_picks, per_league_profiles = self.run_command()
+        single_pass_picks, single_pass_profiles = self.run_command(single_pass=True)
+        self.assertEqual(sum(1 for row in per_league_picks if row[1] == 2), UserProfile.objects.count())
+        self.assertEqual(
+            sum(1 for row in per_league_profiles if row[PROFILE_STATE_FIELDS.index('exiled') + 1]), 2,
+        )
+        self.assertEqual(single_pass_picks, per_league_picks)
+        self.assertEqual(single_pass_profiles, per_league_profiles)
+
+
+class DryRunTests(TwoLeagueMixin, TestCase):
+    def database_rows(self):
+        return (
+            list(Pick.objects.order_by('id').values()),
+            list(UserProfile.objects.order_by('id').values()),
+            list(WeekResult.objects.order_by('id').values()),
+            list(IdolLedgerEntry.objects.order_by('id').values()),
+            list(Contestant.objects.order_by('id').values_list('id', 'is_active')),
+        )
+
+    def test_dry_run_exports_without_writing(self):
+        before = self.database_rows()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'diff.json')
+            call_command(
+                'update_week_results', 2, self.week2_boot.name, self.cast[1].tribe,
+                dry_run=True, export=path, stdout=io.StringIO(),
+            )
+            with open(path) as f:
+                export = json.load(f)
+        self.assertEqual(self.database_rows(), before)
+
+        self.assertEqual(set(export), {'season', 'week', 'summary', 'changes'})
+        self.assertEqual((export['season'], export['week']), (self.season, 2))
+        self.assertEqual(set(export['summary']), {'picks', 'created', 'profiles', 'leagues'})
+        self.assertEqual(export['summary']['created'], 4)  # the members who didn't pick
+        self.assertLessEqual({'contestant', 'result', 'new pick', 'profile'}, {row['kind'] for row in export['changes']})
+        for row in export['changes']:
+            self.assertEqual(set(row), {'league', 'user', 'week', 'kind', 'changes'})
+
+
+class RebuildSeasonTests(TwoLeagueMixin, TestCase):
+    def test_rebuild_of_consistent_season_is_a_no_op(self):
+        call_command(
+            'update_week_results', 2, self.week2_boot.name, self.cast[1].tribe, stdout=io.StringIO(),
+        )
+        before = self.season_rows()
+        out = io.StringIO()
+        call_command('rebuild_season', stdout=out)
+        self.assertEqual(out.getvalue().count("replayed 2 week(s)"), len(self.leagues))
+        self.assertEqual(self.season_rows(), before)
+
+    def test_tribeless_immunity_winner_is_rescored(self):
+        league = self.leagues[0]
+        week = Week.objects.get(league=league, number=1)
+        pick = Pick.objects.filter(week=week, imty_challenge_winner_pick__isnull=False).order_by('id').first()
+        winner = pick.imty_challenge_winner_pick
+        # Immunity won by a contestant with no tribe on record; the stored flag is wrong
+        winner.tribe = None
+        winner.save(update_fields=['tribe'])
+        WeekResult.objects.filter(week=week).update(imty_challenge_winner=winner, imty_winner_tribe=None)
+        Pick.objects.filter(id=pick.id).update(imty_challenge_winner_pick_correct=False)
+
+        call_command('rebuild_season', league=[league.id], stdout=io.StringIO())
+        pick.refresh_from_db()
+        self.assertTrue(pick.imty_challenge_winner_pick_correct)
+        self.assertEqual(aggregates.reconcile(self.season, [league.id], repair=False), [])
+
+
+class CounterRepairTests(TwoLeagueMixin, TestCase):
+    def test_ledger_balance_matches_idol_counter(self):
+        league_ids = [league.id for league in self.leagues]
+        balances = aggregates.idol_balances(league_ids, self.season, 3)
+        self.assertTrue(any(balances.values()))
+        for profile in UserProfile.objects.filter(league__in=self.leagues):
+            self.assertEqual(balances.get(profile.id, 0), profile.immunity_idols)
+
+    def test_reconcile_repairs_drifted_counters(self):
+        league = self.leagues[0]
+        profile = UserProfile.objects.filter(league=league).order_by('id').first()
+        UserProfile.objects.filter(id=profile.id).update(
+            immunity_idols=F('immunity_idols') + 2, total_score=F('total_score') - 7,
+        )
+        drifted = aggregates.reconcile(self.season, [league.id])
+        self.assertEqual(
+            [(p.id, sorted(diff)) for p, diff in drifted], [(profile.id, ['immunity_idols', 'total_score'])],
+        )
+        repaired = UserProfile.objects.get(id=profile.id)
+        self.assertEqual(
+            (repaired.immunity_idols, repaired.total_score), (profile.immunity_idols, profile.total_score),
+        )
+        self.assertEqual(aggregates.reconcile(self.season, [league.id], repair=False), [])
+
+
+class SafeMaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.league = build_season(1, 3, scored_weeks=3)[0]
+        cls.season = settings.CURRENT_SEASON
+
+    def test_refresh_restores_corrupted_mask(self):
+        profile = UserProfile.objects.filter(league=self.league, eliminated=False).order_by('id').first()
+        catalog = get_catalog(self.season).by_id
+        chosen = Pick.objects.filter(user_profile=profile, safe_pick__isnull=False).filter(safe_masks.CHOSEN)
+        expected = safe_masks.mask_of(catalog[pk] for pk in chosen.values_list('safe_pick_id', flat=True))
+        self.assertNotEqual(expected, 0)
+        self.assertEqual(profile.used_safe_mask, expected)
+
+        UserProfile.objects.filter(id=profile.id).update(used_safe_mask=0, other_safe_mask=1 << 40)
+        safe_masks.refresh([profile.id])
+        profile.refresh_from_db()
+        self.assertEqual(safe_masks.masks_for(profile, self.season), (expected, 0))
+
+    def test_season_capped_at_mask_width(self):
+        season = self.season + 1
+        Contestant.objects.bulk_create([
+            Contestant(season=season, name=f"Castaway {i}", ordinal=i)
+            for i in range(Contestant.MAX_PER_SEASON - 1)
+        ])
+        last = Contestant.objects.create(season=season, name="Last castaway")
+        self.assertEqual(last.ordinal, Contestant.MAX_PER_SEASON - 1)
+        with self.assertRaises(ValidationError):
+            Contestant.objects.create(season=season, name="One too many")
+
+    def test_later_week_pick_is_not_used_yet(self):
+        profile = UserProfile.objects.filter(league=self.league, eliminated=False).order_by('id').first()
+        week, later = Week.objects.filter(league=self.league, number__in=[4, 5]).order_by('number')
+        data = open_week_submission(profile)
+        Pick.objects.create(
+            user_profile=profile, week=later, safe_pick_id=data['safe_pick'],
+            voted_out_pick_id=data['voted_out_pick'], imty_challenge_winner_pick_id=data['imty_challenge_winner_pick'],
+        )
+        profile.refresh_from_db()
+        self.assertTrue(profile.used_safe_mask & safe_masks.bit(get_catalog(self.season).by_id[data['safe_pick']]))
+
+        with_masks = build_pick_context(profile, week)
+        profile.safe_mask_season = None  # as if the masks weren't maintained yet
+        without_masks = build_pick_context(profile, week)
+        available = [c.id for c in with_masks.available_safe]
+        self.assertEqual(available, [c.id for c in without_masks.available_safe])
+        self.assertIn(data['safe_pick'], available)
+
+
+class FakeRedis:
+    """The few Redis commands poolapp.pick_buffer uses, in memory; `ack` stands in for its Lua script."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.sets = {}
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hmget(self, key, fields):
+        return [self.hget(key, f) for f in fields]
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key, field):
+        return int(self.hashes.get(key, {}).pop(field, None) is not None)
+
+    def hlen(self, key):
+        return len(self.hashes.get(key, {}))
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, ()))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def ack(self, keys, args):
+        hash_key, weeks_key = keys
+        deleted = 0
+        for field, value in zip(args[1::2], args[2::2]):
+            if self.hget(hash_key, field) == value:
+                deleted += self.hdel(hash_key, field)
+        if not self.hlen(hash_key):
+            self.sets.get(weeks_key, set()).discard(args[0])
+        return deleted
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+class PickBufferTests(SeasonMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # A member holding an idol, so a submission can move counters before scoring
+        cls.profile = UserProfile.objects.filter(league=cls.league, immunity_idols__gt=0, eliminated=False).first()
+        cls.user = cls.profile.user
+        cls.week = Week.objects.get(league=cls.league, number=cls.open_week)
+
+    def setUp(self):
+        super().setUp()
+        redis = FakeRedis()
+        patched = (pick_buffer._client, pick_buffer._ack)
+        pick_buffer._client, pick_buffer._ack = redis, redis.ack
+        self.addCleanup(setattr, pick_buffer, '_client', patched[0])
+        self.addCleanup(setattr, pick_buffer, '_ack', patched[1])
+        # Not on the class: the season is built (and scored) with the buffer off
+        buffer_on = override_settings(PICK_BUFFER=True)
+        buffer_on.enable()
+        self.addCleanup(buffer_on.disable)
+
+    def stored_pick(self):
+        return Pick.objects.filter(user_profile=self.profile, week=self.week).first()
+
+    def test_latest_submission_is_flushed(self):
+        url = reverse('poolapp:make_picks', args=[self.league.id, self.open_week])
+        first = open_week_submission(self.profile)
+        self.assertEqual(self.client.post(url, first).status_code, 302)
+        self.assertEqual(self.client.post(url, {**first, 'used_immunity_idol': 'True', 'wager_voted_out': 1}).status_code, 302)
+        self.assertIsNone(self.stored_pick())
+        self.assertEqual(pick_buffer.pending_count(), 1)  # the idol replaced the first submission
+
+        before = UserProfile.objects.get(id=self.profile.id)
+        self.assertEqual(pick_buffer.flush(), 1)
+        self.assertEqual(pick_buffer.pending_count(), 0)
+        pick = self.stored_pick()
+        self.assertTrue(pick.used_immunity_idol)
+        self.assertEqual((pick.safe_pick_id, pick.wager_voted_out), (first['safe_pick'], 1))
+        after = UserProfile.objects.get(id=self.profile.id)
+        self.assertEqual(after.immunity_idols, before.immunity_idols - 1)
+        self.assertEqual(after.immunity_idols_played, before.immunity_idols_played + 1)
+        self.assertEqual(aggregates.reconcile(settings.CURRENT_SEASON, [self.league.id], repair=False), [])
+
+    def test_submission_after_lock_is_dropped(self):
+        data = open_week_submission(self.profile)
+        pick_buffer.enqueue(
+            Pick(
+                user_profile=self.profile, week=self.week, safe_pick_id=data['safe_pick'],
+                voted_out_pick_id=data['voted_out_pick'],
+                imty_challenge_winner_pick_id=data['imty_challenge_winner_pick'],
+            ),
+            submitted_at=self.week.lock_time,
+        )
+        self.assertEqual(pick_buffer.pending_count(), 1)
+        self.assertEqual(pick_buffer.flush(), 0)
+        self.assertEqual(pick_buffer.pending_count(), 0)
+        self.assertIsNone(self.stored_pick())
+
+
+class LeagueProvisioningTests(TestCase):
+    def test_create_league(self):
+        creator = User.objects.create(username='founder')
+        with count_queries() as counter:
+            league = League.objects.create(name='Fresh League', creator=creator)
+        episodes = settings.SEASON_CONFIG[settings.CURRENT_SEASON]['EPISODES']
+        self.assertEqual(Week.objects.filter(league=league).count(), episodes)
+        self.assertEqual(WeekResult.objects.filter(week__league=league).count(), episodes)
+        # Weeks, results and reminders are bulk inserted, not saved week by week
+        self.assertLessEqual(counter.count, 25, f"creating a league ran {counter.count} queries")
+
+
+class LeaderboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.league = build_season(1, 3, scored_weeks=2)[0]
+        cls.profile = UserProfile.objects.filter(league=cls.league).select_related('user').order_by('id').first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.profile.user)
+
+    def scoring_version(self):
+        return League.objects.values_list('scoring_version', flat=True).get(id=self.league.id)
+
+    def test_rename_re_renders_locked_week(self):
+        url = reverse('poolapp:league_week_picks', args=[self.league.id, 1])
+        self.client.get(url)  # cached under the current version
+        user = self.profile.user
+        user.username = 'renamed-member'
+        user.save()
+        self.assertContains(self.client.get(url), 'renamed-member')
+
+    def test_avatar_and_locked_pick_bump_version(self):
+        version = self.scoring_version()
+        profile = Profile.objects.get(user_id=self.profile.user_id)
+        profile.save()  # nothing shown changed
+        self.assertEqual(self.scoring_version(), version)
+        profile.avatar.name = 'avatars/new.png'
+        profile.save()
+        self.assertGreater(self.scoring_version(), version)
+
+        version = self.scoring_version()
+        pick = Pick.objects.filter(user_profile=self.profile, week__number=1).first()
+        pick.save()  # an admin re-save of a locked week's pick
+        self.assertGreater(self.scoring_version(), version)
+
+    def test_tied_scores_share_rank(self):
+        UserProfile.objects.filter(league=self.league).update(total_score=4)
+        response = self.client.get(reverse('poolapp:league_detail', args=[self.league.id]))
+        self.assertEqual({p.rank for p in response.context['leaderboard']}, {1})
@@ -9,10 +9,13 @@ urlpatterns = [
     path('', views.dashboard, name='dashboard'),  # General Dashboard
     path('register/', views.register, name='register'),
     path('league/<int:league_id>/', views.league_detail, name='league_detail'),  # League-Specific Dashboard
+    path('league/<int:league_id>/week/<int:week_number>/picks/', views.league_week_picks, name='league_week_picks'),  # Week panel (lazy)
     path('create-league/', views.create_league, name='create_league'),  # Create League
     path('join-league/', views.join_league, name='join_league'),  # Join League
     #path('league/<int:league_id>/', views.league_detail, name='league_detail'),  # League Detail
     path('league/<int:league_id>/week/<int:week_number>/make-picks/', views.make_picks, name='make_picks'),  # Make Picks
+    path('league/<int:league_id>/week/<int:week_number>/make-picks/api/', views.pick_api, name='pick_api'),  # Make Picks (JSON, make_picks.js)
     path('league/<int:league_id>/user/<int:user_id>/', views.user_profile, name='user_profile'),
     path("league/<int:league_id>/return/", views.return_from_exile, name="return_from_exile"),
+    path('league/<int:league_id>/export/', views.export_league, name='export_league'),  # History download (streamed)
 ]
\ No newline at end of file
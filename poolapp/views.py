@@ -1,15 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.core.cache import cache
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login, authenticate
 from django.db import IntegrityError, transaction
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from .models import *
 from django.contrib import messages
 from django.db.models import Count
-from .forms import PickForm, ExtendedUserCreationForm
+from .forms import ExtendedUserCreationForm
+from .pick_grid import build_pick_grid
+from .pick_context import build_pick_context, get_pick_context
+from .leaderboard import LEADERBOARD_TIMEOUT, bump_scoring_version, get_leaderboard, week_picks_key
+from .catalog import CARDS_TIMEOUT, get_catalog
+from .etags import league_detail_etag, user_profile_etag
+from .export import CONTENT_TYPES, TABLES, stream_export
+from .query_budget import query_budget
+from . import pick_buffer
+from .pick_submission import (
+    ACCEPTED, MIN_FLOOR, WEEKLY_CAP, lock_profile, pick_form, pick_state, read_profile, reset_picks, submit_picks,
+)
+import json
 import logging
-from django.db.models import Sum
 
 
 logger = logging.getLogger('poolapp')
@@ -108,7 +124,8 @@ def return_from_exile(request, league_id):
         messages.error(request, "You are not a member of this league.")
         return redirect('poolapp:dashboard')
 
-    profile = get_object_or_404(UserProfile, user=request.user, league=league)
+    # Row lock: the counters on this profile are also moved by pick saves and scoring
+    profile = get_object_or_404(UserProfile.objects.select_for_update(), user=request.user, league=league)
 
     # Only exiled players can return
     if not profile.exiled:
@@ -119,13 +136,8 @@ def return_from_exile(request, league_id):
         messages.error(request, "You have been permanently eliminated and cannot return.")
         return redirect('poolapp:league_detail', league_id=league.id)
 
-    # Calculate current total score (picks minus exile costs)
-    picks_total = Pick.objects.filter(
-        user_profile=profile,
-        week__league=league,
-        week__season=settings.CURRENT_SEASON
-    ).aggregate(Sum('points_week_total'))['points_week_total__sum'] or 0
-    current_total = picks_total - profile.exile_return_cost
+    # Current total score (picks minus exile costs) is maintained on the profile
+    current_total = profile.total_score
 
     # Enforce global floor (cannot go below -3 after purchase)
     if (current_total - RETURN_COST_POINTS) < MIN_FLOOR_POINTS:
@@ -140,7 +152,8 @@ def return_from_exile(request, league_id):
     profile.exiled = False
     # Update total_score immediately to reflect the cost
     profile.total_score = current_total - RETURN_COST_POINTS
-    profile.save()
+    profile.save(update_fields=['exile_return_cost', 'exiled', 'total_score'])
+    bump_scoring_version([league.id])
 
     Activity.objects.create(
         league=league,
@@ -151,330 +164,210 @@ def return_from_exile(request, league_id):
     messages.success(request, f"You've returned from exile (-{RETURN_COST_POINTS} points). Good luck!")
     return redirect('poolapp:league_detail', league_id=league.id)
 
+@query_budget(12)
 @login_required
 @transaction.atomic
 def make_picks(request, league_id, week_number):
     """
     Handles making/updating picks and resetting picks for a given league and week.
-    Uses atomic transaction to prevent race conditions with lock time.
+    Runs in one transaction; POSTs lock the member's profile row and check the lock time in the database.
+    Showing, submitting and re-showing the form share one cached PickContext.
     """
-    # Retrieve the League and Week instances
-    league = get_object_or_404(League, id=league_id)
-    week = get_object_or_404(Week, number=week_number, league=league, season=settings.CURRENT_SEASON)
-
-    # Ensure the logged-in user is a member of the league
-    if request.user not in league.members.all():
-        messages.error(request, "You are not a member of this league.")
-        logger.warning(f"User {request.user.username} attempted to access League {league.id} without membership.")
-        return redirect('poolapp:dashboard')
-    
-    # Retrieve the UserProfile instance for the current user
-    profile, created = UserProfile.objects.get_or_create(user=request.user, league=league)
-    if created:
-        logger.info(f"UserProfile created for {request.user.username} in League '{league.name}'.")
+    # Retrieve the Week with its League in one query
+    week = get_object_or_404(
+        Week.objects.select_related('league'),
+        number=week_number, league_id=league_id, season=settings.CURRENT_SEASON,
+    )
+    league = week.league
+
+    # Retrieve the UserProfile instance for the current user; only members have one
+    profile = UserProfile.objects.filter(user=request.user, league=league).first()
+    if profile is None:
+        # Ensure the logged-in user is a member of the league
+        if not league.members.filter(id=request.user.id).exists():
+            messages.error(request, "You are not a member of this league.")
+            logger.warning(f"User {request.user.username} attempted to access League {league.id} without membership.")
+            return redirect('poolapp:dashboard')
+        profile, created = UserProfile.objects.get_or_create(user=request.user, league=league)
+        if created:
+            logger.info(f"UserProfile created for {request.user.username} in League '{league.name}'.")
 
     # Check if player is eliminated (cannot make picks)
     if profile.eliminated:
         messages.error(request, "You have been permanently eliminated and cannot make picks.")
         return redirect('poolapp:league_detail', league_id=league.id)
 
-    # Calculate fresh current score (picks minus exile costs) for accurate wager validation
-    user_picks = Pick.objects.filter(
-        user_profile=profile,
-        week__league=league,
-        week__season=settings.CURRENT_SEASON
-    )
-    picks_total = user_picks.aggregate(Sum('points_week_total'))['points_week_total__sum'] or 0
-    current_score = picks_total - profile.exile_return_cost
-
-    # Calculate fresh idol count (idols earned minus idols used)
-    idols_earned = user_picks.filter(voted_out_pick_correct=True).count()
-    idols_used = user_picks.filter(used_immunity_idol=True).count()
-    current_idol_count = max(0, idols_earned - idols_used)
+    # With settings.PICK_BUFFER on, submissions are queued in Redis and written in
+    # batches (see poolapp.pick_buffer); they skip the row lock and validate against cache
+    buffered = request.method == 'POST' and 'submit_picks' in request.POST and pick_buffer.enabled()
+
+    if buffered:
+        # The week's lock checked against database time, without the row lock
+        profile = read_profile(profile, week)
+        week_open = profile.week_open
+    elif request.method == 'POST':
+        # Row lock, and the week's lock checked against database time
+        profile = lock_profile(profile, week)
+        week_open = profile.week_open
+
+    # Current score (picks minus exile costs) and idol count (earned minus used)
+    # are maintained incrementally on the profile (see poolapp.aggregates)
+    current_score = profile.total_score
+    current_idol_count = profile.immunity_idols
     
     # Determine if the user has at least one immunity idol
     has_immunity_idol = current_idol_count > 0 
+
+    def render_page(form):
+        return render(request, 'make_picks.html', {
+            'league': league,
+            'week': week,
+            'form': form,
+            'safe_pick_queryset': ctx.available_safe,
+            'voted_out_pick_queryset': ctx.active,
+            'imty_challenge_winner_pick_queryset': ctx.active,
+            'has_immunity_idol': has_immunity_idol,
+            'weekly_cap': WEEKLY_CAP,
+            'min_floor': MIN_FLOOR,
+            'current_points': current_score
+        })
+
+    def flash(outcome):
+        for level, text in outcome.messages:
+            messages.add_message(request, level, text)
+
     if request.method == 'POST':
-        if timezone.now() >= week.lock_time:
+        if not week_open:
             messages.error(request, "This week is locked. You can’t change picks now.")
+            logger.warning(f"User {request.user.username} attempted to change picks for locked Week {week.number} in League {league.id}.")
             return redirect('poolapp:league_detail', league_id=league.id)
 
         if 'reset_picks' in request.POST:
             # Handle reset action
-            current_time = timezone.now()
-            if week.lock_time <= current_time:
-                messages.error(request, "Cannot reset picks for a locked week.")
-                logger.warning(f"User {request.user.username} attempted to reset picks for locked Week {week.number} in League {league.id}.")
-                return redirect('poolapp:league_detail', league_id=league.id)
-            
-            try:
-                pick = Pick.objects.get(user_profile=profile, week=week)
-                pick.delete()
-                messages.success(request, f"Your picks for Week {week.number} have been reset.")
-                logger.info(f"User {request.user.username} reset picks for Week {week.number} in League {league.id}.")
-            except Pick.DoesNotExist:
-                messages.info(request, "You have no picks to reset for this week.")
-                logger.info(f"User {request.user.username} attempted to reset picks for Week {week.number} in League {league.id} but had no picks.")
+            flash(reset_picks(request.user, profile, week))
             return redirect('poolapp:league_detail', league_id=league.id)
-        
-        elif 'submit_picks' in request.POST:
-            # Handle pick submission
-            # Fetch all active contestants
-            all_active = Contestant.objects.filter(is_active=True, season=settings.CURRENT_SEASON)
-            previous_picks = Pick.objects.filter(
-                user_profile=profile,
-                week__league=league,
-                week__season=settings.CURRENT_SEASON,
-                week__number__lt=week_number
-            )
-            existing_pick = Pick.objects.filter(user_profile=profile, week=week).first()
-
-            if existing_pick:
-                # Exclude all previous safe picks except the current one
-                previously_safe_picks = previous_picks.exclude(id=existing_pick.id)
-                # Only exclude safe picks that were NOT auto-assigned (i.e., had other picks made)
-                previously_safe_chosen_ids = previously_safe_picks.filter(
-                    voted_out_pick__isnull=False,
-                    imty_challenge_winner_pick__isnull=False
-                ).values_list('safe_pick_id', flat=True)
-            else:
-                # Only exclude safe picks that were NOT auto-assigned (i.e., had other picks made)
-                previously_safe_chosen_ids = previous_picks.filter(
-                    voted_out_pick__isnull=False,
-                    imty_challenge_winner_pick__isnull=False
-                ).values_list('safe_pick_id', flat=True)
-
-            # Define available safe options, ensuring the current pick is included
-            available_safe_options = all_active.exclude(id__in=previously_safe_chosen_ids)
-            if existing_pick and existing_pick.safe_pick_id:
-                available_safe_options = available_safe_options | Contestant.objects.filter(id=existing_pick.safe_pick_id, season=settings.CURRENT_SEASON)
-
-            # Define available voted out options (no exclusions needed)
-            available_voted_options = all_active
-
-            form = PickForm(
-                request.POST if request.method == 'POST' else None,
-                instance=existing_pick,
-                has_immunity_idol=has_immunity_idol,
-                available_safe=available_safe_options,
-                available_voted=available_voted_options,
-                current_points=current_score,
-                weekly_cap=3,
-                min_floor=-3,
-            )
-
-            # Validate form
-            if form.is_valid():
-                # Retrieve cleaned data
-                safe_pick = form.cleaned_data.get('safe_pick')
-                voted_out_pick = form.cleaned_data.get('voted_out_pick')
-                imty_challenge_winner_pick = form.cleaned_data.get('imty_challenge_winner_pick')
-                use_idol = form.cleaned_data.get('used_immunity_idol')
-
-                # --- Enforce "Safe Pick required unless none remain" ---
-                # Determine whether the user already has a safe pick set on this week (editing case)
-                existing_safe_id = existing_pick.safe_pick_id if existing_pick and existing_pick.safe_pick_id else None
-
-                # Build the "true" set of remaining safe options the user has NOT used in prior weeks.
-                # Note: available_safe_options already includes the existing pick (if any), so it's safe for edit flows.
-                # We want to know if there exists at least one unused active contestant the user has NOT ever chosen safe before,
-                # OR, if editing, they can keep their current safe pick.
-                # We'll treat "keeping the existing safe pick" as satisfying the rule; so only error if they submit with no safe pick
-                # AND they don't have a previously selected safe pick for this week AND there is still at least one unused active contestant left.
-                has_any_unused_active_left = available_safe_options.exclude(id=existing_safe_id).exists()
-
-                if not safe_pick:
-                    if existing_safe_id:
-                        # They tried to clear safe pick while at least one safe option remains (including the previously set one).
-                        # Rule: must have a safe pick unless none remain.
-                        messages.error(request, "You must keep or choose a Safe Pick unless none are available.")
-                        return render(request, 'make_picks.html', {
-                            'league': league,
-                            'week': week,
-                            'form': form,
-                            'safe_pick_queryset': available_safe_options,
-                            'voted_out_pick_queryset': available_voted_options,
-                            'imty_challenge_winner_pick_queryset': all_active,
-                            'has_immunity_idol': has_immunity_idol
-                        })
-                    else:
-                        if has_any_unused_active_left:
-                            # They have never set a safe pick for this week AND there are still unused active contestants.
-                            messages.error(request, "You must select a Safe Pick (you still have unused active contestants).")
-                            return render(request, 'make_picks.html', {
-                                'league': league,
-                                'week': week,
-                                'form': form,
-                                'safe_pick_queryset': available_safe_options,
-                                'voted_out_pick_queryset': available_voted_options,
-                                'imty_challenge_winner_pick_queryset': all_active,
-                                'has_immunity_idol': has_immunity_idol
-                            })
-                        else:
-                            # No unused active contestants remain and no existing safe pick — allow submission
-                            # but warn the user they may be exiled (idol can still save them; Option 2 applies).
-                            messages.warning(
-                                request,
-                                "No unused active contestants remain for a Safe Pick this week. "
-                                "You may be exiled if your non-safe situation results in elimination, "
-                                "unless an idol protects you or you return later."
-                            )
-
-                # --- Prevent duplicate safe pick across weeks (unless it's the same record being edited) ---
-                if safe_pick and safe_pick.id in previously_safe_chosen_ids and (not existing_pick or safe_pick != existing_pick.safe_pick):
-                    messages.error(request, "You have already chosen this contestant as safe in a previous week.")
-                    logger.error(f"User {request.user.username} attempted to choose a duplicate safe pick (Contestant ID {safe_pick.id}) for Week {week.number} in League {league.id}.")
-                    return redirect('poolapp:make_picks', league_id=league.id, week_number=week.number)
-
-                # --- Save the pick ---
-                pick = form.save(commit=False)
-                pick.user_profile = profile
-                pick.week = week
-
-                # If editing and they provided a new immunity winner pick, persist it explicitly (keeps your prior pattern)
-                if existing_pick:
-                    pick.imty_challenge_winner_pick = imty_challenge_winner_pick
-
-                # Idol checkbox: just record intent here; inventory is handled in the results command idempotently
-                if use_idol and has_immunity_idol:
-                    if not existing_pick or not existing_pick.used_immunity_idol:
-                        pick.used_immunity_idol = True
-                        logger.info(f"User {request.user.username} used an immunity idol for Week {week.number} in League {league.id}.")
-                else:
-                    if existing_pick and existing_pick.used_immunity_idol:
-                        pick.used_immunity_idol = False
-                        logger.info(f"User {request.user.username} did not use immunity idol for Week {week.number} in League {league.id}.")
-
-                pick.save()
-
-                if existing_pick:
-                    messages.success(request, f"Your picks for Week {week.number} have been updated.")
-                    logger.info(f"User {request.user.username} updated picks for Week {week.number} in League {league.id}.")
-                else:
-                    messages.success(request, f"Your picks for Week {week.number} have been saved.")
-                    logger.info(f"User {request.user.username} created picks for Week {week.number} in League {league.id}.")
 
+        if buffered:
+            # The member's latest queued submission counts as their pick for the week
+            ctx = pick_buffer.with_pending(get_pick_context(profile, week), profile, week)
+        else:
+            # Active contestants, Safe picks already used and this week's stored pick,
+            # read under the profile lock rather than from the cache
+            ctx = build_pick_context(profile, week)
+
+        if 'submit_picks' in request.POST:
+            # Handle pick submission (rules shared with the JSON pick API)
+            outcome = submit_picks(request.user, profile, week, ctx, request.POST, buffered=buffered)
+            flash(outcome)
+            if outcome.status == 'duplicate_safe':
+                return redirect('poolapp:make_picks', league_id=league.id, week_number=week.number)
+            if outcome.status in ACCEPTED:
                 return redirect('poolapp:league_detail', league_id=league.id)
-            else:
-                # Form invalid
-                messages.error(request, "Please correct the errors below.")
-                logger.error(f"User {request.user.username} submitted invalid picks for Week {week.number} in League {league.id}.")
+            form = outcome.form
         else:
             messages.error(request, "Invalid form submission.")
             logger.error("POST request without 'reset_picks' or 'submit_picks'.")
             # Initialize the form as if it's a GET request
-            all_active = Contestant.objects.filter(is_active=True, season=settings.CURRENT_SEASON)
-            previous_picks = Pick.objects.filter(
-                user_profile=profile,
-                week__league=league,
-                week__season=settings.CURRENT_SEASON,
-                week__number__lt=week_number
-            )
-            existing_pick = Pick.objects.filter(user_profile=profile, week=week).first()
-
-            if existing_pick:
-                previously_safe_picks = previous_picks.exclude(id=existing_pick.id)
-                # Only exclude safe picks that were NOT auto-assigned (i.e., had other picks made)
-                previously_safe_chosen_ids = previously_safe_picks.filter(
-                    voted_out_pick__isnull=False,
-                    imty_challenge_winner_pick__isnull=False
-                ).values_list('safe_pick_id', flat=True)
-            else:
-                # Only exclude safe picks that were NOT auto-assigned (i.e., had other picks made)
-                previously_safe_chosen_ids = previous_picks.filter(
-                    voted_out_pick__isnull=False,
-                    imty_challenge_winner_pick__isnull=False
-                ).values_list('safe_pick_id', flat=True)
-
-            available_safe_options = all_active.exclude(id__in=previously_safe_chosen_ids)
-            if existing_pick and existing_pick.safe_pick_id:
-                available_safe_options = available_safe_options | Contestant.objects.filter(id=existing_pick.safe_pick_id, season=settings.CURRENT_SEASON)
-
-            available_voted_options = all_active
-
-            form = PickForm(
-                request.POST if request.method == 'POST' else None,
-                instance=existing_pick,
-                has_immunity_idol=has_immunity_idol,
-                available_safe=available_safe_options,
-                available_voted=available_voted_options,
-                current_points=current_score,     # Use fresh calculation
-                weekly_cap=3,                           # NEW
-                min_floor=-3,                           # NEW
-            )
-            
+            form = pick_form(profile, ctx, request.POST)
     else:
         # Initialize the form with existing picks if any
-        all_active = Contestant.objects.filter(is_active=True, season=settings.CURRENT_SEASON)
-        previous_picks = Pick.objects.filter(
-            user_profile=profile,
-            week__league=league,
-            week__season=settings.CURRENT_SEASON,
-            week__number__lt=week_number
-        )
-        existing_pick = Pick.objects.filter(user_profile=profile, week=week).first()
-
-        if existing_pick:
-            previously_safe_picks = previous_picks.exclude(id=existing_pick.id)
-            # Only exclude safe picks that were NOT auto-assigned (i.e., had other picks made)
-            previously_safe_chosen_ids = previously_safe_picks.filter(
-                voted_out_pick__isnull=False,
-                imty_challenge_winner_pick__isnull=False
-            ).values_list('safe_pick_id', flat=True)
-        else:
-            # Only exclude safe picks that were NOT auto-assigned (i.e., had other picks made)
-            previously_safe_chosen_ids = previous_picks.filter(
-                voted_out_pick__isnull=False,
-                imty_challenge_winner_pick__isnull=False
-            ).values_list('safe_pick_id', flat=True)
-
-        available_safe_options = all_active.exclude(id__in=previously_safe_chosen_ids)
-        if existing_pick and existing_pick.safe_pick_id:
-            available_safe_options = available_safe_options | Contestant.objects.filter(id=existing_pick.safe_pick_id, season=settings.CURRENT_SEASON)
-
-        available_voted_options = all_active
-
-        form = PickForm(
-            request.POST if request.method == 'POST' else None,
-            instance=existing_pick,
-            has_immunity_idol=has_immunity_idol,
-            available_safe=available_safe_options,
-            available_voted=available_voted_options,
-            current_points=current_score,     # Use fresh calculation
-            weekly_cap=3,                           # NEW
-            min_floor=-3,                           # NEW
-        )
+        ctx = pick_buffer.with_pending(get_pick_context(profile, week), profile, week)
+        form = pick_form(profile, ctx)
 
-    # Fetch contestants for each category to pass to the template
-    safe_pick_queryset = available_safe_options
-    #print(safe_pick_queryset)
-    voted_out_pick_queryset = Contestant.objects.filter(is_active=True, season=settings.CURRENT_SEASON)
-    imty_challenge_winner_pick_queryset = Contestant.objects.filter(is_active=True, season=settings.CURRENT_SEASON)
+    return render_page(form)
 
-    context = {
-        'league': league,
-        'week': week,
-        'form': form,
-        'safe_pick_queryset': safe_pick_queryset,
-        'voted_out_pick_queryset': voted_out_pick_queryset,
-        'imty_challenge_winner_pick_queryset': imty_challenge_winner_pick_queryset,
-        'has_immunity_idol': has_immunity_idol,
-        'weekly_cap': 3,
-        'min_floor': -3,
-        'current_points': current_score
-    }
-    return render(request, 'make_picks.html', context)
+PICK_API_ACTIONS = ('submit', 'validate', 'reset')
+
+
+def pick_api_error(status, code, text):
+    return JsonResponse({'ok': False, 'status': code, 'messages': [{'level': 'error', 'text': text}]}, status=status)
 
+
+@query_budget(11)
+@login_required
+@require_POST
+@transaction.atomic
+def pick_api(request, league_id, week_number):
+    """
+    JSON counterpart of make_picks, called by make_picks.js with fetch.
+    Body: {"action": "submit" | "validate" | "reset", "picks": {field: value}}.
+    Answers with the outcome, compact field errors and the member's pick for the
+    week afterwards, without redirecting or rendering a page. Same rules, lock and
+    buffering as make_picks (see poolapp.pick_submission).
+    """
+    try:
+        payload = json.loads(request.body)
+        action = payload.get('action')
+        data = payload.get('picks') or {}
+    except (ValueError, AttributeError):
+        return pick_api_error(400, 'bad_request', "Expected a JSON object.")
+    if action not in PICK_API_ACTIONS or not isinstance(data, dict):
+        return pick_api_error(400, 'bad_request', f"'action' must be one of: {', '.join(PICK_API_ACTIONS)}.")
+
+    week = (
+        Week.objects.select_related('league')
+        .filter(number=week_number, league_id=league_id, season=settings.CURRENT_SEASON).first()
+    )
+    if week is None:
+        return pick_api_error(404, 'not_found', "No such week.")
+    league = week.league
+    profile = UserProfile.objects.filter(user=request.user, league=league).first()
+    if profile is None:
+        if not league.members.filter(id=request.user.id).exists():
+            logger.warning(f"User {request.user.username} attempted to access League {league.id} without membership.")
+            return pick_api_error(403, 'forbidden', "You are not a member of this league.")
+        profile, _ = UserProfile.objects.get_or_create(user=request.user, league=league)
+    if profile.eliminated:
+        return pick_api_error(403, 'eliminated', "You have been permanently eliminated and cannot make picks.")
+
+    # Validating only reads, and buffered submissions only touch Redis: no row lock for either
+    buffered = action == 'submit' and pick_buffer.enabled()
+    # The week's lock is checked against database time either way
+    profile = read_profile(profile, week) if action == 'validate' or buffered else lock_profile(profile, week)
+    week_open = profile.week_open
+    if not week_open:
+        logger.warning(f"User {request.user.username} attempted to change picks for locked Week {week.number} in League {league.id}.")
+        return pick_api_error(409, 'locked', "This week is locked. You can’t change picks now.")
+
+    if action == 'reset':
+        outcome = reset_picks(request.user, profile, week)
+        state = None
+    else:
+        if action == 'validate' or buffered:
+            ctx = pick_buffer.with_pending(get_pick_context(profile, week), profile, week)
+        else:
+            ctx = build_pick_context(profile, week)
+        stored = pick_state(ctx.existing_pick)  # before the form writes the submission into it
+        outcome = submit_picks(
+            request.user, profile, week, ctx, data, buffered=buffered, commit=action == 'submit',
+        )
+        state = pick_state(outcome.pick) if outcome.status in ACCEPTED else stored
+
+    ok = outcome.status in ACCEPTED + ('reset', 'empty')
+    return JsonResponse({
+        'ok': ok,
+        'status': outcome.status,
+        'errors': {field: list(errors) for field, errors in outcome.form.errors.items()} if outcome.form is not None else {},
+        'messages': [{'level': messages.DEFAULT_TAGS[level], 'text': text} for level, text in outcome.messages],
+        'pick': state,
+    }, status=200 if ok else 422)
+
+@query_budget(6)
 @login_required
 def dashboard(request):
-    user_leagues = request.user.leagues.all()
-    recent_activity = Activity.objects.filter(league__in=user_leagues).order_by('-timestamp')[:5]
+    # Member counts in the same query as the leagues (one query however many leagues)
+    user_leagues = request.user.leagues.annotate(num_members=Count('members', distinct=True))
+    recent_activity = Activity.objects.filter(league__in=request.user.leagues.all()).order_by('-timestamp')[:5]
     context = {
         'recent_activity': recent_activity,
+        'leagues': list(user_leagues),
     }
     return render(request, 'dashboard.html', context)
 
+@query_budget(14)
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=league_detail_etag)  # 304 without rendering while nothing changed
 def league_detail(request, league_id=None):
     league = get_object_or_404(League, id=league_id)
     season = settings.CURRENT_SEASON
@@ -485,30 +378,13 @@ def league_detail(request, league_id=None):
     # if created:
     #     logger.info(f"UserProfile created for '{request.user.username}' in League '{league.name}'.")
     
-    # Get all members as user profiles
-    member_profiles = UserProfile.objects.filter(league=league).select_related('user')
-
-    # Sort members by total_score desc (leaderboard)
-    # total_score now correctly includes picks_total - exile_return_cost
-    leaderboard = member_profiles.order_by('-total_score', 'exiled')
-
-    # Find the most recently locked (past) week for this league
     current_time = timezone.now()
-    last_scored_week = Week.objects.filter(league=league, lock_time__lt=current_time, season=season).order_by('-number').first()
-
-    # Map: user_profile.id -> points_week_total for last_scored_week
-    week_delta_by_profile = {}
-    if last_scored_week:
-        last_week_picks = Pick.objects.filter(week=last_scored_week, user_profile__league=league)
-        week_delta_by_profile = {p.user_profile_id: (p.points_week_total or 0) for p in last_week_picks}
 
-    # Get all contestants that are still active
-    
-    active_contestants = Contestant.objects.filter(season=season, is_active=True)
-    voted_out_contestants = Contestant.objects.filter(season=season, is_active=False)
+    # The season's contestants, split by status (cached per contestant version)
+    catalog = get_catalog(season)
 
     # Optional: Get the latest week or all weeks. For simplicity, let’s get all weeks.
-    weeks = Week.objects.filter(league=league, season=season).order_by('number')
+    weeks = list(Week.objects.filter(league=league, season=season).order_by('number'))
 
     # Identify the current week
     current_week = None
@@ -517,6 +393,21 @@ def league_detail(request, league_id=None):
             current_week = week
             break
 
+    # The most recently locked (past) week for this league
+    past_weeks = [w for w in weeks if w.lock_time < current_time]
+    last_scored_week = past_weeks[-1] if past_weeks else None
+
+    # Members sorted by total_score desc (total_score includes picks_total - exile_return_cost)
+    # and each member's points for last_scored_week; cached per league scoring version
+    leaderboard, week_delta_by_profile = get_leaderboard(league, last_scored_week)
+
+    # Only the current week's picks are rendered with the page; the other
+    # panels are fetched from league_week_picks when expanded
+    current_picks = None
+    if current_week:
+        grid = build_pick_grid(leaderboard, [current_week], catalog.contestants, viewer=request.user, now=current_time)
+        current_picks = grid.column(0)
+
     # Annotate each week with its status
     annotated_weeks = []
     for week in weeks:
@@ -530,25 +421,18 @@ def league_detail(request, league_id=None):
             'week': week,
             'status': status,
             'lock_time': week.lock_time,
+            'picks': current_picks if status == 'current' else None,
         })
 
-    picks_by_week = {}
-    for w in weeks:
-        # Retrieve picks via UserProfile
-        w_picks = Pick.objects.filter(week=w, user_profile__league=league).select_related(
-            'user_profile__user', 'safe_pick', 'voted_out_pick', 'imty_challenge_winner_pick')
-        # Create a dictionary mapping UserProfile IDs to Pick instances
-        w_picks_dict = {p.user_profile.id: p for p in w_picks}
-        picks_by_week[w.number] = w_picks_dict
-        #print(picks_by_week)
-
     context = {
         'league': league,
         'leaderboard': leaderboard,
-        'active_contestants': active_contestants,
-        'voted_out_contestants': voted_out_contestants,
+        'active_contestants': catalog.active,
+        'voted_out_contestants': catalog.voted_out,
+        'season': season,
+        'contestants_version': catalog.version,
+        'cards_timeout': CARDS_TIMEOUT,
         'weeks': annotated_weeks,
-        'picks_by_week': picks_by_week,
         'current_time': current_time,
         'current_week': current_week,
         'last_scored_week': last_scored_week,
@@ -556,20 +440,43 @@ def league_detail(request, league_id=None):
     }
     return render(request, 'league_detail.html', context)
 
+@query_budget(8)
+@login_required
+def league_week_picks(request, league_id, week_number):
+    """
+    One week's picks table for league_detail, fetched when its panel is expanded.
+    Once a week has locked its picks are visible to everyone and only change
+    when the league is rescored, so the fragment is cached per scoring version.
+    """
+    league = get_object_or_404(League, id=league_id)
+    season = settings.CURRENT_SEASON
+    week = get_object_or_404(Week, league=league, season=season, number=week_number)
+    current_time = timezone.now()
+
+    locked = week.lock_time <= current_time
+    key = week_picks_key(league, week)
+    if locked:
+        html = cache.get(key)
+        if html is not None:
+            return HttpResponse(html)
+
+    leaderboard, _ = get_leaderboard(league)
+    grid = build_pick_grid(leaderboard, [week], get_catalog(season).contestants, viewer=request.user, now=current_time)
+    html = render_to_string('week_picks.html', {'picks': grid.column(0)}, request=request)
+    if locked:
+        cache.set(key, html, LEADERBOARD_TIMEOUT)
+    return HttpResponse(html)
+
+@query_budget(12)
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=user_profile_etag)
 def user_profile(request, league_id, user_id):
     season = settings.CURRENT_SEASON
     league = get_object_or_404(League, id=league_id)
     user = get_object_or_404(User, id=user_id)
-    weeks = Week.objects.filter(league=league, season=season).order_by('number')
-    picks = Pick.objects.filter(
-        user_profile__user=user,
-        week__league=league,
-        week__season=season
-    ).order_by('week__number')
-
     # Ensure the user is a member of the league
-    if user not in league.members.all():
+    if not league.members.filter(id=user.id).exists():
         messages.error(request, "User is not a member of this league.")
         logger.warning(f"Attempt to access profile of user {user.username} who is not in league {league.id}.")
         return redirect('poolapp:league_detail', league_id=league.id)
@@ -579,18 +486,24 @@ def user_profile(request, league_id, user_id):
 
     current_time = timezone.now()
 
+    # Weeks with their results, and the user's picks keyed by week: two queries for the season
+    weeks = Week.objects.filter(league=league, season=season).select_related('result').order_by('number')
+    picks = {
+        p.week_id: p for p in Pick.objects.filter(user_profile=profile, week__season=season)
+        .select_related('safe_pick', 'voted_out_pick', 'imty_challenge_winner_pick')
+    }
+    # Rank after each scored week (written by the scoring run)
+    ranks = dict(profile.rank_snapshots.filter(week__season=season).values_list('week_id', 'rank'))
+
     user_stats = []
     for week in weeks:
-        pick = picks.filter(week=week).first()
-        result = None
-        try:
-            result = WeekResult.objects.get(week=week)
-        except WeekResult.DoesNotExist:
-            result = None  # No result for this week
+        pick = picks.get(week.id)
+        result = getattr(week, 'result', None)  # No result for this week
+        rank = ranks.get(week.id)
 
         if pick:
-            if result and result.voted_out_contestant:
-                is_correct = pick.safe_pick != result.voted_out_contestant
+            if result and result.voted_out_contestant_id:
+                is_correct = pick.safe_pick_id != result.voted_out_contestant_id
                 result_status = 'Safe' if is_correct else 'Fucked'
             else:
                 result_status = 'Pending'
@@ -603,6 +516,7 @@ def user_profile(request, league_id, user_id):
                 'used_idol': pick.used_immunity_idol,
                 'result': result_status,
                 'lock_time': week.lock_time,
+                'rank': rank,
             })
         else:
             user_stats.append({
@@ -613,12 +527,42 @@ def user_profile(request, league_id, user_id):
                 'used_idol': None,
                 'result': 'No Pick',
                 'lock_time': week.lock_time,
+                'rank': rank,
             })
 
     context = {
         'league': league,
         'user': user,
         'user_stats': user_stats,
+        'best_rank': min(ranks.values(), default=None),
         'current_time': current_time,
     }
-    return render(request, 'user_profile.html', context)
\ No newline at end of file
+    return render(request, 'user_profile.html', context)
+
+@query_budget(8)
+@login_required
+def export_league(request, league_id):
+    """
+    Download the league's season history: ?format=csv|ndjson (default csv) and
+    ?table=picks|results|profiles (repeatable; CSV takes one, NDJSON defaults
+    to all). Rows are streamed, and only weeks that have locked are included.
+    """
+    season = settings.CURRENT_SEASON
+    league = get_object_or_404(League, id=league_id)
+    if not league.members.filter(id=request.user.id).exists():
+        messages.error(request, "You are not a member of this league.")
+        return redirect('poolapp:dashboard')
+
+    fmt = request.GET.get('format', 'csv')
+    tables = request.GET.getlist('table') or (['picks'] if fmt == 'csv' else list(TABLES))
+    try:
+        chunks = stream_export(fmt, tables, season, league_ids=[league.id], locked_before=timezone.now())
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('poolapp:league_detail', league_id=league.id)
+
+    filename = f"league-{league.id}-season-{season}-{'-'.join(tables)}.{fmt}"
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    logger.info(f"User '{request.user.username}' exported {fmt} {tables} of league '{league.name}'.")
+    return response
\ No newline at end of file
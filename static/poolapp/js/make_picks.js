@@ -2,6 +2,98 @@ document.addEventListener('DOMContentLoaded', function () {
   const makePicksForm = document.getElementById('make-picks-form');
   const contestantCards = makePicksForm.querySelectorAll('.contestant-card');
   const resetPicksButton = makePicksForm.querySelector('button[name="reset_picks"]');
+  const apiUrl = makePicksForm.dataset.apiUrl;
+  const messagesBox = document.getElementById('pick-api-messages');
+  const pickCategories = ['safe_pick', 'voted_out_pick', 'imty_challenge_winner_pick'];
+
+  // ---------- pick API (JSON save/reset without reloading the page) ----------
+  function showMessages(messages, errors) {
+    if (!messagesBox) return;
+    messagesBox.replaceChildren();
+    const items = (messages || []).map(m => [m.level === 'error' ? 'danger' : m.level, m.text]);
+    Object.entries(errors || {}).forEach(([field, list]) => list.forEach(text => items.push(['danger', text])));
+    items.forEach(([level, text]) => {
+      const alert = document.createElement('div');
+      alert.className = `alert alert-${level}`;
+      alert.setAttribute('role', 'alert');
+      alert.textContent = text;
+      messagesBox.appendChild(alert);
+    });
+    if (items.length) messagesBox.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+  }
+
+  function applyPickState(pick) {
+    pickCategories.forEach(category => {
+      const id = pick ? pick[category] : null;
+      const hiddenInput = makePicksForm.querySelector(`input[name="${category}"]`);
+      if (hiddenInput) hiddenInput.value = id == null ? '' : id;
+      makePicksForm.querySelectorAll(`.contestant-card[data-category="${category}"]`).forEach(card => {
+        card.classList.toggle('selected', id != null && card.getAttribute('data-contestant-id') === String(id));
+      });
+    });
+  }
+
+  function pickPayload() {
+    const picks = {};
+    pickCategories.forEach(category => {
+      const hiddenInput = makePicksForm.querySelector(`input[name="${category}"]`);
+      picks[category] = hiddenInput && hiddenInput.value ? hiddenInput.value : null;
+    });
+    picks.used_immunity_idol = !!immunityCheckbox?.checked;
+    picks.wager_voted_out = parseInt(hidVO?.value || '0', 10) || 0;
+    picks.wager_immunity = parseInt(hidIM?.value || '0', 10) || 0;
+    picks.parlay = !!parlayToggle?.checked;
+    return picks;
+  }
+
+  // Resolves to the API's JSON answer; rejects when it can't be reached (caller falls back to a form POST)
+  async function callPickApi(action) {
+    const response = await fetch(apiUrl, {
+      method: 'POST',
+      credentials: 'same-origin',
+      headers: {
+        'Content-Type': 'application/json',
+        'X-CSRFToken': makePicksForm.querySelector('input[name="csrfmiddlewaretoken"]').value,
+      },
+      body: JSON.stringify({ action: action, picks: action === 'reset' ? {} : pickPayload() }),
+    });
+    if (!(response.headers.get('Content-Type') || '').includes('application/json')) {
+      throw new Error(`pick API answered ${response.status}`);
+    }
+    return response.json();
+  }
+
+  function postForm(flag) {
+    let input = makePicksForm.querySelector(`input[name="${flag}"]`);
+    if (!input) {
+      input = document.createElement('input');
+      input.type = 'hidden';
+      input.name = flag;
+      makePicksForm.appendChild(input);
+    }
+    input.value = 'on';
+    makePicksForm.submit();
+  }
+
+  let saving = false;
+  async function savePicks(action) {
+    if (saving) return;  // one request at a time; double taps don't queue duplicates
+    saving = true;
+    makePicksForm.querySelectorAll('button').forEach(button => { button.disabled = true; });
+    try {
+      const result = await callPickApi(action);
+      showMessages(result.messages, result.errors);
+      if (result.ok) applyPickState(result.pick);
+      if (result.status === 'locked' && makePicksForm.dataset.leagueUrl) {
+        setTimeout(() => { window.location.href = makePicksForm.dataset.leagueUrl; }, 1500);
+      }
+    } catch (err) {
+      postForm(action === 'reset' ? 'reset_picks' : 'submit_picks');
+    } finally {
+      saving = false;
+      makePicksForm.querySelectorAll('button').forEach(button => { button.disabled = false; });
+    }
+  }
 
   // ---------- card selection ----------
   function handleSelection(category, contestantId, selectedCard) {
@@ -60,20 +152,9 @@ document.addEventListener('DOMContentLoaded', function () {
       if (parlayToggle) parlayToggle.checked = false;
       normalizeRisk(); // sync hidden fields and meter
 
-      // add hidden reset flag
-      let resetInput = makePicksForm.querySelector('input[name="reset_picks"]');
-      if (!resetInput) {
-        resetInput = document.createElement('input');
-        resetInput.type = 'hidden';
-        resetInput.name = 'reset_picks';
-        resetInput.value = 'on';
-        makePicksForm.appendChild(resetInput);
-      } else {
-        resetInput.value = 'on';
-      }
-
-      // submit
-      setTimeout(() => makePicksForm.submit(), 0);
+      // reset through the pick API (plain form POST if it can't be reached)
+      if (apiUrl) savePicks('reset');
+      else postForm('reset_picks');
     });
   }
 
@@ -212,7 +293,7 @@ document.addEventListener('DOMContentLoaded', function () {
     // sync hidden fields
     if (hidVO) hidVO.value = vo;
     if (hidIM) hidIM.value = im;
-    if (hidParlay) hidParlay.checked = !!parlayToggle?.checked;
+    if (hidParlay) hidParlay.value = parlayToggle?.checked ? 'True' : 'False';
 
     // Update outcomes calculator
     updateOutcomesDisplay();
@@ -224,5 +305,10 @@ document.addEventListener('DOMContentLoaded', function () {
 
   // initial sync
   normalizeRisk();
-  makePicksForm.addEventListener('submit', normalizeRisk);
+  makePicksForm.addEventListener('submit', function (e) {
+    normalizeRisk();
+    if (!apiUrl) return;
+    e.preventDefault();
+    savePicks('submit');
+  });
 });
\ No newline at end of file
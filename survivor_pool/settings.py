@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'poolapp.query_budget.QueryBudgetMiddleware',  # inactive unless QUERY_BUDGET_LOG
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +56,9 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'survivor_pool.urls'
 
+# Log views that exceed their declared SQL query budget (poolapp.query_budget)
+QUERY_BUDGET_LOG = env.bool('QUERY_BUDGET_LOG', default=False)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -193,12 +197,44 @@ LOGIN_REDIRECT_URL = '/'
 CELERY_BROKER_URL = env('CELERY_BROKER_URL') #'redis://:PASSWORD@YOUR-REDIS-HOST:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Result backend is needed for chords (update_week_results --celery)
+CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND', default=CELERY_BROKER_URL)
+
+# Shared cache (leaderboards etc.) on the same Redis unless REDIS_CACHE_URL says otherwise
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('REDIS_CACHE_URL', default=CELERY_BROKER_URL),
+        'KEY_PREFIX': 'survivor_pool',
+    }
+}
+
+# Optional write-behind buffer for pick submissions (poolapp.pick_buffer). Queued
+# submissions live in Redis until flushed: run that Redis with appendonly yes.
+PICK_BUFFER = env.bool('PICK_BUFFER', default=False)
+PICK_BUFFER_URL = env('PICK_BUFFER_URL', default=CELERY_BROKER_URL)
+PICK_BUFFER_FLUSH_SECONDS = env.float('PICK_BUFFER_FLUSH_SECONDS', default=5.0)
 
 # Celery-Beat settings
 INSTALLED_APPS += [
     'django_celery_beat',
 ]
 
+from celery.schedules import crontab
+
+CELERY_BEAT_SCHEDULE = {
+    # Repair any drift in the incrementally maintained UserProfile counters
+    'reconcile-profile-aggregates': {
+        'task': 'poolapp.tasks.reconcile_profile_aggregates',
+        'schedule': crontab(hour=4, minute=30),
+    },
+}
+if PICK_BUFFER:
+    CELERY_BEAT_SCHEDULE['flush-pick-buffer'] = {
+        'task': 'poolapp.tasks.flush_pick_buffer',
+        'schedule': PICK_BUFFER_FLUSH_SECONDS,
+    }
+
 EMAIL_HOST = env('EMAIL_HOST')
 EMAIL_PORT = env.int('EMAIL_PORT')
 EMAIL_HOST_USER = env('EMAIL_HOST_USER')
@@ -0,0 +1,45 @@
+"""
+Locally runnable settings for benchmarks and tests (no Postgres, Redis or SMTP).
+
+    python manage.py benchmark --settings=survivor_pool.settings_bench
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+# Placeholders for the env-driven settings that have no default
+for key, value in {
+    'SECRET_KEY': 'bench-not-secret',
+    'DEBUG': 'False',
+    'DB_NAME': '', 'DB_USER': '', 'DB_PASSWORD': '', 'DB_HOST': '', 'DB_PORT': '',
+    'CELERY_BROKER_URL': 'memory://',
+    'EMAIL_HOST': 'localhost', 'EMAIL_PORT': '25', 'EMAIL_HOST_USER': '', 'EMAIL_HOST_PASSWORD': '',
+    'DEFAULT_FROM_EMAIL': 'bench@localhost',
+}.items():
+    os.environ.setdefault(key, value)
+
+from survivor_pool.settings import *  # noqa: E402,F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # Outside the checkout; tests and the benchmark run in in-memory test databases anyway
+        'NAME': Path(tempfile.gettempdir()) / 'survivor_pool_bench.sqlite3',
+    }
+}
+# 0006 inspects information_schema (Postgres only); build poolapp tables from the models
+MIGRATION_MODULES = {'poolapp': None}
+
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_RESULT_BACKEND = 'cache+memory://'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'poolapp': {'handlers': ['console'], 'level': 'CRITICAL'}},  # scoring notices are noise here
+}